@@ -1,153 +1,346 @@
-import heapq
-import time
+import sys
+from collections import deque
 
-def get_checksum(packet):
-    """ Calcula o checksum do pacote """
-    return sum(ord(c) for c in packet['payload']) + packet['seqnum'] + packet['acknum']
+import channel
+import rto
+import tracing
+import wire
+from clock import VirtualClock, create_clock
+from endpoint import Message, Packet, ReceiverEndpoint, SenderEndpoint
+from scheduler import TIMER_PRIORITY, EventScheduler
+from stats import Statistics
 
-class ABPProtocol:
-    def __init__(self):
-        self.A = {'seqnum': 0, 'last_packet': None, 'waiting_ack': False}
-        self.B = {'expected_seqnum': 0}
-        self.event_queue = []
-        self.current_time = 0.0
-        self.timeout = 10.0  # Tempo de timeout em unidades de tempo
-        
-    def to_layer3(self, packet, from_A=True):
-        """ Envia o pacote para a camada 3 """
-        # Simula atraso de rede
-        delay = 5.0
-        # Adiciona um evento para simular a chegada do pacote
-        if from_A:
-            heapq.heappush(self.event_queue, (self.current_time + delay, 'A_TO_B', packet.copy()))
-            print(f"Time {self.current_time:.1f}: A sent to layer 3: {packet}")
-        else:
-            heapq.heappush(self.event_queue, (self.current_time + delay, 'B_TO_A', packet.copy()))
-            print(f"Time {self.current_time:.1f}: B sent to layer 3: {packet}")
-    
-    def to_layer5(self, message, from_A=False):
-        """ Entrega a mensagem à camada 5 (destino final) """
-        sender = "A" if from_A else "B"
-        print(f"Time {self.current_time:.1f}: {sender} delivered to layer 5: {message}")
-    
-    def start_timer(self):
-        """ Inicia o timer para retransmissão """
-        heapq.heappush(self.event_queue, (self.current_time + self.timeout, 'TIMER_INTERRUPT', None))
-        print(f"Time {self.current_time:.1f}: Timer started")
-    
-    def stop_timer(self):
-        """ Para o timer (removendo eventos de timeout) """
-        # Remover eventos de timeout da fila (na prática, criaríamos uma nova fila)
-        new_queue = []
-        for event in self.event_queue:
-            if event[1] != 'TIMER_INTERRUPT':
-                new_queue.append(event)
-        self.event_queue = new_queue
-        heapq.heapify(self.event_queue)
-        print(f"Time {self.current_time:.1f}: Timer stopped")
-    
-    def A_output(self, message):
-        """ A envia um pacote """
-        if self.A['waiting_ack']:
-            print(f"Time {self.current_time:.1f}: A is waiting for ACK. Message queued.")
-            return
+SEND_QUEUE = 64  # Mensagens aguardando a vez enquanto A espera um ACK
+TIMEOUT = 10.0   # Timeout fixo do ABPProtocol, em unidades de tempo
+
+class ABPSender(SenderEndpoint):
+    """ Lado A do bit alternante: um pacote em trânsito por vez
+
+    O ABP não fragmenta (cada mensagem vai em um único pacote, qualquer que
+    seja a MTU), tem janela 1 e numera com um bit: os demais parâmetros de
+    create_endpoints são aceitos pela interface e ignorados. Com timeout=None
+    o timer segue o RTO da RFC 6298 (amostras pela regra de Karn); com um
+    número, é fixo como no protocolo original.
+    """
+
+    fifo = True  # Com um bit de sequência, uma cópia atrasada que ultrapassa a seguinte seria aceita como nova
+
+    def __init__(self, network, window_size=1, initial_rtt=15, bufsize=None, congestion_control=None, mtu=None,
+                 send_queue=SEND_QUEUE, seq_bits=None, side=0, min_rto=rto.MIN_RTO, max_rto=rto.MAX_RTO,
+                 timestamps=False, timeout=None):
+        self.network = network
+        self.stats = network.stats
+        self.side = side
+        self.window_size = 1
+        self.cc = None  # Sem controle de congestionamento
+        self.seqnum = 0
+        self.last_packet = None
+        self.waiting_ack = False
+        self.queue = deque()
+        self.send_queue = send_queue
+        self.blocked = False
+        self.on_writable = None  # Chamado quando a fila volta a aceitar mensagens após uma recusa
+        self.timeout = timeout
+        self.rto = rto.RtoEstimator(initial_rtt, min_rto, max_rto)
+        self.sent_time = 0.0
+        self.retransmitted = False  # Regra de Karn: o ACK de um pacote retransmitido não mede RTT
+        self.timer_running = False
+
+    @property
+    def current_time(self):
+        return self.network.current_time
+
+    def writable(self):
+        return not self.waiting_ack or len(self.queue) < self.send_queue
+
+    def idle(self):
+        return not self.waiting_ack and not self.queue
+
+    def queued(self):
+        return len(self.queue)
+
+    def in_flight(self):
+        return int(self.waiting_ack)
+
+    def output(self, message):
+        """ A envia uma mensagem; devolve False (would-block) se a fila de envio estiver cheia """
+        if self.waiting_ack:
+            if len(self.queue) >= self.send_queue:
+                self.blocked = True
+                self.stats.send_blocked += 1
+                if tracing.info:
+                    tracing.log(f"Time {self.current_time:.1f}: A is waiting for ACK and the queue is full. Message refused.")
+                return False
+            self.queue.append(message)
+            if tracing.info:
+                tracing.log(f"Time {self.current_time:.1f}: A is waiting for ACK. Message queued.")
+            return True
         
-        packet = {'seqnum': self.A['seqnum'], 'acknum': 0, 'payload': message}
-        packet['checksum'] = get_checksum(packet)
-        self.A['last_packet'] = packet.copy()  # Armazena o último pacote enviado
-        self.A['waiting_ack'] = True
+        self.send_message(message)
+        return True
+
+    def send_message(self, message):
+        """ Monta e transmite o próximo pacote de A """
+        packet = Packet(seqnum=self.seqnum, payload=message.data)
+        self.last_packet = packet  # Guardado para a retransmissão
+        self.waiting_ack = True
+        self.retransmitted = False
+        self.sent_time = self.current_time
+        self.stats.packets_sent += 1
         
-        print(f"Time {self.current_time:.1f}: A_output: Sending packet with seqnum={packet['seqnum']}: {message}")
-        self.to_layer3(packet, from_A=True)
+        if tracing.debug:
+            tracing.log(f"Time {self.current_time:.1f}: A_output: Sending packet with seqnum={packet.seqnum}: {bytes(packet.payload)}")
+        if tracing.writer:
+            tracing.writer.write(self.current_time, tracing.SEND, self.side, packet.seqnum, packet.acknum)
+        self.network.to_layer3(self.side, packet)
         self.start_timer()
-    
-    def A_input(self, packet):
+
+    def input(self, packet):
         """ A recebe um pacote (ACK ou NAK) """
-        print(f"Time {self.current_time:.1f}: A_input: Received ACK/NAK with acknum={packet['acknum']}")
+        if tracing.debug:
+            tracing.log(f"Time {self.current_time:.1f}: A_input: Received ACK/NAK with acknum={packet.acknum}")
         
         # Verifica se o checksum está correto
-        if packet.get('checksum', 0) != get_checksum(packet):
-            print(f"Time {self.current_time:.1f}: A_input: Checksum error! Ignoring packet.")
+        if packet.checksum != packet.calculate_checksum():
+            self.stats.packets_corrupted += 1
+            if tracing.info:
+                tracing.log(f"Time {self.current_time:.1f}: A_input: Checksum error! Ignoring packet.")
             return
         
-        # Verifica se o ACK é para o pacote atual
-        if packet['acknum'] == self.A['seqnum']:
-            print(f"Time {self.current_time:.1f}: A_input: Received ACK for packet {self.A['seqnum']}")
+        # Verifica se o ACK é para o pacote atual (um ACK atrasado de duas mensagens atrás tem o mesmo bit)
+        if self.waiting_ack and packet.acknum == self.seqnum:
+            if tracing.debug:
+                tracing.log(f"Time {self.current_time:.1f}: A_input: Received ACK for packet {self.seqnum}")
             self.stop_timer()
-            self.A['seqnum'] = 1 - self.A['seqnum']  # Alterna o bit de sequência
-            self.A['waiting_ack'] = False
+            if not self.retransmitted:
+                rtt = self.current_time - self.sent_time
+                self.stats.record_rtt(rtt)
+                self.rto.sample(rtt)
+            self.seqnum = 1 - self.seqnum  # Alterna o bit de sequência
+            self.waiting_ack = False
+            # Próxima mensagem da fila, se houver
+            if self.queue:
+                self.send_message(self.queue.popleft())
+                if self.blocked:
+                    self.blocked = False
+                    if self.on_writable is not None:
+                        self.on_writable()
         else:
-            print(f"Time {self.current_time:.1f}: A_input: Received outdated or incorrect ACK. Ignoring.")
+            if tracing.debug:
+                tracing.log(f"Time {self.current_time:.1f}: A_input: Received outdated or incorrect ACK. Ignoring.")
     
-    def A_timerinterrupt(self):
-        """ Reenvia pacote ao ocorrer timeout """
-        print(f"Time {self.current_time:.1f}: A_timerinterrupt: Timer expired")
-        if self.A['last_packet'] and self.A['waiting_ack']:
-            print(f"Time {self.current_time:.1f}: A_timerinterrupt: Resending last packet with seqnum={self.A['seqnum']}")
-            self.to_layer3(self.A['last_packet'], from_A=True)
+    def timer_interrupt(self):
+        """ Reenvia o pacote ao ocorrer timeout """
+        self.timer_running = False
+        if tracing.info:
+            tracing.log(f"Time {self.current_time:.1f}: A_timerinterrupt: Timer expired")
+        if self.last_packet is not None and self.waiting_ack:
+            self.stats.timeouts += 1
+            self.stats.packets_retransmitted += 1
+            self.rto.timeout()
+            self.retransmitted = True
+            if tracing.info:
+                tracing.log(f"Time {self.current_time:.1f}: A_timerinterrupt: Resending last packet with seqnum={self.seqnum}")
+            if tracing.writer:
+                tracing.writer.write(self.current_time, tracing.RETRANSMIT, self.side, self.seqnum, 0)
+            self.network.to_layer3(self.side, self.last_packet)
             self.start_timer()
-    
-    def B_input(self, packet):
+
+    def start_timer(self):
+        if self.timer_running:
+            self.network.stop_timer(self.side)
+        self.network.start_timer(self.side, self.rto.rto if self.timeout is None else self.timeout)
+        self.timer_running = True
+
+    def stop_timer(self):
+        if self.timer_running:
+            self.network.stop_timer(self.side)
+            self.timer_running = False
+
+class ABPReceiver(ReceiverEndpoint):
+    """ Lado B do bit alternante: entrega o pacote esperado e confirma cada um na hora
+
+    Janela, remontagem e ACK atrasado do GBN/SR não se aplicam; os parâmetros
+    existem pela interface de create_endpoints.
+    """
+
+    def __init__(self, network, window_size=1, bufsize=None, reassembly_timeout=None, seq_bits=None,
+                 ack_delay=0, ack_every=1, side=1):
+        self.network = network
+        self.stats = network.stats
+        self.side = side
+        self.expected_seqnum = 0
+        self.sink = None  # Destino das mensagens, sink(payload, last) (ex.: transfer.FileSink.feed)
+
+    @property
+    def current_time(self):
+        return self.network.current_time
+
+    def send_ack(self, acknum, flags=wire.FLAG_ACK):
+        self.stats.acks_sent += 1
+        self.network.to_layer3(self.side, Packet(acknum=acknum, flags=flags))
+
+    def deliver(self, payload):
+        self.stats.packets_delivered += 1
+        self.stats.messages_delivered += 1
+        self.stats.bytes_delivered += len(payload)
+        if self.sink is not None:
+            self.sink(payload, True)  # Um pacote por mensagem: cada entrega é uma mensagem completa
+        else:
+            self.network.to_layer5(self.side, payload)
+
+    def input(self, packet):
         """ B recebe um pacote """
-        if not isinstance(packet, dict):
-            print(f"Time {self.current_time:.1f}: B_input: Received an invalid packet format.")
-            return
-        
-        print(f"Time {self.current_time:.1f}: B_input: Received packet with seqnum={packet['seqnum']}: {packet.get('payload', '[No Payload]')}")
+        self.stats.packets_received += 1
+        if tracing.debug:
+            tracing.log(f"Time {self.current_time:.1f}: B_input: Received packet with seqnum={packet.seqnum}: {bytes(packet.payload)}")
         
         # Verifica o checksum
-        if packet.get('checksum', 0) != get_checksum(packet):
-            print(f"Time {self.current_time:.1f}: B_input: Checksum error! Sending NAK.")
-            nak_packet = {'seqnum': 0, 'acknum': 1 - self.B['expected_seqnum'], 'payload': '', 'checksum': 0}
-            nak_packet['checksum'] = get_checksum(nak_packet)
-            self.to_layer3(nak_packet, from_A=False)
+        if packet.checksum != packet.calculate_checksum():
+            self.stats.packets_corrupted += 1
+            if tracing.info:
+                tracing.log(f"Time {self.current_time:.1f}: B_input: Checksum error! Sending NAK.")
+            self.send_ack(1 - self.expected_seqnum, wire.FLAG_NAK)
             return
         
         # Verifica se o número de sequência é o esperado
-        if packet['seqnum'] == self.B['expected_seqnum']:
-            # Entrega o pacote à camada 5
-            self.to_layer5(packet['payload'])
-            
-            # Envia ACK
-            ack_packet = {'seqnum': 0, 'acknum': packet['seqnum'], 'payload': '', 'checksum': 0}
-            ack_packet['checksum'] = get_checksum(ack_packet)
-            self.to_layer3(ack_packet, from_A=False)
-            
-            # Atualiza o número de sequência esperado
-            self.B['expected_seqnum'] = 1 - self.B['expected_seqnum']
+        if packet.seqnum == self.expected_seqnum:
+            self.deliver(packet.payload)
+            self.send_ack(packet.seqnum)
+            self.expected_seqnum = 1 - self.expected_seqnum
         else:
-            print(f"Time {self.current_time:.1f}: B_input: Unexpected sequence number. Sending ACK for previous packet.")
-            ack_packet = {'seqnum': 0, 'acknum': 1 - self.B['expected_seqnum'], 'payload': '', 'checksum': 0}
-            ack_packet['checksum'] = get_checksum(ack_packet)
-            self.to_layer3(ack_packet, from_A=False)
+            self.stats.packets_duplicate += 1
+            if tracing.debug:
+                tracing.log(f"Time {self.current_time:.1f}: B_input: Unexpected sequence number. Sending ACK for previous packet.")
+            self.send_ack(1 - self.expected_seqnum)
+
+class ABPProtocol:
+    """ Simulador autônomo do ABP: A envia, B recebe, com fila de eventos própria
+
+    É a rede dos endpoints ABPSender/ABPReceiver, com a mesma interface do
+    NetworkSimulator (que também os executa, com protocol="abp"). Sem
+    `channels` o enlace é ideal, com atraso fixo de 5 unidades de tempo.
+    """
+
+    def __init__(self, clock=None, send_queue=SEND_QUEUE, channels=None, timeout=TIMEOUT):
+        self.event_queue = EventScheduler()
+        self.timer_token = None
+        self.clock = clock or VirtualClock()  # Relógio virtual por padrão: roda o mais rápido possível
+        # (canal A->B, canal B->A) do módulo channel; None mantém o enlace ideal com atraso fixo
+        self.channels = channels
+        self.last_arrival = [0.0, 0.0]  # Última chegada agendada por direção: o canal do ABP é FIFO
+        self.recorder = None  # Gravador/verificador de eventos do módulo replay
+        self.stats = Statistics(self.clock)
+        self.sender = ABPSender(self, send_queue=send_queue, timeout=timeout)
+        self.receiver = ABPReceiver(self)
+
+    def __getstate__(self):
+        # Snapshots (pickle) levam todo o estado, menos o recorder (arquivo aberto)
+        state = self.__dict__.copy()
+        state["recorder"] = None
+        return state
+
+    @property
+    def current_time(self):
+        return self.clock.now()
+        
+    def to_layer3(self, AorB, packet):
+        """ Envia o pacote para a camada 3 """
+        self.stats.packets_transmitted += 1
+        data = packet.to_bytes()
+        if self.channels is None:
+            delay = 5.0  # Simula atraso de rede
+        else:
+            lost, bit, delay = self.channels[AorB].draw()
+            if lost:
+                self.stats.packets_lost += 1
+                if tracing.writer:
+                    tracing.writer.write(self.current_time, tracing.LOSS, AorB, packet.seqnum, packet.acknum)
+                if tracing.info:
+                    tracing.log(f"Time {self.current_time:.1f}: packet lost in the channel: {packet}")
+                return
+            if bit is not None:
+                data = channel.flip_bit(data, bit)
+                if tracing.writer:
+                    tracing.writer.write(self.current_time, tracing.CORRUPT, AorB, packet.seqnum, packet.acknum)
+        # Adiciona um evento para simular a chegada do pacote, sem ultrapassar o anterior da direção
+        arrival = self.last_arrival[AorB] = max(self.current_time + delay, self.last_arrival[AorB])
+        if AorB == 0:
+            self.event_queue.schedule(arrival, 'A_TO_B', data)
+            if tracing.debug:
+                tracing.log(f"Time {self.current_time:.1f}: A sent to layer 3: {packet}")
+        else:
+            self.event_queue.schedule(arrival, 'B_TO_A', data)
+            if tracing.debug:
+                tracing.log(f"Time {self.current_time:.1f}: B sent to layer 3: {packet}")
+    
+    def to_layer5(self, AorB, data):
+        """ Entrega a mensagem à camada 5 (destino final) """
+        if tracing.writer:
+            tracing.writer.write(self.current_time, tracing.DELIVER, AorB, len(data))
+        if tracing.debug:
+            tracing.log(f"Time {self.current_time:.1f}: {'A' if AorB == 0 else 'B'} delivered to layer 5: {bytes(data)}")
+    
+    def start_timer(self, AorB, increment, seqnum=None):
+        """ Inicia o timer para retransmissão """
+        self.event_queue.cancel(self.timer_token)
+        self.timer_token = self.event_queue.schedule(self.current_time + increment, 'TIMER_INTERRUPT',
+                                                       priority=TIMER_PRIORITY)
+        if tracing.writer:
+            tracing.writer.write(self.current_time, tracing.TIMER_START)
+        if tracing.debug:
+            tracing.log(f"Time {self.current_time:.1f}: Timer started")
+    
+    def stop_timer(self, AorB, seqnum=None):
+        """ Para o timer (cancelando o evento de timeout pendente) """
+        self.event_queue.cancel(self.timer_token)
+        self.timer_token = None
+        if tracing.writer:
+            tracing.writer.write(self.current_time, tracing.TIMER_STOP)
+        if tracing.debug:
+            tracing.log(f"Time {self.current_time:.1f}: Timer stopped")
+    
+    def A_output(self, data):
+        """ A envia uma mensagem; devolve False (would-block) se a fila de envio estiver cheia """
+        return self.sender.output(Message(data))
     
     def run_simulation(self, messages):
         """ Executa a simulação com múltiplas mensagens """
         for msg in messages:
-            self.A_output(msg)
-            self.run_events()
-            print("\n--- Simulation paused ---\n")
+            while not self.A_output(msg):
+                self.run_events()  # Fila cheia: deixar a rede esvaziá-la antes de produzir mais
+        self.run_events()
     
     def run_events(self):
         """ Processa eventos da fila até que ela esteja vazia """
         while self.event_queue:
-            event_time, event_type, data = heapq.heappop(self.event_queue)
-            self.current_time = event_time
+            event_time, event_type, data = self.event_queue.pop()
+            self.clock.advance_to(event_time)
+            if self.recorder is not None:
+                self.recorder(event_time, event_type, data)
             
-            if event_type == 'A_TO_B':
-                self.B_input(data)
-            elif event_type == 'B_TO_A':
-                self.A_input(data)
+            if event_type in ('A_TO_B', 'B_TO_A'):
+                try:
+                    packet = Packet.from_bytes(data)
+                except wire.DecodeError as e:
+                    if tracing.info:
+                        tracing.log(f"Time {self.current_time:.1f}: Invalid datagram dropped: {e}")
+                    continue
+                if event_type == 'A_TO_B':
+                    self.receiver.input(packet)
+                else:
+                    self.sender.input(packet)
             elif event_type == 'TIMER_INTERRUPT':
-                self.A_timerinterrupt()
-                
-            # Pequena pausa para melhor visualização
-            time.sleep(0.5)
+                self.timer_token = None  # Timer disparou
+                if tracing.writer:
+                    tracing.writer.write(self.current_time, tracing.TIMEOUT)
+                self.sender.timer_interrupt()
+
 
 # Teste de simulação
-def test_abp():
-    # Criar uma instância do protocolo
-    protocol = ABPProtocol()
+def test_abp(realtime=None):
+    # Criar uma instância do protocolo (realtime=0.01 reproduz a antiga pausa de 0,5 s por evento)
+    protocol = ABPProtocol(create_clock(realtime))
     
     # Lista de mensagens para enviar
     messages = [
@@ -162,17 +355,24 @@ def test_abp():
     
     # Simulação com perda de pacote
     print("\n\n--- Simulation with packet loss ---\n")
-    protocol = ABPProtocol()
+    protocol = ABPProtocol(create_clock(realtime))
     
     # Enviar mensagem
     protocol.A_output("Message that will be lost")
     
     # Remover evento de transmissão para simular perda
-    protocol.event_queue = [evt for evt in protocol.event_queue if evt[1] != 'A_TO_B']
-    heapq.heapify(protocol.event_queue)
+    protocol.event_queue.cancel_all('A_TO_B')
     
     # Rodar simulação - deveria ocorrer timeout e retransmissão
     protocol.run_events()
 
+    # Simulação sobre o mesmo modelo de canal do gbn.py: perda e corrupção nas duas direções
+    print("\n\n--- Simulation over a lossy channel ---\n")
+    channels = tuple(channel.Channel(channel.IndependentLoss(0.2), channel.UniformLatency(2.0, 4.0),
+                                     corruption_rate=0.05, seed=seed) for seed in (1, 2))
+    protocol = ABPProtocol(create_clock(realtime), channels=channels)
+    protocol.run_simulation(messages)
+
 if __name__ == "__main__":
-    test_abp()
+    # Uso: python abp.py [VELOCIDADE]  (ex.: 0.01 para acompanhar os eventos em tempo real)
+    test_abp(float(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,155 @@
+import argparse
+import json
+import sys
+import time
+
+import gbn
+import tracing
+import wire
+
+# Benchmark comparativo dos protocolos: todos rodam no mesmo núcleo
+# (NetworkSimulator), com o mesmo canal e a mesma carga, em um conjunto fixo
+# de cenários. Com semente fixa as métricas simuladas (goodput, latência,
+# retransmissões, eventos) são determinísticas; só os eventos/s dependem da
+# máquina. O baseline gravado com --save serve para --check acusar regressões:
+# métricas que pioraram além da tolerância fazem o comando sair com erro.
+# Toda execução confere as mensagens entregues com as enviadas (config.verify):
+# se algum protocolo entregar dados errados, nada é comparado nem gravado.
+# O ABP só funciona em canal FIFO, então o simulador nunca reordena os pacotes
+# dele; no cenário "ideal" todos os protocolos usam o canal FIFO (comparação
+# direta, sem perda nem reordenação), e nos demais GBN e SR enfrentam também a
+# reordenação dos atrasos aleatórios.
+
+DURATION = 20000    # ms simulados por execução
+SEED = 1
+REPEAT = 3          # Execuções por ponto; vale a mais rápida (o resultado simulado é idêntico)
+MTU = wire.HEADER_SIZE + 100  # Mensagens de até 100 bytes em um pacote só: o ABP não fragmenta
+BASELINE = "bench_baseline.json"
+TOLERANCE = 0.05        # Piora relativa aceita nas métricas simuladas
+SPEED_TOLERANCE = 0.30  # Piora relativa aceita em eventos/s (ruído da máquina)
+
+SCENARIOS = {
+    "ideal": dict(loss_rate=0.0, corruption_rate=0.0, fifo=True),
+    "perda": dict(loss_rate=0.1),
+    "rajadas": dict(loss_rate=0.1, loss_model="gilbert", burst_length=4.0),
+    "pareto": dict(loss_rate=0.05, latency_model="pareto"),
+    "gargalo": dict(loss_rate=0.0, corruption_rate=0.0, bandwidth=48000, queue_limit=8),
+}
+
+# Métrica -> +1 se maior é melhor, -1 se menor é melhor, 0 se só informativa
+METRICS = {"events": 0, "events_per_s": 1, "goodput": 1, "bytes_per_s": 1, "retransmission_ratio": -1,
+           "latency_p50": -1, "latency_p99": -1, "latency_p999": -1}
+
+
+def run_point(protocol, scenario, duration=DURATION, seed=SEED, repeat=REPEAT):
+    """ Executa um protocolo em um cenário e devolve as métricas """
+    best = None
+    for _ in range(repeat):
+        config = gbn.SimulationConfig(protocol=protocol, seed=seed, mtu=MTU, verify=True, **SCENARIOS[scenario])
+        simulator = gbn.NetworkSimulator(config)
+        start = time.perf_counter()
+        stats = simulator.run_simulation(duration)
+        wall = time.perf_counter() - start
+        if best is None or wall < best[0]:
+            best = (wall, simulator, stats)
+    wall, simulator, stats = best
+    events = simulator.events.processed
+    latency = stats.latency
+    return {"events": events, "events_per_s": events / wall, "delivery_errors": stats.delivery_errors,
+            "goodput": stats.goodput(),
+            "bytes_per_s": stats.bytes_delivered / max(stats.elapsed(), 0.001) * 1000,
+            "retransmission_ratio": stats.retransmission_ratio(), "latency_p50": latency.percentile(0.5),
+            "latency_p99": latency.percentile(0.99), "latency_p999": latency.percentile(0.999)}
+
+
+def run_suite(protocols, scenarios, duration=DURATION, seed=SEED, repeat=REPEAT):
+    """ Resultados por "cenário/protocolo", na ordem dos cenários """
+    return {f"{scenario}/{protocol}": run_point(protocol, scenario, duration, seed, repeat)
+            for scenario in scenarios for protocol in protocols}
+
+
+def print_table(results):
+    print(f"{'Cenário/protocolo':<18}{'Eventos/s':>12}{'Goodput':>10}{'kB/s':>9}{'Retx.':>7}"
+          f"{'Lat. p50':>10}{'p99':>10}{'p99.9':>10}")
+    for key, row in results.items():
+        print(f"{key:<18}{row['events_per_s']:>12.0f}{row['goodput']:>10.2f}{row['bytes_per_s'] / 1000:>9.2f}"
+              f"{row['retransmission_ratio']:>7.2f}{row['latency_p50']:>10.1f}{row['latency_p99']:>10.1f}"
+              f"{row['latency_p999']:>10.1f}")
+    print("(goodput em pacotes/s e latências das mensagens em ms, no relógio simulado)")
+
+
+def compare(results, baseline, tolerance=TOLERANCE, speed_tolerance=SPEED_TOLERANCE):
+    """ Diferenças em relação ao baseline como (chave, métrica, antes, agora, regressão) """
+    changes = []
+    for key, row in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, direction in METRICS.items():
+            before, after = reference[metric], row[metric]
+            limit = speed_tolerance if metric == "events_per_s" else tolerance
+            if abs(after - before) <= limit * abs(before):
+                continue
+            worse = direction * (after - before) < 0
+            # A velocidade só interessa quando piora; mudanças nas métricas simuladas são sempre relatadas
+            if metric == "events_per_s" and not worse:
+                continue
+            changes.append((key, metric, before, after, worse))
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de ABP, GBN e SR no mesmo simulador e canal")
+    parser.add_argument("--protocols", default=",".join(sorted(gbn.PROTOCOLS)), help="lista separada por vírgulas")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="lista separada por vírgulas")
+    parser.add_argument("--duration", type=float, default=DURATION, help="ms simulados por execução")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="execuções por ponto (vale a mais rápida)")
+    parser.add_argument("--save", nargs="?", const=BASELINE, metavar="ARQUIVO", help="gravar os resultados como baseline")
+    parser.add_argument("--check", nargs="?", const=BASELINE, metavar="ARQUIVO",
+                        help="comparar com o baseline e sair com erro se alguma métrica piorar")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="piora relativa aceita nas métricas simuladas")
+    parser.add_argument("--speed-tolerance", type=float, default=SPEED_TOLERANCE,
+                        help="piora relativa aceita em eventos/s")
+    args = parser.parse_args(argv)
+
+    protocols = [name for name in args.protocols.split(",") if name]
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    for name in scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"cenário desconhecido: {name} (disponíveis: {', '.join(SCENARIOS)})")
+    tracing.set_level(tracing.SILENT)
+    results = run_suite(protocols, scenarios, args.duration, args.seed, args.repeat)
+    print_table(results)
+
+    # Métricas de um protocolo que entrega dados errados não valem nada: nem baseline, nem comparação
+    broken = [key for key, row in results.items() if row["delivery_errors"]]
+    if broken:
+        for key in broken:
+            print(f"ERRO: {key} entregou {results[key]['delivery_errors']} mensagens diferentes das enviadas",
+                  file=sys.stderr)
+        return 1
+
+    status = 0
+    if args.check:
+        with open(args.check) as f:
+            stored = json.load(f)
+        if (stored["duration"], stored["seed"]) != (args.duration, args.seed):
+            print(f"Baseline gravado com duration={stored['duration']} seed={stored['seed']}: não comparável",
+                  file=sys.stderr)
+            return 2
+        changes = compare(results, stored["results"], args.tolerance, args.speed_tolerance)
+        for key, metric, before, after, worse in changes:
+            print(f"{'REGRESSÃO' if worse else 'melhora'}: {key} {metric} {before:.4g} -> {after:.4g}")
+        regressions = sum(worse for *_, worse in changes)
+        print(f"{regressions} regressões em relação a {args.check}")
+        status = 1 if regressions else 0
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"duration": args.duration, "seed": args.seed, "results": results}, f, indent=2)
+            f.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import math
+import random
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele os lotes são sorteados com o módulo random
+    np = None
+
+# Modelo de canal: perda, corrupção e latência de cada datagrama, em qualquer direção.
+# Os sorteios são feitos em lotes de BATCH_SIZE e consumidos um a um, de modo que o
+# custo de RNG por pacote se reduz à leitura de uma posição de lista.
+
+BATCH_SIZE = 4096
+
+
+class BatchRng:
+    """ Gerador de lotes: numpy.random.Generator quando disponível, random.Random caso contrário """
+
+    def __init__(self, seed=None):
+        self.np = np.random.default_rng(seed) if np is not None else None
+        self.py = random.Random(seed)
+
+    def uniform(self, n, low=0.0, high=1.0):
+        if self.np is not None:
+            return self.np.uniform(low, high, n).tolist()
+        rand = self.py.random
+        span = high - low
+        return [low + span * rand() for _ in range(n)]
+
+    def pareto(self, n, alpha):
+        """ Pareto com x_m = 1 (valores >= 1) """
+        if self.np is not None:
+            return (self.np.pareto(alpha, n) + 1.0).tolist()
+        rand = self.py.random
+        exponent = -1.0 / alpha
+        return [(1.0 - rand()) ** exponent for _ in range(n)]
+
+    def geometric(self, p):
+        """ Número de tentativas (>= 1) até o primeiro sucesso de probabilidade p """
+        if p >= 1.0:
+            return 1
+        if self.np is not None:
+            return int(self.np.geometric(p))
+        return 1 + int(math.log(1.0 - self.py.random()) / math.log1p(-p))
+
+
+# Modelos de perda: batch(rng, n) devolve n booleanos (True = pacote perdido)
+
+class IndependentLoss:
+    """ Perda de Bernoulli: cada pacote é descartado com probabilidade `rate` """
+
+    def __init__(self, rate):
+        self.rate = rate
+
+    def batch(self, rng, n):
+        rate = self.rate
+        if not rate:
+            return [False] * n
+        return [u < rate for u in rng.uniform(n)]
+
+
+class GilbertElliott:
+    """ Perda em rajadas: cadeia de Markov com estados bom/ruim
+
+    p_gb é a probabilidade de passar de bom para ruim e p_bg a de voltar; em
+    cada estado o pacote se perde com loss_good/loss_bad. As permanências são
+    geométricas, então o lote é montado trecho a trecho, sem sortear a
+    transição pacote a pacote.
+    """
+
+    def __init__(self, p_gb, p_bg, loss_good=0.0, loss_bad=1.0):
+        self.p_gb = p_gb
+        self.p_bg = p_bg
+        self.loss_good = loss_good
+        self.loss_bad = loss_bad
+        self.bad = True      # Invertido no primeiro trecho: a cadeia começa no estado bom
+        self.remaining = 0   # Pacotes que restam no estado atual
+
+    @classmethod
+    def from_rate(cls, rate, burst_length):
+        """ Mesma perda média de `rate`, em rajadas de `burst_length` pacotes em média """
+        if rate >= 1.0:
+            return cls(1.0, 0.0)
+        p_bg = 1.0 / burst_length
+        return cls(rate * p_bg / (1.0 - rate), p_bg)
+
+    def batch(self, rng, n):
+        states = []
+        while len(states) < n:
+            if self.remaining == 0:
+                self.bad = not self.bad
+                leave = self.p_bg if self.bad else self.p_gb
+                self.remaining = rng.geometric(leave) if leave > 0.0 else n  # leave=0: estado absorvente
+            take = min(self.remaining, n - len(states))
+            states.extend([self.bad] * take)
+            self.remaining -= take
+        lg, lb = self.loss_good, self.loss_bad
+        if lg in (0.0, 1.0) and lb in (0.0, 1.0):
+            return [lb == 1.0 if bad else lg == 1.0 for bad in states]  # Sem sorteio dentro do estado
+        return [u < (lb if bad else lg) for u, bad in zip(rng.uniform(n), states)]
+
+
+# Modelos de latência: batch(rng, n) devolve n atrasos em ms
+
+class UniformLatency:
+    """ Atraso uniforme em [low, high] ms (o modelo original do simulador) """
+
+    def __init__(self, low=5.0, high=15.0):
+        self.low = low
+        self.high = high
+
+    def batch(self, rng, n):
+        return rng.uniform(n, self.low, self.high)
+
+
+class ParetoLatency:
+    """ Atraso de cauda pesada: base + Pareto(alpha) com média `mean_extra` ms acima da base """
+
+    def __init__(self, base=5.0, mean_extra=5.0, alpha=1.5):
+        self.base = base
+        self.alpha = alpha
+        self.scale = mean_extra * (alpha - 1) / alpha  # x_m que dá a média pedida (alpha > 1)
+
+    def batch(self, rng, n):
+        base, scale = self.base, self.scale
+        return [base + scale * x for x in rng.pareto(n, self.alpha)]
+
+
+class TraceLatency:
+    """ Atrasos medidos (ms), repetidos em ciclo a partir de uma posição sorteada """
+
+    def __init__(self, samples):
+        self.samples = [float(value) for value in samples]
+        if not self.samples:
+            raise ValueError("trace de latência vazio")
+        self.position = None
+
+    @classmethod
+    def from_file(cls, path):
+        """ Um atraso por linha; linhas vazias e comentários (#) são ignorados """
+        with open(path) as f:
+            return cls(line.split()[0] for line in f if line.strip() and not line.startswith("#"))
+
+    def batch(self, rng, n):
+        samples = self.samples
+        if self.position is None:
+            self.position = int(rng.uniform(1)[0] * len(samples))
+        out = []
+        while len(out) < n:
+            chunk = samples[self.position:self.position + n - len(out)]
+            out.extend(chunk)
+            self.position = (self.position + len(chunk)) % len(samples)
+        return out
+
+
+class Channel:
+    """ Uma direção do enlace: combina perda, corrupção e latência pré-sorteadas em lotes """
+
+    def __init__(self, loss=None, latency=None, corruption_rate=0.0, seed=None, batch_size=BATCH_SIZE):
+        self.loss = loss or IndependentLoss(0.0)
+        self.latency = latency or UniformLatency()
+        self.corruption_rate = corruption_rate
+        self.rng = BatchRng(seed)
+        self.batch_size = batch_size
+        self.index = batch_size  # Força o sorteio do primeiro lote
+        self.dropped = 0
+        self.corrupted = 0
+
+    def refill(self):
+        n = self.batch_size
+        self.lost = self.loss.batch(self.rng, n)
+        self.delays = self.latency.batch(self.rng, n)
+        # Um único uniforme decide se há corrupção e, reescalado, qual bit inverter
+        self.corrupt_draws = self.rng.uniform(n) if self.corruption_rate else None
+        self.index = 0
+
+    def draw(self):
+        """ Destino do próximo datagrama: (perdido, bit_corrompido ou None, latência_ms)
+
+        bit_corrompido é uma fração em [0, 1) da posição do bit a inverter.
+        """
+        if self.index >= self.batch_size:
+            self.refill()
+        i = self.index
+        self.index = i + 1
+        if self.lost[i]:
+            self.dropped += 1
+            return True, None, 0.0
+        bit = None
+        if self.corrupt_draws is not None:
+            u = self.corrupt_draws[i]
+            if u < self.corruption_rate:
+                self.corrupted += 1
+                bit = u / self.corruption_rate
+        return False, bit, self.delays[i]
+
+    def apply(self, data):
+        """ Interface do NetemShim: (atraso_em_ms, datagrama) ou None se o datagrama for descartado """
+        lost, bit, delay = self.draw()
+        if lost:
+            return None
+        if bit is not None:
+            data = flip_bit(data, bit)
+        return delay, data
+
+
+def flip_bit(data, fraction):
+    """ Cópia do datagrama com o bit na posição `fraction` (em [0, 1)) invertido """
+    data = bytearray(data)
+    position = int(fraction * len(data) * 8)
+    data[position >> 3] ^= 1 << (position & 7)
+    return data
+
+
+LOSS_MODELS = ("independent", "gilbert")
+LATENCY_MODELS = ("uniform", "pareto", "trace")
+
+
+def create(config, seed=None):
+    """ Canal de uma direção a partir dos campos de perda/latência da SimulationConfig """
+    if config.loss_model == "gilbert":
+        loss = GilbertElliott.from_rate(config.loss_rate, config.burst_length)
+    elif config.loss_model == "independent":
+        loss = IndependentLoss(config.loss_rate)
+    else:
+        raise ValueError(f"modelo de perda desconhecido: {config.loss_model!r}")
+    if config.latency_model == "uniform":
+        latency = UniformLatency()
+    elif config.latency_model == "pareto":
+        latency = ParetoLatency()
+    elif config.latency_model == "trace":
+        latency = TraceLatency.from_file(config.latency_trace)
+    else:
+        raise ValueError(f"modelo de latência desconhecido: {config.latency_model!r}")
+    return Channel(loss, latency, config.corruption_rate, seed)
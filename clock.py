@@ -0,0 +1,57 @@
+import time
+
+# Todos os relógios medem o tempo em milissegundos, a unidade usada pelos simuladores
+
+
+class VirtualClock:
+    """ Tempo puramente simulado: avança direto para o próximo evento, sem esperar """
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def advance_to(self, event_time):
+        self.time = event_time
+
+
+class RealTimeClock(VirtualClock):
+    """ Tempo simulado cadenciado pelo relógio de parede
+
+    speed é quantos ms simulados passam a cada ms real: 1.0 roda em tempo real,
+    0.1 roda dez vezes mais devagar (útil para acompanhar a saída no terminal).
+    """
+
+    def __init__(self, speed=1.0, start=0.0):
+        super().__init__(start)
+        self.speed = speed
+        self.wall_start = time.perf_counter()
+        self.sim_start = start
+
+    def advance_to(self, event_time):
+        target = self.wall_start + (event_time - self.sim_start) / 1000 / self.speed
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.time = event_time
+
+
+class WallClock:
+    """ Relógio de parede monotônico, para os backends que rodam sobre a rede real """
+
+    def __init__(self):
+        self.start = time.monotonic()
+
+    def now(self):
+        return (time.monotonic() - self.start) * 1000
+
+    def advance_to(self, event_time):
+        pass
+
+
+def create_clock(realtime=None):
+    """ VirtualClock por padrão; RealTimeClock(realtime) se um fator de velocidade for dado """
+    if realtime:
+        return RealTimeClock(speed=realtime)
+    return VirtualClock()
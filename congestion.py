@@ -0,0 +1,149 @@
+import csv
+
+# Janela de congestionamento (cwnd) medida em pacotes; tempos em ms
+
+DUP_ACK_THRESHOLD = 3  # ACKs duplicados que disparam a retransmissão rápida
+
+
+class CongestionControl:
+    """ Base dos algoritmos: mantém cwnd/ssthresh e, se pedido, o histórico para gráficos """
+
+    name = "none"
+
+    def __init__(self, now=0.0, initial_cwnd=1.0, initial_ssthresh=64.0):
+        self.cwnd = initial_cwnd
+        self.ssthresh = initial_ssthresh
+        self.dup_acks = 0
+        self.in_recovery = False
+        self.history = None  # Lista de (tempo, cwnd, ssthresh) depois de keep_history(); cresce a cada ACK
+
+    def window(self):
+        """ Número de pacotes que podem estar em trânsito """
+        return max(1, int(self.cwnd))
+
+    def keep_history(self, now):
+        """ Passa a registrar cada mudança de cwnd/ssthresh (para write_history) """
+        if self.history is None:
+            self.history = [(now, self.cwnd, self.ssthresh)]
+
+    def record(self, now):
+        if self.history is not None:
+            self.history.append((now, self.cwnd, self.ssthresh))
+
+    def on_ack(self, acked, now, rtt=None):
+        """ ACK novo confirmando `acked` pacotes """
+        self.dup_acks = 0
+        if self.in_recovery:
+            # Fim da recuperação rápida: desinflar a janela
+            self.in_recovery = False
+            self.cwnd = self.ssthresh
+        else:
+            self.increase(acked, now, rtt)
+        self.record(now)
+
+    def on_dup_ack(self, now):
+        """ ACK duplicado; devolve True quando a retransmissão rápida deve ocorrer """
+        self.dup_acks += 1
+        if self.dup_acks == DUP_ACK_THRESHOLD and not self.in_recovery:
+            self.reduce(now)
+            self.cwnd = self.ssthresh + DUP_ACK_THRESHOLD
+            self.in_recovery = True
+            self.record(now)
+            return True
+        if self.in_recovery:
+            self.cwnd += 1  # Cada ACK duplicado indica um pacote que saiu da rede
+            self.record(now)
+        return False
+
+    def on_timeout(self, now):
+        self.reduce(now)
+        self.cwnd = 1.0
+        self.dup_acks = 0
+        self.in_recovery = False
+        self.record(now)
+
+    def increase(self, acked, now, rtt):
+        raise NotImplementedError
+
+    def reduce(self, now):
+        raise NotImplementedError
+
+
+class Reno(CongestionControl):
+    """ Slow start + AIMD (incremento aditivo, redução multiplicativa pela metade) """
+
+    name = "reno"
+
+    def increase(self, acked, now, rtt):
+        for _ in range(acked):
+            if self.cwnd < self.ssthresh:
+                self.cwnd += 1                # Slow start: dobra a cada RTT
+            else:
+                self.cwnd += 1 / self.cwnd    # Congestion avoidance: +1 por RTT
+
+    def reduce(self, now):
+        self.ssthresh = max(self.cwnd / 2, 2.0)
+
+
+class Cubic(CongestionControl):
+    """ Crescimento cúbico em função do tempo desde a última perda (RFC 8312) """
+
+    name = "cubic"
+    C = 0.4      # Agressividade da curva
+    BETA = 0.7   # Fator de redução da janela
+
+    def __init__(self, now=0.0, initial_cwnd=1.0, initial_ssthresh=64.0):
+        super().__init__(now, initial_cwnd, initial_ssthresh)
+        self.w_max = 0.0
+        self.epoch_start = None
+        self.k = 0.0
+        self.srtt = None
+
+    def increase(self, acked, now, rtt):
+        if rtt is not None:
+            self.srtt = rtt if self.srtt is None else 0.875 * self.srtt + 0.125 * rtt
+        if self.cwnd < self.ssthresh:
+            self.cwnd += acked
+            return
+        if self.epoch_start is None:
+            self.epoch_start = now
+            if self.cwnd < self.w_max:
+                self.k = ((self.w_max - self.cwnd) / self.C) ** (1 / 3)
+            else:
+                self.k = 0.0
+                self.w_max = self.cwnd
+        srtt = self.srtt or 0.0
+        t = (now + srtt - self.epoch_start) / 1000  # Segundos, olhando um RTT à frente
+        target = self.C * (t - self.k) ** 3 + self.w_max
+        # Região "TCP-friendly": nunca crescer mais devagar que o Reno
+        if srtt:
+            w_est = self.w_max * self.BETA + 3 * (1 - self.BETA) / (1 + self.BETA) * (now - self.epoch_start) / srtt
+            target = max(target, w_est)
+        if target > self.cwnd:
+            self.cwnd += acked * (target - self.cwnd) / self.cwnd
+        else:
+            self.cwnd += acked * 0.01 / self.cwnd
+
+    def reduce(self, now):
+        self.w_max = self.cwnd
+        self.ssthresh = max(self.cwnd * self.BETA, 2.0)
+        self.epoch_start = None
+
+
+ALGORITHMS = {cls.name: cls for cls in (Reno, Cubic)}
+
+
+def create(name, now=0.0):
+    """ Instancia o algoritmo pelo nome ('reno' ou 'cubic') """
+    try:
+        return ALGORITHMS[name](now)
+    except KeyError:
+        raise ValueError(f"algoritmo de congestionamento desconhecido: {name!r}") from None
+
+
+def write_history(history, path):
+    """ Exporta a evolução de cwnd/ssthresh em CSV (tempo_ms, cwnd, ssthresh) """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time_ms", "cwnd", "ssthresh"])
+        writer.writerows(history)
@@ -0,0 +1,143 @@
+import wire
+
+# Interface comum dos endpoints de protocolo (ABP, Go-Back-N, Selective Repeat)
+# e as unidades de dados que eles trocam.
+#
+# Um endpoint só conversa com a "rede" que recebe no construtor, que oferece:
+#   to_layer3(lado, pacote)                  transmite um Packet pelo canal
+#   to_layer5(lado, dados)                   entrega uma mensagem completa
+#   start_timer(lado, ms, seqnum=None)       arma o timer (um por lado, ou por seqnum)
+#   stop_timer(lado, seqnum=None)
+#   current_time                             relógio da simulação (ms)
+#   stats                                    contadores (stats.Statistics)
+# NetworkSimulator/Flow, UdpNetwork e ABPProtocol implementam essa interface,
+# de modo que qualquer par de endpoints roda sobre qualquer um deles. O lado é
+# 0 para A e 1 para B; os timers de um remetente usam o seu lado como entidade.
+
+
+class Message:
+    def __init__(self, data):
+        self.data = wire.to_bytes(data)  # Sem limite de tamanho: o Sender fragmenta conforme a MTU
+        self.size = len(self.data)
+
+class Packet:
+    __slots__ = ("seqnum", "acknum", "flags", "window", "flow", "msg_id", "offset", "payload", "checksum",
+                 "tsval", "tsecr", "timestamp", "retransmissions")
+
+    def __init__(self, seqnum=0, acknum=0, payload=b"", flags=0, msg_id=0, offset=0, window=0, flow=0, check=None,
+                 tsval=0, tsecr=0):
+        self.seqnum = seqnum
+        self.acknum = acknum
+        self.flags = flags
+        self.window = window  # Janela anunciada pelo receptor (ACKs): aceita até acknum + window
+        self.flow = flow      # Fluxo do pacote; preenchido pela rede ao transmitir
+        self.msg_id = msg_id  # Mensagem à qual o fragmento pertence
+        self.offset = offset  # Posição do fragmento dentro da mensagem
+        self.payload = wire.to_bytes(payload)
+        self.tsval = tsval    # Opção de timestamps (só vai para a rede com FLAG_TIMESTAMP)
+        self.tsecr = tsecr
+        self.checksum = self.calculate_checksum() if check is None else check
+        self.timestamp = 0.0  # Instante do último envio, no relógio da simulação (ms)
+        self.retransmissions = 0
+
+    def wire_payload(self):
+        # A opção de timestamps vai à frente do payload, dentro do campo length
+        if self.flags & wire.FLAG_TIMESTAMP:
+            return wire.TIMESTAMPS.pack(self.tsval, self.tsecr) + self.payload
+        return self.payload
+
+    def calculate_checksum(self):
+        return wire.checksum(self.seqnum, self.acknum, self.flags, self.wire_payload(), self.msg_id, self.offset,
+                             self.window, self.flow)
+
+    def to_bytes(self):
+        # Usa o checksum armazenado (e não um recalculado) para que a corrupção simulada chegue ao receptor
+        return wire.encode(self.seqnum, self.acknum, self.wire_payload(), self.flags, self.checksum,
+                           self.msg_id, self.offset, self.window, self.flow)
+
+    @classmethod
+    def from_bytes(cls, data):
+        seqnum, acknum, flags, window, flow, msg_id, offset, payload, checksum = wire.decode(data)
+        packet = cls.__new__(cls)
+        packet.seqnum = seqnum
+        packet.acknum = acknum
+        packet.flags = flags
+        packet.window = window
+        packet.flow = flow
+        packet.msg_id = msg_id
+        packet.offset = offset
+        if flags & wire.FLAG_TIMESTAMP:
+            if len(payload) < wire.TIMESTAMPS.size:
+                raise wire.DecodeError(f"opção de timestamps truncada ({len(payload)} bytes)")
+            packet.tsval, packet.tsecr = wire.TIMESTAMPS.unpack_from(payload)
+            payload = payload[wire.TIMESTAMPS.size:]
+        else:
+            packet.tsval = packet.tsecr = 0
+        packet.payload = payload  # memoryview sobre o datagrama, sem cópia
+        packet.checksum = checksum
+        packet.timestamp = 0.0
+        packet.retransmissions = 0
+        return packet
+    
+    def __str__(self):
+        return f"Packet(seq={self.seqnum}, ack={self.acknum}, payload={bytes(self.payload[:20])}{'...' if len(self.payload) > 20 else ''}, size={len(self.payload)})"
+
+
+class SenderEndpoint:
+    """ Remetente: aceita mensagens da camada 5 e as entrega de forma confiável
+
+    A rede chama input() com cada pacote que chega a este lado e
+    timer_interrupt() quando o timer vence (timer_interrupt(seqnum) nos
+    protocolos com um timer por pacote).
+    """
+
+    side = 0
+    on_writable = None  # Chamado quando a fila volta a aceitar mensagens após uma recusa
+    fifo = False        # True se o protocolo só é correto sobre um canal que não reordena
+
+    def writable(self):
+        """ True se output() aceitaria uma mensagem agora """
+        raise NotImplementedError
+
+    def idle(self):
+        """ True se não há mensagens na fila nem pacotes aguardando confirmação """
+        raise NotImplementedError
+
+    def queued(self):
+        """ Mensagens aceitas que ainda não viraram pacotes """
+        raise NotImplementedError
+
+    def in_flight(self):
+        """ Pacotes enviados e ainda não confirmados """
+        raise NotImplementedError
+
+    def output(self, message):
+        """ Entrega não bloqueante de um Message; False (would-block) se a fila estiver cheia """
+        raise NotImplementedError
+
+    def input(self, packet):
+        raise NotImplementedError
+
+    def timer_interrupt(self):
+        raise NotImplementedError
+
+
+class ReceiverEndpoint:
+    """ Receptor: confirma os pacotes e entrega as mensagens em ordem à camada 5 """
+
+    side = 1
+    reorders = False  # True se guarda o que chega fora de ordem (a FEC então só reentrega o reconstruído)
+
+    def input(self, packet):
+        raise NotImplementedError
+
+    def pause(self):
+        """ A aplicação para de ler; as mensagens ficam retidas (protocolos com janela anunciada) """
+        raise NotImplementedError
+
+    def resume(self):
+        """ A aplicação volta a ler e recebe as mensagens retidas """
+        raise NotImplementedError
+
+    def ack_timeout(self):
+        """ Timer de ACK atrasado (entidade ACK_TIMER + lado) venceu """
@@ -0,0 +1,169 @@
+import struct
+from collections import deque
+
+import wire
+
+# Correção de erros à frente (FEC) por paridade XOR, no espírito da RFC 5109:
+# a cada grupo de k datagramas de dados o remetente envia um datagrama de
+# paridade com o XOR de todos eles (completados com zeros até o maior). Se
+# exatamente um datagrama do grupo não chegar (perdido ou corrompido), o
+# receptor o reconstrói com a paridade e os outros k-1, sem retransmissão.
+#
+# Os datagramas do grupo são identificados pelo próprio checksum (CRC32 do
+# cabeçalho e payload), que a paridade lista em ordem de envio:
+#   count (u8) | count x checksum (u32) | XOR dos tamanhos (u16) | XOR dos datagramas
+# Assim o receptor não precisa de números de sequência extras no cabeçalho, e
+# retransmissões idênticas de um mesmo pacote contam como o mesmo datagrama.
+
+GROUP = 4       # k padrão: uma paridade a cada 4 datagramas (taxa de código 4/5)
+GROUP_MAX = 255  # Limite do campo count
+HISTORY = 256   # Datagramas recebidos guardados para reconstrução
+PENDING = 64    # Grupos ainda com mais de um datagrama faltando
+
+_COUNT = struct.Struct("!B")
+_LENGTH = struct.Struct("!H")
+_CHECKSUM = struct.Struct("!I")
+
+
+def xor_into(accumulator, data):
+    """ accumulator ^= data, estendendo o acumulador com zeros se data for maior """
+    n = len(data)
+    if len(accumulator) < n:
+        accumulator.extend(bytes(n - len(accumulator)))
+    value = int.from_bytes(accumulator[:n], "big") ^ int.from_bytes(data, "big")
+    accumulator[:n] = value.to_bytes(n, "big")
+
+
+def code_rate(k):
+    """ Fração útil do tráfego com uma paridade a cada k datagramas """
+    return k / (k + 1)
+
+
+class XorEncoder:
+    """ Acumula a paridade do grupo corrente de um sentido """
+
+    def __init__(self, k=GROUP):
+        if not 2 <= k <= GROUP_MAX:
+            raise ValueError(f"grupo FEC de {k} datagramas fora do intervalo 2 a {GROUP_MAX}")
+        self.k = k
+        self.checksums = []
+        self.parity = bytearray()
+        self.length = 0
+
+    def add(self, checksum, datagram):
+        """ Acrescenta um datagrama ao grupo; devolve o payload da paridade quando o grupo fecha """
+        self.checksums.append(checksum)
+        self.length ^= len(datagram)
+        xor_into(self.parity, datagram)
+        if len(self.checksums) < self.k:
+            return None
+        payload = bytearray(_COUNT.pack(self.k))
+        for value in self.checksums:
+            payload += _CHECKSUM.pack(value)
+        payload += _LENGTH.pack(self.length)
+        payload += self.parity
+        self.checksums = []
+        self.parity = bytearray()
+        self.length = 0
+        return bytes(payload)
+
+
+class _Group:
+    __slots__ = ("checksums", "missing", "parity", "length")
+
+    def __init__(self, checksums, parity, length):
+        self.checksums = checksums  # Ordem de envio
+        self.missing = set()        # Checksums ainda não recebidos; None depois de resolvido ou descartado
+        self.parity = parity
+        self.length = length
+
+
+class XorDecoder:
+    """ Reconstrói datagramas perdidos de um sentido a partir das paridades
+
+    data() e parity() devolvem uma lista de recuperações; cada uma é a lista dos
+    datagramas do grupo a partir do reconstruído, em ordem de envio (os seguintes
+    saem do histórico, para receptores que descartam o que chega fora de ordem).
+    """
+
+    def __init__(self, history=HISTORY, pending=PENDING):
+        self.received = {}       # checksum -> datagrama íntegro
+        self.order = deque()     # Checksums em ordem de chegada, para limitar o histórico
+        self.history = history
+        self.waiting = {}        # checksum faltante -> grupos que dependem dele
+        self.groups = deque()    # Grupos pendentes, do mais antigo ao mais novo
+        self.pending = pending
+        self.recovered = 0
+        self.failed = 0          # Grupos descartados com mais de um datagrama faltando
+
+    def _remember(self, checksum, datagram):
+        self.received[checksum] = datagram
+        self.order.append(checksum)
+        if len(self.order) > self.history:
+            self.received.pop(self.order.popleft(), None)
+
+    def data(self, checksum, datagram):
+        """ Um datagrama íntegro chegou; devolve as recuperações que ele completou """
+        if checksum in self.received:
+            return []
+        self._remember(checksum, datagram)
+        groups = self.waiting.pop(checksum, None)
+        if not groups:
+            return []
+        recoveries = []
+        for group in groups:
+            if group.missing is None:
+                continue
+            group.missing.discard(checksum)
+            group.length ^= len(datagram)
+            xor_into(group.parity, datagram)
+            recoveries.extend(self._resolve(group))
+        return recoveries
+
+    def parity(self, payload):
+        """ Uma paridade chegou; devolve as recuperações possíveis com ela """
+        (count,) = _COUNT.unpack_from(payload, 0)
+        offset = _COUNT.size
+        checksums = [_CHECKSUM.unpack_from(payload, offset + i * _CHECKSUM.size)[0] for i in range(count)]
+        offset += count * _CHECKSUM.size
+        (length,) = _LENGTH.unpack_from(payload, offset)
+        group = _Group(checksums, bytearray(payload[offset + _LENGTH.size:]), length)
+        for checksum in checksums:
+            datagram = self.received.get(checksum)
+            if datagram is None:
+                group.missing.add(checksum)
+            else:
+                group.length ^= len(datagram)
+                xor_into(group.parity, datagram)
+        if len(group.missing) > 1:
+            # Espera os outros datagramas (podem só estar atrasados); os grupos mais antigos desistem
+            for checksum in group.missing:
+                self.waiting.setdefault(checksum, []).append(group)
+            self.groups.append(group)
+            if len(self.groups) > self.pending:
+                stale = self.groups.popleft()
+                if stale.missing is not None:
+                    stale.missing = None
+                    self.failed += 1
+            return []
+        return self._resolve(group)
+
+    def _resolve(self, group):
+        if len(group.missing) > 1:
+            return []
+        if not group.missing:
+            group.missing = None  # Nada perdido: a paridade não é necessária
+            return []
+        (checksum,) = group.missing
+        group.missing = None
+        datagram = bytes(group.parity[:group.length])
+        # Confere o campo de checksum do datagrama reconstruído; o receptor ainda verifica o CRC
+        if len(datagram) < wire.HEADER_SIZE or \
+                _CHECKSUM.unpack_from(datagram, wire.CHECKSUM_OFFSET)[0] != checksum:
+            self.failed += 1
+            return []
+        self.recovered += 1
+        chained = self.data(checksum, datagram)
+        index = group.checksums.index(checksum)
+        following = [self.received[value] for value in group.checksums[index + 1:] if value in self.received]
+        return [[datagram] + following] + chained
@@ -0,0 +1,61 @@
+class Reassembler:
+    """ Remonta mensagens a partir de fragmentos identificados por (msg_id, offset)
+
+    Fragmentos contíguos são anexados a um bytearray (custo linear no tamanho
+    da mensagem); os que chegam adiantados esperam em um dicionário por offset.
+    Mensagens incompletas sem novos fragmentos por mais de `timeout` ms são
+    descartadas. `fragments` conta os fragmentos retidos (a ocupação que o
+    receptor desconta da janela anunciada).
+    """
+
+    def __init__(self, timeout=5000.0):
+        self.timeout = timeout
+        # msg_id -> [dados contíguos, pendentes por offset, tamanho total, último instante, fragmentos]
+        self.partial = {}
+        self.expired = 0
+        self.last_sweep = 0.0
+        self.fragments = 0   # Fragmentos retidos em mensagens incompletas
+        self.completed = 0   # Fragmentos da última mensagem devolvida por feed()
+
+    def feed(self, msg_id, offset, payload, last, now):
+        """ Acrescenta um fragmento; devolve a mensagem completa (bytes) ou None """
+        if now - self.last_sweep >= self.timeout:
+            self.expire(now)
+
+        entry = self.partial.get(msg_id)
+        if entry is None:
+            if offset == 0 and last:
+                self.completed = 1
+                return bytes(payload)  # Mensagem de um único fragmento
+            entry = self.partial[msg_id] = [bytearray(), {}, None, now, 0]
+        data, pending = entry[0], entry[1]
+        entry[3] = now
+        if last:
+            entry[2] = offset + len(payload)
+
+        if offset == len(data):
+            data += payload
+            while len(data) in pending:
+                data += pending.pop(len(data))
+        elif offset > len(data) and offset not in pending:
+            pending[offset] = bytes(payload)
+        else:
+            return None  # Fragmento duplicado, já incorporado
+        entry[4] += 1
+        self.fragments += 1
+
+        if entry[2] is not None and len(data) == entry[2]:
+            del self.partial[msg_id]
+            self.fragments -= entry[4]
+            self.completed = entry[4]
+            return bytes(data)
+        return None
+
+    def expire(self, now):
+        """ Descarta remontagens paradas há mais de `timeout` ms """
+        self.last_sweep = now
+        stale = [msg_id for msg_id, entry in self.partial.items() if now - entry[3] > self.timeout]
+        for msg_id in stale:
+            self.fragments -= self.partial.pop(msg_id)[4]
+        self.expired += len(stale)
+        return len(stale)
@@ -1,399 +1,1480 @@
+import argparse
+import csv
+import functools
 import random
-import time
-from collections import defaultdict
+from collections import deque
+
+import abp
+import channel
+import congestion
+import fec
+import link
+import profiling
+import rto
+import replay
+import seqspace
+import timerwheel
+import tracing
+import wire
+from clock import create_clock
+from endpoint import Message, Packet, ReceiverEndpoint, SenderEndpoint
+from fragment import Reassembler
+from ring import ReceiveRing, SendRing
+from scheduler import TIMER_PRIORITY, EventScheduler
+from stats import Statistics
 
 # Configurações de simulação
 BUFSIZE = 64
-MAX_MESSAGE_SIZE = 1024  # Tamanho máximo de mensagem
+MTU = wire.HEADER_SIZE + 20  # Tamanho máximo do datagrama (20 bytes de payload por pacote)
+SEND_QUEUE = 64              # Mensagens aceitas na fila do remetente antes de recusar (backpressure)
+REASSEMBLY_TIMEOUT = 5000    # Tempo máximo (ms) sem novos fragmentos antes de descartar a remontagem
 PACKET_LOSS_RATE = 0.2   # Probabilidade de perda de pacote (20%)
+CORRUPTION_RATE = 0.01   # Probabilidade de corrupção de pacote (1%)
 SIMULATION_DURATION = 30  # Duração da simulação em segundos
+MESSAGE_RATE = 0.3 / 5    # Mensagens geradas por ms em cada fluxo
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+ACK_DELAY = 0             # Espera máxima (ms) do receptor antes de confirmar; 0 confirma cada segmento na hora
+ACK_EVERY = 2             # Com ACK atrasado, confirmar na hora a cada N segmentos em ordem (RFC 1122)
+ACK_TIMER = 2             # Entidade do timer de ACK atrasado: ACK_TIMER + lado do receptor (0: A, 1: B)
 
-class Statistics:
-    def __init__(self):
-        self.packets_sent = 0
-        self.packets_retransmitted = 0
-        self.packets_received = 0
-        self.packets_delivered = 0
-        self.packets_corrupted = 0
-        self.packets_lost = 0
-        self.packets_out_of_order = 0
-        self.timeouts = 0
-        self.start_time = time.time()
-        self.message_sizes = []
-        self.rtt_samples = []
-    
-    def report(self):
-        elapsed = time.time() - self.start_time
-        if elapsed == 0:
-            elapsed = 0.001  # Evitar divisão por zero
-        
-        print("\n====== ESTATÍSTICAS DE DESEMPENHO ======")
-        print(f"Duração da simulação: {elapsed:.2f} segundos")
-        print(f"Pacotes enviados: {self.packets_sent}")
-        print(f"Pacotes retransmitidos: {self.packets_retransmitted} ({self.packets_retransmitted/max(1, self.packets_sent)*100:.2f}%)")
-        print(f"Pacotes recebidos: {self.packets_received}")
-        print(f"Pacotes entregues à camada 5: {self.packets_delivered}")
-        print(f"Pacotes corrompidos: {self.packets_corrupted}")
-        print(f"Pacotes perdidos: {self.packets_lost} ({self.packets_lost/max(1, self.packets_sent)*100:.2f}%)")
-        print(f"Pacotes fora de ordem: {self.packets_out_of_order}")
-        print(f"Timeouts ocorridos: {self.timeouts}")
-        
-        throughput = self.packets_delivered / elapsed
-        print(f"Taxa de transferência: {throughput:.2f} pacotes/segundo")
-        
-        if self.message_sizes:
-            avg_size = sum(self.message_sizes) / len(self.message_sizes)
-            print(f"Tamanho médio de mensagem: {avg_size:.2f} bytes")
-        
-        if self.rtt_samples:
-            avg_rtt = sum(self.rtt_samples) / len(self.rtt_samples)
-            print(f"RTT médio: {avg_rtt:.2f} ms")
-        
-        print("========================================")
-
-# Estatísticas globais
-stats = Statistics()
-
-class Message:
-    def __init__(self, data):
-        self.data = data[:MAX_MESSAGE_SIZE]  # Limitando ao tamanho máximo
-        stats.message_sizes.append(len(data))
-
-class Packet:
-    def __init__(self, seqnum=0, acknum=0, payload=""):
-        self.seqnum = seqnum
-        self.acknum = acknum
-        self.payload = payload[:MAX_MESSAGE_SIZE]
-        self.checksum = self.calculate_checksum()
-        self.timestamp = time.time() * 1000  # Timestamp em milissegundos
-        self.retransmissions = 0
-
-    def calculate_checksum(self):
-        checksum = self.seqnum + self.acknum
-        checksum += sum(ord(char) for char in self.payload)
-        return checksum
-    
-    def __str__(self):
-        return f"Packet(seq={self.seqnum}, ack={self.acknum}, payload='{self.payload[:20]}{'...' if len(self.payload) > 20 else ''}', size={len(self.payload)})"
+class SimulationConfig:
+    """ Parâmetros de uma simulação; cada NetworkSimulator guarda a sua própria cópia """
+
+    def __init__(self, protocol="gbn", loss_rate=PACKET_LOSS_RATE, corruption_rate=CORRUPTION_RATE,
+                 window_size=8, initial_rtt=15, bufsize=BUFSIZE, seed=None, realtime=None,
+                 congestion=None, mtu=MTU, reassembly_timeout=REASSEMBLY_TIMEOUT, send_queue=SEND_QUEUE,
+                 loss_model="independent", burst_length=4.0, latency_model="uniform", latency_trace=None, fifo=False,
+                 bandwidth=None, queue_limit=link.QUEUE_LIMIT, queue_discipline="droptail", flows=1,
+                 timer_tick=timerwheel.TICK, seq_bits=seqspace.SEQ_BITS, ack_delay=ACK_DELAY,
+                 ack_every=ACK_EVERY, duplex=False, fec_group=0, min_rto=rto.MIN_RTO, max_rto=rto.MAX_RTO,
+                 timestamps=False, message_rate=MESSAGE_RATE, verify=False):
+        self.protocol = protocol
+        self.loss_rate = loss_rate
+        self.corruption_rate = corruption_rate
+        self.loss_model = loss_model        # 'independent' ou 'gilbert' (rajadas com a mesma perda média)
+        self.burst_length = burst_length    # Tamanho médio das rajadas de perda do modelo 'gilbert'
+        self.latency_model = latency_model  # 'uniform' (5-15 ms), 'pareto' ou 'trace'
+        self.latency_trace = latency_trace  # Arquivo com um atraso (ms) por linha, para 'trace'
+        self.fifo = fifo                    # Canal sem reordenação em cada direção (o ABP sempre o exige)
+        self.bandwidth = bandwidth              # bits/s do enlace gargalo; None: enlace infinitamente rápido
+        self.queue_limit = queue_limit          # Pacotes na fila do gargalo
+        self.queue_discipline = queue_discipline  # 'droptail', 'red' ou 'codel'
+        self.flows = flows  # Pares remetente/receptor compartilhando o canal
+        self.timer_tick = timer_tick  # Granularidade (ms) da roda de temporizadores
+        self.seq_bits = seq_bits      # Números de sequência de 16 ou 32 bits (aritmética da RFC 1982)
+        self.ack_delay = ack_delay    # ACK atrasado (ms); 0 confirma cada segmento imediatamente
+        self.ack_every = ack_every    # Segmentos em ordem acumulados antes de confirmar sem esperar o timer
+        self.duplex = duplex          # B também envia dados; os ACKs pegam carona nos dados do sentido oposto
+        self.fec_group = fec_group    # FEC XOR: uma paridade a cada fec_group pacotes de dados (0 desliga)
+        self.min_rto = min_rto        # Limites do RTO (ms), RFC 6298 escalada para os RTTs simulados
+        self.max_rto = max_rto
+        self.timestamps = timestamps  # Eco de timestamps nos pacotes: amostras de RTT também em retransmissões
+        self.message_rate = message_rate  # Mensagens aleatórias por ms em cada fluxo; 0 desliga o gerador
+        self.verify = verify          # Conferir cada mensagem entregue com a enviada (guarda as mensagens em trânsito)
+        if not 0 < min_rto <= max_rto:
+            raise ValueError(f"limites de RTO inválidos: min_rto={min_rto} max_rto={max_rto}")
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"protocolo desconhecido: {protocol}")
+        if latency_model == "trace" and latency_trace is None:
+            raise ValueError("latency_model='trace' precisa de um arquivo em latency_trace")
+        if duplex and protocol == "abp":
+            raise ValueError("o ABP não suporta full-duplex (não há ACK de carona)")
+        if fec_group and not 2 <= fec_group <= fec.GROUP_MAX:
+            raise ValueError(f"fec_group={fec_group} fora do intervalo 2 a {fec.GROUP_MAX}")
+        if ack_delay < 0 or ack_every < 1:
+            raise ValueError(f"ack_delay={ack_delay} deve ser >= 0 e ack_every={ack_every} >= 1")
+        if not 1 <= flows <= wire.FLOW_MAX + 1:
+            raise ValueError(f"flows={flows} fora do intervalo suportado pelo cabeçalho (1 a {wire.FLOW_MAX + 1})")
+        self.window_size = window_size
+        self.initial_rtt = initial_rtt
+        self.bufsize = bufsize
+        self.seed = seed  # None usa uma semente aleatória (execução não reprodutível)
+        self.realtime = realtime  # None: relógio virtual; senão, fator de velocidade do tempo real
+        self.congestion = congestion  # None: janela fixa; 'reno' ou 'cubic': janela de congestionamento
+        self.mtu = mtu
+        self.reassembly_timeout = reassembly_timeout
+        self.send_queue = send_queue  # Limite da fila de mensagens do remetente
+        # Cada fragmento precisa levar ao menos um byte de payload além do cabeçalho e da opção de timestamps
+        overhead = wire.HEADER_SIZE + (wire.TIMESTAMPS.size if timestamps else 0)
+        if mtu <= overhead:
+            raise ValueError(f"MTU de {mtu} bytes não comporta o cabeçalho de {overhead} bytes"
+                             f"{' (com timestamps)' if timestamps else ''}")
+        if mtu > wire.HEADER_SIZE + wire.LENGTH_MAX:
+            raise ValueError(f"MTU de {mtu} bytes excede o máximo de {wire.HEADER_SIZE + wire.LENGTH_MAX} bytes "
+                             f"(payload limitado pelo campo length de 16 bits)")
+        if window_size > bufsize:
+            raise ValueError(f"window_size={window_size} não cabe no buffer de {bufsize} pacotes")
+        if not seqspace.SeqSpace(seq_bits).fits(bufsize):
+            raise ValueError(f"bufsize={bufsize} deve ser potência de dois e no máximo metade do espaço "
+                             f"de sequência de {seq_bits} bits")
 
-class Sender:
-    def __init__(self, window_size=8, initial_rtt=15):
+class Sender(SenderEndpoint):
+    def __init__(self, network, window_size=8, initial_rtt=15, bufsize=BUFSIZE, congestion_control=None, mtu=MTU,
+                 send_queue=SEND_QUEUE, seq_bits=seqspace.SEQ_BITS, side=0, min_rto=rto.MIN_RTO,
+                 max_rto=rto.MAX_RTO, timestamps=False):
+        self.network = network       # Camada 3, timers e relógio (NetworkSimulator ou UdpNetwork)
+        self.side = side             # Lado em que o remetente roda (0: A, 1: B no modo full-duplex)
+        self.receiver = None         # Receptor do mesmo lado (full-duplex): seu ACK vai de carona nos dados
+        self.stats = network.stats
+        self.bufsize = bufsize
+        # Sequências são modulares: base, nextseq, buffer_next e peer_edge dão a volta em 2**seq_bits
+        self.seq = seqspace.SeqSpace(seq_bits)
+        self.mask = self.seq.mask
+        self.timestamps = timestamps  # Opção de timestamps em todo pacote de dados: amostras de RTT sem ambiguidade
+        self.max_payload = mtu - wire.HEADER_SIZE - (wire.TIMESTAMPS.size if timestamps else 0)
+        self.send_queue = send_queue
+        self.blocked = False         # Algum output() foi recusado desde o último aviso de espaço livre
+        self.on_writable = None      # Callback chamado quando a fila volta a aceitar mensagens
         self.base = 1
         self.nextseq = 1
         self.window_size = window_size
-        self.estimated_rtt = initial_rtt
+        self.peer_edge = 1 + window_size  # Borda direita anunciada pelo receptor (até o primeiro ACK, a nossa janela)
+        self.zero_window = False  # Parado pela janela anunciada fechada; o timer armado é o persist timer
+        self.rto = rto.RtoEstimator(initial_rtt, min_rto, max_rto)  # SRTT/RTTVAR e backoff (RFC 6298)
         self.buffer_next = 1
-        self.packet_buffer = [None] * BUFSIZE
-        self.timeout_multiplier = 1  # Para backoff exponencial
-        self.max_timeout = 120       # Timeout máximo em segundos
+        self.ring = SendRing(bufsize)  # Fragmentos não confirmados, indexados por seq % bufsize
         self.timer_running = False
-        self.sent_times = {}         # Para calcular RTT
-        self.send_buffer = []        # Fila de mensagens pendentes
-        self.seq_counter = 1         # Contador de sequência
-        self.transmission_start = time.time()  # Para calcular throughput
+        self.send_buffer = deque()   # Mensagens ainda não (totalmente) fragmentadas
+        self.send_offset = 0         # Próximo byte a fragmentar da mensagem na frente da fila
+        self.send_view = None        # memoryview da mensagem na frente da fila
+        self.flow = getattr(network, "flow", 0)  # Fluxo dos pacotes (o checksum o cobre)
+        self.next_msg_id = 1
+        self.transmission_start = network.current_time  # Para calcular throughput
+        # Controle de congestionamento opcional; sem ele a janela é fixa em window_size
+        self.cc = congestion.create(congestion_control, network.current_time) if congestion_control else None
+
+    @property
+    def estimated_rtt(self):
+        return self.rto.estimated_rtt
+
+    @property
+    def rtt_dev(self):
+        return self.rto.rtt_dev
+
+    def effective_window(self):
+        # Limitada também pela janela anunciada pelo receptor (controle de fluxo)
+        if self.cc is None:
+            window = self.window_size
+        else:
+            window = min(self.cc.window(), self.bufsize)
+        return min(window, (self.peer_edge - self.base) & self.mask)  # A borda nunca fica atrás de base
+
+    def in_flight(self):
+        # Pacotes enviados e ainda não confirmados (nextseq - base no espaço modular)
+        return (self.nextseq - self.base) & self.mask
+
+    def update_peer_window(self, packet):
+        # O receptor aceita até acknum + window pacotes além do confirmado;
+        # a borda direita nunca recua, mesmo que ACKs cheguem fora de ordem
+        # Devolve True se a borda avançou (atualização de janela)
+        edge = (packet.acknum + 1 + packet.window) & self.mask
+        if self.seq.lt(self.peer_edge, edge):
+            self.peer_edge = edge
+            return True
+        return False
 
     def send_window(self):
-        while self.nextseq < self.buffer_next and self.nextseq < self.base + self.window_size:
-            packet = self.packet_buffer[self.nextseq % BUFSIZE]
-            if packet:
-                print(f"Enviando pacote {packet}")
-                self.send_packet(packet, is_retransmission=False)
-                if self.base == self.nextseq:
-                    self.start_timer()
-                self.nextseq += 1
-
-    def send_packet(self, packet, is_retransmission=False):
-        self.sent_times[packet.seqnum] = time.time() * 1000  # Timestamp em ms
+        while self.nextseq != self.buffer_next and self.in_flight() < self.effective_window():
+            self.send_next()
+        if self.base == self.nextseq and self.nextseq != self.buffer_next and not self.zero_window:
+            # Dados prontos e nada em voo: só a janela anunciada fechada segura o remetente
+            self.zero_window = True
+            self.stats.zero_window += 1
+            if tracing.info:
+                tracing.log(f"Janela anunciada fechada (borda {self.peer_edge}): aguardando atualização")
+            self.start_persist_timer()
+
+    def send_next(self):
+        # Envia o próximo fragmento do buffer circular e avança nextseq
+        self.zero_window = False
+        self.send_packet(self.nextseq, is_retransmission=False)
+        if self.base == self.nextseq:
+            self.start_timer()
+        self.nextseq = (self.nextseq + 1) & self.mask
+
+    def start_persist_timer(self):
+        # Se a atualização de janela se perder, o timer vence e probe_window() pede a janela de novo
+        self.start_timer()
+
+    def probe_window(self):
+        """ Persist timer venceu com a janela fechada: envia o próximo pacote além da borda
+
+        O receptor o aceita se tiver espaço; senão o descarta e repete o ACK com a
+        janela atual. Daí em diante é um pacote em voo, coberto pelo timer de retransmissão.
+        """
+        self.stats.window_probes += 1
+        if tracing.info:
+            tracing.log(f"Sondando a janela fechada com o pacote {self.nextseq}")
+        self.send_next()
+
+    def make_packet(self, seqnum):
+        # Monta o pacote a partir dos campos guardados no buffer circular (checksum já calculado)
+        ring = self.ring
+        i = seqnum % ring.size
+        packet = Packet(seqnum=seqnum, payload=ring.payload(seqnum), flags=ring.flags[i], msg_id=ring.msg_ids[i],
+                        offset=ring.offsets[i], flow=self.flow, check=ring.checksums[i])
+        packet.retransmissions = ring.retransmissions[i]
+        return packet
+
+    def send_packet(self, seqnum, is_retransmission=False):
+        ring = self.ring
+        i = seqnum % ring.size
+        packet = self.make_packet(seqnum)
+        now = self.network.current_time
+        packet.timestamp = ring.sent_times[i] = now  # Tempo de envio em ms
+        if self.timestamps:
+            packet.flags |= wire.FLAG_TIMESTAMP
+            packet.tsval = wire.timestamp(now)
+        if self.receiver is not None:
+            self.receiver.piggyback(packet)  # Também recalcula o checksum
+        elif self.timestamps:
+            packet.checksum = packet.calculate_checksum()
         
         if is_retransmission:
-            packet.retransmissions += 1
-            stats.packets_retransmitted += 1
-            print(f"RETRANSMISSÃO #{packet.retransmissions} para pacote {packet.seqnum}")
+            packet.retransmissions = ring.retransmissions[i] = ring.retransmissions[i] + 1
+            self.stats.packets_retransmitted += 1
+            if tracing.info:
+                tracing.log(f"RETRANSMISSÃO #{packet.retransmissions} para pacote {packet.seqnum}")
         else:
-            stats.packets_sent += 1
+            self.stats.packets_sent += 1
+            if tracing.debug:
+                tracing.log(f"Enviando pacote {packet}")
+        if tracing.writer:
+            tracing.writer.write(self.network.current_time, tracing.RETRANSMIT if is_retransmission else tracing.SEND,
+                                 self.side, packet.seqnum, packet.acknum)
         
-        # Simular perda de pacote
-        if random.random() < PACKET_LOSS_RATE:
-            stats.packets_lost += 1
-            print(f"Pacote {packet.seqnum} foi PERDIDO na transmissão!")
-            return
-        
-        # Simular corrupção ocasional (1% de chance)
-        if random.random() < 0.01:
-            corrupt_packet = Packet(
-                seqnum=packet.seqnum,
-                acknum=packet.acknum,
-                payload=packet.payload
-            )
-            # Modificar o checksum para simular corrupção
-            corrupt_packet.checksum += 1
-            to_layer3(0, corrupt_packet)
-            print(f"Pacote {packet.seqnum} foi CORROMPIDO na transmissão!")
-        else:
-            to_layer3(0, packet)
+        # Perda, corrupção e latência ficam a cargo do canal da rede (nas duas direções)
+        self.network.to_layer3(self.side, packet)
+
+    def writable(self):
+        return len(self.send_buffer) < self.send_queue
+
+    def idle(self):
+        return self.base == self.buffer_next and not self.send_buffer
+
+    def queued(self):
+        return len(self.send_buffer)
 
     def output(self, message):
-        # Se o buffer estiver cheio, enfileirar para envio posterior
-        if self.buffer_next - self.base >= BUFSIZE:
-            print(f"Buffer cheio. Enfileirando mensagem: {message.data[:20]}...")
-            self.send_buffer.append(message)
-            return
-        
-        # Fragmentar mensagens grandes em múltiplos pacotes
-        max_payload = 20  # Tamanho máximo de payload por pacote
-        data = message.data
-        
-        while data:
-            chunk = data[:max_payload]
-            data = data[max_payload:]
-            
-            print(f"Armazenando pacote (seq={self.buffer_next}): {chunk}")
-            packet = Packet(seqnum=self.buffer_next, payload=chunk)
-            self.packet_buffer[self.buffer_next % BUFSIZE] = packet
-            self.buffer_next += 1
-        
-        self.send_window()
-        
-        # Processar mensagens enfileiradas se houver espaço
+        """ Entrega não bloqueante da camada 5
+
+        Devolve False (would-block) se a fila de envio estiver cheia: a mensagem não é
+        aceita e o produtor deve tentar de novo depois do aviso on_writable.
+        """
+        if not self.writable():
+            self.blocked = True
+            self.stats.send_blocked += 1
+            if tracing.info:
+                tracing.log(f"Fila de envio cheia ({len(self.send_buffer)} mensagens). Mensagem recusada.")
+            return False
+        # Cada mensagem recebe um id; a fragmentação acontece à medida que o buffer circular libera espaço
+        message.msg_id = self.next_msg_id
+        self.next_msg_id += 1
+        if self.send_buffer and tracing.info:
+            tracing.log(f"Buffer cheio. Enfileirando mensagem {message.msg_id} ({message.size} bytes)")
+        self.send_buffer.append(message)
         self.process_queued_messages()
+        self.send_window()
+        return True
 
     def process_queued_messages(self):
-        while self.send_buffer and (self.buffer_next - self.base < BUFSIZE):
-            message = self.send_buffer.pop(0)
-            self.output(message)
+        # Fragmentar as mensagens da fila em pacotes enquanto houver espaço no buffer circular.
+        # Os fragmentos são fatias de memoryview: nenhuma cópia do restante da mensagem.
+        max_payload = self.max_payload
+        while self.send_buffer and (self.buffer_next - self.base) & self.mask < self.bufsize:
+            message = self.send_buffer[0]
+            if self.send_view is None:
+                self.send_view = memoryview(message.data)  # Uma view por mensagem, fatiada por fragmento
+            view = self.send_view
+            offset = self.send_offset
+            chunk = view[offset:offset + max_payload]
+            last = offset + len(chunk) >= len(view)
+            flags = wire.FLAG_LAST_FRAGMENT if last else 0
+
+            if tracing.debug:
+                tracing.log(f"Armazenando pacote (seq={self.buffer_next}): {bytes(chunk[:20])}")
+            check = wire.checksum(self.buffer_next, 0, flags, chunk, message.msg_id, offset, 0, self.flow)
+            self.ring.store(self.buffer_next, view, message.msg_id, offset, len(chunk), flags, check)
+            self.buffer_next = (self.buffer_next + 1) & self.mask
+
+            if last:
+                self.send_buffer.popleft()
+                self.send_offset = 0
+                self.send_view = None
+            else:
+                self.send_offset = offset + len(chunk)
+
+        if self.blocked and self.writable():
+            self.blocked = False
+            if self.on_writable is not None:
+                self.on_writable()
 
     def input(self, packet):
         # Verificar checksum
         if packet.checksum != packet.calculate_checksum():
-            print(f"ACK corrompido. Ignorando.")
+            if tracing.debug:
+                tracing.log(f"ACK corrompido. Ignorando.")
+            self.stats.packets_corrupted += 1
             return
+        opened = self.update_peer_window(packet)
         
-        # Ignorar ACKs duplicados ou mais antigos
-        if packet.acknum < self.base:
-            print(f"ACK duplicado ou antigo (ack={packet.acknum}). Ignorando.")
+        # Ignorar ACKs duplicados ou mais antigos (só confirmam algo se acknum estiver em [base, nextseq))
+        acknum = packet.acknum
+        if (acknum - self.base) & self.mask >= self.in_flight():
+            if tracing.debug:
+                tracing.log(f"ACK duplicado ou antigo (ack={acknum}). Ignorando.")
+            # Dados com ACK de carona não contam como ACK duplicado (RFC 5681)
+            if self.cc is not None and acknum == (self.base - 1) & self.mask and self.base != self.nextseq \
+                    and not packet.flags & wire.FLAG_DATA:
+                if self.cc.on_dup_ack(self.network.current_time):
+                    self.fast_retransmit()
+                self.send_window()  # A janela pode ter inflado durante a recuperação
+            elif opened:
+                self.send_window()  # Atualização de janela: a borda anunciada avançou
             return
         
-        print(f"Recebido ACK (ack={packet.acknum})")
-        
-        # Calcular RTT para adaptação do timeout
-        if packet.acknum in self.sent_times:
-            rtt = time.time() * 1000 - self.sent_times[packet.acknum]  # RTT em ms
-            stats.rtt_samples.append(rtt)
-            print(f"RTT medido: {rtt:.2f} ms")
-            
-            # Atualizar estimativa de RTT (Algoritmo de Jacobson/Karels)
-            alpha = 0.125
-            beta = 0.25
-            if not hasattr(self, 'rtt_dev'):
-                self.rtt_dev = rtt / 2  # Desvio inicial
-            
-            error = rtt - self.estimated_rtt
-            self.estimated_rtt = self.estimated_rtt + alpha * error
-            self.rtt_dev = self.rtt_dev + beta * (abs(error) - self.rtt_dev)
-            self.timeout_multiplier = 1  # Reset do multiplicador após ACK bem-sucedido
-            
-            # RTO = RTT + 4 * Desvio
-            timeout = self.estimated_rtt + 4 * self.rtt_dev
-            print(f"Timeout atualizado: {timeout:.2f} ms")
-            
-            # Remover da tabela de timestamps
-            del self.sent_times[packet.acknum]
+        if tracing.debug:
+            tracing.log(f"Recebido ACK (ack={acknum})")
         
         old_base = self.base
-        self.base = packet.acknum + 1
+        self.base = (acknum + 1) & self.mask
+        acked = (self.base - old_base) & self.mask
+        rtt = self.measure_rtt(packet, acknum)
+        # Soltar os fragmentos confirmados (e as mensagens que eles referenciam)
+        for i in range(acked):
+            self.ring.release(old_base + i)
         
-        # Liberar espaço no buffer e processar mensagens enfileiradas
-        if old_base != self.base:
+        # Liberar espaço no buffer, processar mensagens enfileiradas e deslizar a janela
+        if acked:
+            if self.cc is not None:
+                self.cc.on_ack(acked, self.network.current_time, rtt)
             self.process_queued_messages()
+            self.send_window()
         
-        if self.base == self.nextseq:
+        if self.zero_window:
+            pass  # send_window() armou o persist timer
+        elif self.base == self.nextseq:
             self.stop_timer()
-            print("Janela vazia - Parando timer")
+            if tracing.debug:
+                tracing.log("Janela vazia - Parando timer")
         else:
             self.start_timer()  # Reiniciar timer para o próximo pacote
 
+    def measure_rtt(self, packet, seqnum):
+        """ Amostra de RTT do ACK que confirmou `seqnum`, ou None se ela for ambígua
+
+        Com o eco de timestamp o ACK diz qual envio o gerou; sem ele vale a regra
+        de Karn: ACKs de pacotes retransmitidos não geram amostra.
+        """
+        now = self.network.current_time
+        if packet.flags & wire.FLAG_TIMESTAMP:
+            rtt = wire.timestamp_age(now, packet.tsecr)
+        else:
+            ring = self.ring
+            i = seqnum % ring.size
+            if ring.sent_times[i] < 0 or ring.retransmissions[i]:
+                return None
+            rtt = now - ring.sent_times[i]
+            ring.sent_times[i] = -1.0  # Cada envio gera no máximo uma amostra
+        self.stats.record_rtt(rtt)
+        self.rto.sample(rtt)
+        if tracing.debug:
+            tracing.log(f"RTT medido: {rtt:.2f} ms; RTO atualizado: {self.rto.rto:.2f} ms")
+        return rtt
+
     def timer_interrupt(self):
-        stats.timeouts += 1
-        print(f"Timeout! (Multiplicador: {self.timeout_multiplier}x) Reenviando pacotes não confirmados.")
-        
-        # Backoff exponencial - dobrar o timeout a cada retransmissão
-        self.timeout_multiplier = min(self.timeout_multiplier * 2, self.max_timeout / self.estimated_rtt)
-        
-        # Retransmitir todos os pacotes não confirmados na janela
-        for i in range(self.base, self.nextseq):
-            packet = self.packet_buffer[i % BUFSIZE]
-            if packet:
-                print(f"Reenviando pacote seq={packet.seqnum}: {packet.payload[:20]}")
-                self.send_packet(packet, is_retransmission=True)
+        if self.zero_window:
+            self.probe_window()
+            return
+        self.stats.timeouts += 1
+        # Backoff exponencial: o próximo timer armado já usa o RTO dobrado
+        self.rto.timeout()
+        if tracing.info:
+            tracing.log(f"Timeout! (RTO agora {self.rto.rto:.2f} ms) Reenviando pacotes não confirmados.")
+        if self.cc is not None:
+            self.cc.on_timeout(self.network.current_time)
         
+        self.retransmit_window()
         self.start_timer()
 
+    def fast_retransmit(self):
+        # Três ACKs duplicados: reenviar a janela sem esperar o timeout
+        self.stats.fast_retransmits += 1
+        if tracing.info:
+            tracing.log(f"Retransmissão rápida a partir do pacote {self.base} (cwnd={self.cc.cwnd:.2f})")
+        self.retransmit_window()
+        self.start_timer()
+
+    def retransmit_window(self):
+        # Retransmitir todos os pacotes não confirmados na janela
+        for i in range(self.in_flight()):
+            seqnum = (self.base + i) & self.mask
+            if self.ring.occupied(seqnum):
+                if tracing.debug:
+                    tracing.log(f"Reenviando pacote seq={seqnum}: {bytes(self.ring.payload(seqnum)[:20])}")
+                self.send_packet(seqnum, is_retransmission=True)
+
     def start_timer(self):
         if self.timer_running:
-            stop_timer(0)
+            self.network.stop_timer(self.side)
         
-        timeout = self.estimated_rtt * self.timeout_multiplier
-        start_timer(0, timeout)
+        self.network.start_timer(self.side, self.rto.rto)
         self.timer_running = True
 
     def stop_timer(self):
         if self.timer_running:
-            stop_timer(0)
+            self.network.stop_timer(self.side)
             self.timer_running = False
 
-class Receiver:
-    def __init__(self):
+class Receiver(ReceiverEndpoint):
+
+    def __init__(self, network, window_size=8, bufsize=BUFSIZE, reassembly_timeout=REASSEMBLY_TIMEOUT,
+                 seq_bits=seqspace.SEQ_BITS, ack_delay=ACK_DELAY, ack_every=ACK_EVERY, side=1):
+        self.network = network
+        self.stats = network.stats
+        self.side = side  # Lado em que o receptor roda (1: B, 0: A no modo full-duplex)
+        self.seq = seqspace.SeqSpace(seq_bits)
+        self.mask = self.seq.mask
         self.expect_seq = 1
-        self.last_ack = Packet(seqnum=0, acknum=0)
-        self.reassembly_buffer = defaultdict(list)  # Para mensagens fragmentadas
-        self.fragment_timeout = 5  # Timeout para reassembly em segundos
-        self.last_fragment_time = {}  # Timestamp do último fragmento recebido
+        self.window_size = window_size  # Pacotes aceitos além do último confirmado (janela anunciada)
+        # Buffer de recepção, em fragmentos: ocupado pelas remontagens em andamento e pelas mensagens
+        # que a aplicação ainda não leu; a janela anunciada nunca passa do espaço livre
+        self.bufsize = bufsize
+        self.paused = False        # A aplicação parou de ler (pause()/resume())
+        self.unread = deque()      # (mensagem, fragmentos) completas à espera da leitura
+        self.unread_fragments = 0
+        self.ack_flags = wire.FLAG_ACK
+        self.last_ack = Packet(seqnum=0, acknum=0, flags=self.ack_flags, window=window_size)
+        self.reassembler = Reassembler(reassembly_timeout)  # Remontagem das mensagens fragmentadas
+        # ACK atrasado: segmentos em ordem ainda não confirmados e o timer que limita a espera
+        self.ack_delay = ack_delay
+        self.ack_every = ack_every
+        self.pending_acks = 0
+        self.ack_timer_running = False
+        self.ts_recent = None  # tsval a ecoar no próximo ACK (None enquanto o remetente não usar timestamps)
+        # Destino dos fragmentos em ordem, sink(payload, last), sem remontagem (ex.: transfer.FileSink.feed);
+        # None remonta as mensagens e as entrega à camada 5
+        self.sink = None
+
+    def advertised_window(self):
+        """ Pacotes que o receptor aceita além do último confirmado: a janela, limitada ao buffer livre
+
+        A borda direita (expect_seq + janela) nunca recua: cada fragmento aceito
+        ocupa o buffer e avança expect_seq na mesma medida.
+        """
+        held = self.reassembler.fragments + self.unread_fragments
+        free = self.bufsize - held
+        if free <= 0 and not self.unread_fragments:
+            # Só uma mensagem maior que o buffer inteiro retida: ela precisa completar para liberá-lo
+            return 1
+        return max(0, min(self.window_size, free))
+
+    def make_ack(self):
+        # ACK cumulativo do último segmento entregue; o pacote só é refeito quando o número, a janela ou o eco muda
+        acknum = (self.expect_seq - 1) & self.mask
+        window = self.advertised_window()
+        ack = self.last_ack
+        if ack.acknum != acknum or ack.window != window or \
+                (self.ts_recent is not None and ack.tsecr != self.ts_recent):
+            if self.ts_recent is None:
+                ack = Packet(seqnum=0, acknum=acknum, flags=self.ack_flags, window=window)
+            else:
+                ack = Packet(seqnum=0, acknum=acknum, flags=self.ack_flags | wire.FLAG_TIMESTAMP,
+                             window=window, tsecr=self.ts_recent)
+            self.last_ack = ack
+        return ack
+
+    def update_ts_recent(self, packet):
+        # Com ACK atrasado, ecoa o tsval do primeiro segmento ainda não confirmado (RFC 7323):
+        # a amostra do remetente inclui a espera do ACK, que o RTO precisa cobrir
+        if packet.flags & wire.FLAG_TIMESTAMP and not self.pending_acks:
+            self.ts_recent = packet.tsval
+
+    def acknowledge(self):
+        # Segmento entregue em ordem: confirmar agora ou deixar para o timer de ACK atrasado
+        self.pending_acks += 1
+        if self.ack_delay <= 0 or self.pending_acks >= self.ack_every:
+            self.flush_ack()
+        elif not self.ack_timer_running:
+            self.ack_timer_running = True
+            self.network.start_timer(ACK_TIMER + self.side, self.ack_delay)
+
+    def flush_ack(self):
+        # Envia o ACK cumulativo (também usado como ACK duplicado) e zera o que estava pendente
+        self.cancel_ack_timer()
+        self.pending_acks = 0
+        ack = self.make_ack()
+        if tracing.debug:
+            tracing.log(f"Enviando ACK (ack={ack.acknum})")
+        self.stats.acks_sent += 1
+        self.network.to_layer3(self.side, ack)
+
+    def cancel_ack_timer(self):
+        if self.ack_timer_running:
+            self.ack_timer_running = False
+            self.network.stop_timer(ACK_TIMER + self.side)
+
+    def ack_timeout(self):
+        # A espera máxima acabou sem dados no sentido oposto para levar o ACK
+        self.ack_timer_running = False
+        if self.pending_acks:
+            self.flush_ack()
+
+    def piggyback(self, packet):
+        """ Coloca o ACK cumulativo no pacote de dados que sai deste lado (full-duplex) """
+        ack = self.make_ack()
+        packet.acknum = ack.acknum
+        packet.window = ack.window
+        packet.flags |= ack.flags | wire.FLAG_DATA
+        packet.tsecr = ack.tsecr
+        packet.checksum = packet.calculate_checksum()
+        if self.pending_acks:
+            self.stats.acks_piggybacked += 1
+            self.pending_acks = 0
+            self.cancel_ack_timer()
+
+    def deliver(self, msg_id, offset, payload, flags):
+        # Fragmento em ordem: remontar e entregar à camada 5 quando a mensagem estiver completa
+        self.stats.packets_delivered += 1
+        if self.sink is not None:
+            # Os fragmentos já chegam em ordem: o sink os consome direto do datagrama
+            self.stats.bytes_delivered += len(payload)
+            if flags & wire.FLAG_LAST_FRAGMENT:
+                self.stats.messages_delivered += 1
+            self.sink(payload, flags & wire.FLAG_LAST_FRAGMENT)
+            return
+        reassembler = self.reassembler
+        expired = reassembler.expired
+        message = reassembler.feed(msg_id, offset, payload, flags & wire.FLAG_LAST_FRAGMENT,
+                                   self.network.current_time)
+        self.stats.reassembly_expired += reassembler.expired - expired
+        if message is None:
+            return
+        if self.paused:
+            # A aplicação não está lendo: a mensagem continua ocupando o buffer de recepção
+            self.unread.append((message, reassembler.completed))
+            self.unread_fragments += reassembler.completed
+            return
+        self.to_application(message)
+
+    def to_application(self, message):
+        self.stats.messages_delivered += 1
+        self.stats.bytes_delivered += len(message)
+        self.network.to_layer5(self.side, message)
+
+    def pause(self):
+        """ A aplicação para de ler: as mensagens completas ficam no buffer e a janela anunciada encolhe """
+        self.paused = True
+
+    def resume(self):
+        """ A aplicação volta a ler: entrega o que estava retido e anuncia a janela reaberta """
+        self.paused = False
+        if not self.unread:
+            return
+        while self.unread:
+            message, fragments = self.unread.popleft()
+            self.unread_fragments -= fragments
+            self.to_application(message)
+        if tracing.info:
+            tracing.log(f"Aplicação voltou a ler: anunciando janela de {self.advertised_window()} pacotes")
+        self.flush_ack()  # Atualização de janela
 
     def input(self, packet):
-        stats.packets_received += 1
+        self.stats.packets_received += 1
         
         # Verificar checksum
         if packet.checksum != packet.calculate_checksum():
-            print(f"Pacote corrompido. Enviando ACK anterior (ack={self.last_ack.acknum})")
-            stats.packets_corrupted += 1
-            to_layer3(1, self.last_ack)
+            if tracing.debug:
+                tracing.log(f"Pacote corrompido. Enviando ACK anterior (ack={self.last_ack.acknum})")
+            self.stats.packets_corrupted += 1
+            self.flush_ack()
             return
         
         # Verificar se o pacote está na sequência esperada
         if packet.seqnum != self.expect_seq:
-            print(f"Pacote fora de ordem (recebido={packet.seqnum}, esperado={self.expect_seq}). Enviando ACK anterior.")
-            stats.packets_out_of_order += 1
-            to_layer3(1, self.last_ack)
+            if self.seq.lt(packet.seqnum, self.expect_seq):
+                self.stats.packets_duplicate += 1  # Já entregue: retransmissão desnecessária
+            else:
+                self.stats.packets_out_of_order += 1
+            if tracing.debug:
+                tracing.log(f"Pacote fora de ordem (recebido={packet.seqnum}, esperado={self.expect_seq}). Enviando ACK anterior.")
+            self.flush_ack()  # ACK duplicado sai na hora: o remetente precisa dele para a retransmissão rápida
             return
 
-        print(f"Recebido pacote em ordem (seq={packet.seqnum}): {packet.payload}")
-        stats.packets_delivered += 1
-        
-        # Entregar à camada 5
-        to_layer5(1, packet.payload)
-        
-        # Atualizar último ACK
-        self.last_ack = Packet(seqnum=0, acknum=self.expect_seq)
-        self.last_ack.checksum = self.last_ack.calculate_checksum()
-        
-        # Avançar sequência esperada
-        self.expect_seq += 1
+        if not self.advertised_window():
+            # Buffer de recepção cheio (ex.: sonda do remetente com a janela fechada): repetir a janela atual
+            if tracing.debug:
+                tracing.log(f"Janela fechada: pacote {packet.seqnum} descartado")
+            self.flush_ack()
+            return
+
+        if tracing.debug:
+            tracing.log(f"Recebido pacote em ordem (seq={packet.seqnum}): {bytes(packet.payload)}")
+        self.deliver(packet.msg_id, packet.offset, packet.payload, packet.flags)
+        self.update_ts_recent(packet)
         
-        print(f"Enviando ACK (ack={self.last_ack.acknum})")
-        to_layer3(1, self.last_ack)
+        # Avançar sequência esperada e confirmar (talvez com atraso)
+        self.expect_seq = (self.expect_seq + 1) & self.mask
+        self.acknowledge()
+
+class SRSender(Sender):
+    """ Remetente Selective Repeat: timer e ACK individuais por pacote """
+
+    def __init__(self, network, window_size=8, initial_rtt=15, bufsize=BUFSIZE, congestion_control=None, mtu=MTU,
+                 send_queue=SEND_QUEUE, seq_bits=seqspace.SEQ_BITS, side=0, min_rto=rto.MIN_RTO,
+                 max_rto=rto.MAX_RTO, timestamps=False):
+        super().__init__(network, window_size=window_size, initial_rtt=initial_rtt, bufsize=bufsize,
+                         congestion_control=congestion_control, mtu=mtu, send_queue=send_queue, seq_bits=seq_bits,
+                         side=side, min_rto=min_rto, max_rto=max_rto, timestamps=timestamps)
+        self.acked = bytearray(bufsize)  # Pacotes confirmados dentro da janela (1 byte por slot)
+        self.backoff_time = -1.0         # Instante do último backoff do RTO
+
+    def send_next(self):
+        self.zero_window = False
+        self.acked[self.nextseq % self.bufsize] = 0
+        self.send_packet(self.nextseq, is_retransmission=False)
+        self.start_timer(self.nextseq)
+        self.nextseq = (self.nextseq + 1) & self.mask
+
+    def start_persist_timer(self):
+        # O timer do próximo pacote a enviar faz as vezes de persist timer
+        self.start_timer(self.nextseq)
+
+    def input(self, packet):
+        # Verificar checksum
+        if packet.checksum != packet.calculate_checksum():
+            if tracing.debug:
+                tracing.log(f"ACK corrompido. Ignorando.")
+            self.stats.packets_corrupted += 1
+            return
+        opened = self.update_peer_window(packet)
+
+        acknum = packet.acknum
+        cumulative = packet.flags & wire.FLAG_CUMULATIVE
+        # Ignorar ACKs fora da janela ou já confirmados
+        if (acknum - self.base) & self.mask >= self.in_flight() or \
+                (not cumulative and self.acked[acknum % self.bufsize]):
+            if tracing.debug:
+                tracing.log(f"ACK duplicado ou fora da janela (ack={acknum}). Ignorando.")
+            if opened:
+                self.send_window()  # Atualização de janela: a borda anunciada avançou
+            return
+
+        # O ACK seletivo confirma só acknum; o cumulativo (ACK atrasado ou de carona), tudo de base até acknum
+        first = self.base if cumulative else acknum
+        if tracing.debug:
+            tracing.log(f"Recebido ACK {'cumulativo' if cumulative else 'seletivo'} (ack={acknum})")
+        acked = 0
+        seqnum = first
+        while True:
+            if not self.acked[seqnum % self.bufsize]:
+                self.acked[seqnum % self.bufsize] = 1
+                self.stop_timer(seqnum)
+                acked += 1
+            if seqnum == acknum:
+                break
+            seqnum = (seqnum + 1) & self.mask
+        if not acked:
+            if opened:
+                self.send_window()
+            return
+
+        rtt = self.measure_rtt(packet, acknum)
+        if self.cc is not None:
+            self.cc.on_ack(acked, self.network.current_time, rtt)
+
+        # Deslizar a janela sobre os pacotes confirmados em sequência
+        if first == self.base:
+            while self.base != self.nextseq and self.acked[self.base % self.bufsize]:
+                self.acked[self.base % self.bufsize] = 0
+                self.ring.release(self.base)
+                self.base = (self.base + 1) & self.mask
+            self.process_queued_messages()
+            self.send_window()
+        elif opened:
+            self.send_window()
+
+    def timer_interrupt(self, seqnum):
+        if self.zero_window and seqnum == self.nextseq:
+            self.probe_window()
+            return
+        # Timer obsoleto: o pacote já foi confirmado ou a janela já passou por ele
+        if (seqnum - self.base) & self.mask >= self.in_flight() or self.acked[seqnum % self.bufsize]:
+            return
+        self.stats.timeouts += 1
+
+        # Um backoff por rodada: os timers armados antes do último já usavam o RTO antigo
+        if self.ring.sent_times[seqnum % self.bufsize] >= self.backoff_time:
+            self.rto.timeout()
+            self.backoff_time = self.network.current_time
+        if tracing.info:
+            tracing.log(f"Timeout do pacote {seqnum}! Reenviando apenas este pacote (RTO agora {self.rto.rto:.2f} ms).")
+        if self.cc is not None:
+            self.cc.on_timeout(self.network.current_time)
+        self.send_packet(seqnum, is_retransmission=True)
+        self.start_timer(seqnum)
+
+    def start_timer(self, seqnum):
+        self.network.start_timer(self.side, self.rto.rto, seqnum)
+
+    def stop_timer(self, seqnum):
+        self.network.stop_timer(self.side, seqnum)
+
+class SRReceiver(Receiver):
+    """ Receptor Selective Repeat: ACK por pacote e buffer de reordenação """
+
+    reorders = True
+
+    def __init__(self, network, window_size=8, bufsize=BUFSIZE, reassembly_timeout=REASSEMBLY_TIMEOUT,
+                 seq_bits=seqspace.SEQ_BITS, ack_delay=ACK_DELAY, ack_every=ACK_EVERY, side=1):
+        super().__init__(network, window_size=window_size, bufsize=bufsize, reassembly_timeout=reassembly_timeout,
+                         seq_bits=seq_bits, ack_delay=ack_delay, ack_every=ack_every, side=side)
+        self.recv_buffer = ReceiveRing(bufsize)  # Fragmentos recebidos fora de ordem
+        # ACKs atrasados e de carona são cumulativos: confirmam tudo até expect_seq - 1
+        self.ack_flags = wire.FLAG_ACK | wire.FLAG_CUMULATIVE
+        self.last_ack = Packet(seqnum=0, acknum=0, flags=self.ack_flags, window=window_size)
+
+    def send_ack(self, seqnum, packet):
+        # Anuncia a borda direita da janela de recepção (expect_seq + janela anunciada) relativa ao ACK
+        window = max(0, self.advertised_window() + self.seq.diff(self.expect_seq, seqnum + 1))
+        if packet.flags & wire.FLAG_TIMESTAMP:
+            # ACK seletivo: ecoa o envio exato que o gerou, mesmo que seja uma retransmissão
+            ack = Packet(seqnum=0, acknum=seqnum, flags=wire.FLAG_ACK | wire.FLAG_TIMESTAMP, window=window,
+                         tsecr=packet.tsval)
+        else:
+            ack = Packet(seqnum=0, acknum=seqnum, flags=wire.FLAG_ACK, window=window)
+        if tracing.debug:
+            tracing.log(f"Enviando ACK seletivo (ack={seqnum})")
+        self.stats.acks_sent += 1
+        self.network.to_layer3(self.side, ack)
+
+    def input(self, packet):
+        self.stats.packets_received += 1
+
+        # Pacotes corrompidos são descartados; o timer do remetente cuida da recuperação
+        if packet.checksum != packet.calculate_checksum():
+            if tracing.debug:
+                tracing.log(f"Pacote corrompido (seq={packet.seqnum}). Descartando.")
+            self.stats.packets_corrupted += 1
+            return
+
+        seqnum = packet.seqnum
+        ahead = (seqnum - self.expect_seq) & self.mask  # Distância à frente de expect_seq
+        if ahead >= self.advertised_window():
+            if 0 < (self.expect_seq - seqnum) & self.mask <= self.window_size:
+                # Já entregue: o ACK anterior se perdeu, confirmar novamente
+                self.stats.packets_duplicate += 1
+                self.send_ack(seqnum, packet)
+                return
+            if tracing.debug:
+                tracing.log(f"Pacote fora da janela de recepção (seq={seqnum}). Descartando.")
+            if ahead < self.window_size:
+                self.flush_ack()  # Além da janela encolhida (ex.: sonda com a janela fechada): repetir a janela atual
+            return
+
+        in_order = seqnum == self.expect_seq
+        if in_order:
+            self.update_ts_recent(packet)
+        if seqnum in self.recv_buffer:
+            self.stats.packets_duplicate += 1
+        else:
+            if not in_order:
+                if tracing.debug:
+                    tracing.log(f"Pacote fora de ordem (recebido={seqnum}, esperado={self.expect_seq}). Armazenando.")
+                self.stats.packets_out_of_order += 1
+            self.recv_buffer.store(seqnum, packet)
+
+        # Entregar à camada 5 todos os pacotes contíguos
+        while self.expect_seq in self.recv_buffer:
+            msg_id, offset, payload, flags = self.recv_buffer.take(self.expect_seq)
+            if tracing.debug:
+                tracing.log(f"Recebido pacote em ordem (seq={self.expect_seq}): {payload}")
+            self.deliver(msg_id, offset, payload, flags)
+            self.expect_seq = (self.expect_seq + 1) & self.mask
+
+        # ACK só depois da entrega, para anunciar a janela já deslizada. Com ACK atrasado, os
+        # segmentos em ordem esperam um ACK cumulativo; os fora de ordem são confirmados na hora
+        if in_order and self.ack_delay > 0:
+            self.acknowledge()
+        else:
+            self.send_ack(seqnum, packet)
 
 # Simulação de ambiente de rede
+PROTOCOLS = {
+    "abp": (abp.ABPSender, abp.ABPReceiver),
+    "gbn": (Sender, Receiver),
+    "sr": (SRSender, SRReceiver),
+}
+
+def create_endpoints(network, config, side=0):
+    """ Cria o par remetente/receptor do protocolo configurado, ligado à rede dada
+
+    O remetente roda no lado `side` e o receptor no oposto (side=1 é o sentido B->A do full-duplex).
+    """
+    sender_cls, receiver_cls = PROTOCOLS[config.protocol]
+    sender = sender_cls(network, window_size=config.window_size, initial_rtt=config.initial_rtt,
+                        bufsize=config.bufsize, congestion_control=config.congestion, mtu=config.mtu,
+                        send_queue=config.send_queue, seq_bits=config.seq_bits, side=side, min_rto=config.min_rto,
+                        max_rto=config.max_rto, timestamps=config.timestamps)
+    # Com controle de congestionamento a janela do remetente pode chegar ao buffer inteiro
+    receiver_window = config.bufsize if config.congestion else config.window_size
+    receiver = receiver_cls(network, window_size=receiver_window, bufsize=config.bufsize,
+                            reassembly_timeout=config.reassembly_timeout, seq_bits=config.seq_bits,
+                            ack_delay=config.ack_delay, ack_every=config.ack_every, side=1 - side)
+    return sender, receiver
+
+class Flow:
+    """ Um par remetente/receptor dentro do NetworkSimulator
+
+    É a "rede" vista pelos endpoints: repassa to_layer3/to_layer5/start_timer/
+    stop_timer ao simulador acrescentando o id do fluxo, e guarda as
+    estatísticas e a fila de mensagens bloqueadas deste fluxo. No modo
+    full-duplex há também o par do sentido B->A, e cada lado roda um
+    remetente e um receptor.
+    """
+
+    def __init__(self, network, flow_id):
+        self.network = network
+        self.flow = flow_id
+        self.config = network.config
+        self.rng = network.rng
+        self.clock = network.clock
+        self.stats = Statistics(network.clock)
+        # Mensagens recusadas pelo remetente de cada lado, aguardando espaço na fila
+        self.pendings = (deque(), deque())
+        self.pending = self.pendings[0]
+        # Instante de produção das mensagens ainda não entregues, por lado remetente. Todos os
+        # protocolos entregam em ordem, então a próxima entrega é sempre a mais antiga da fila
+        self.produced = (deque(), deque())
+        # Com config.verify, o conteúdo dessas mensagens, para conferir cada entrega
+        self.sent = (deque(), deque()) if self.config.verify else None
+        self.sender, self.receiver = create_endpoints(self, self.config)
+        self.sender.on_writable = self.resume_producer
+        # Endpoints por lado (0: A, 1: B); None onde o lado não tem aquele papel
+        self.senders = [self.sender, None]
+        self.receivers = [None, self.receiver]
+        if self.config.duplex:
+            sender, receiver = create_endpoints(self, self.config, side=1)
+            sender.on_writable = functools.partial(self.resume_producer, 1)
+            self.senders[1], self.receivers[0] = sender, receiver
+            # Cada remetente leva o ACK do receptor do seu lado
+            self.sender.receiver = receiver
+            sender.receiver = self.receiver
+        # FEC opcional: codificador por lado que envia e decodificador por lado que recebe
+        self.encoders = self.decoders = None
+        if self.config.fec_group:
+            self.encoders = (fec.XorEncoder(self.config.fec_group), fec.XorEncoder(self.config.fec_group))
+            self.decoders = (fec.XorDecoder(), fec.XorDecoder())
+
+    @property
+    def current_time(self):
+        return self.clock.now()
+
+    def output(self, message, side=0):
+        # Entrega da camada 5; se o remetente recusar, o produtor fica bloqueado até on_writable
+        self.stats.record_message(message.size)
+        self.produced[side].append(self.current_time)
+        if self.sent is not None:
+            self.sent[side].append(message.data)
+        pending = self.pendings[side]
+        if pending or not self.senders[side].output(message):
+            pending.append(message)
+
+    def resume_producer(self, side=0):
+        # A fila do remetente voltou a ter espaço: entregar as mensagens que esperavam
+        pending, sender = self.pendings[side], self.senders[side]
+        while pending and sender.output(pending[0]):
+            pending.popleft()
+
+    def input(self, side, packet):
+        """ Entrega um pacote que chegou ao lado `side`, passando antes pela FEC se ela estiver ligada """
+        if self.decoders is None:
+            self.dispatch(side, packet)
+            return
+        decoder = self.decoders[side]
+        if packet.flags & wire.FLAG_PARITY:
+            if packet.checksum != packet.calculate_checksum():
+                self.stats.packets_corrupted += 1
+                return
+            recoveries = decoder.parity(packet.payload)
+        else:
+            self.dispatch(side, packet)
+            if packet.flags & wire.FLAG_CONTROL and not packet.flags & wire.FLAG_DATA:
+                return  # ACKs e NAKs puros não entram nos grupos
+            if packet.checksum != packet.calculate_checksum():
+                return  # Corrompido: para a FEC, é como se tivesse sido perdido
+            recoveries = decoder.data(packet.checksum, packet.to_bytes())
+        for datagrams in recoveries:
+            self.stats.fec_recovered += 1
+            if tracing.info:
+                tracing.log(f"FEC: pacote reconstruído no fluxo {self.flow} sem retransmissão")
+            # O Go-Back-N descartou o resto do grupo por ter chegado depois do buraco: entregar de novo
+            receiver = self.receivers[side]
+            if receiver is not None and receiver.reorders:
+                datagrams = datagrams[:1]
+            for datagram in datagrams:
+                self.dispatch(side, Packet.from_bytes(datagram))
+
+    def dispatch(self, side, packet):
+        """ Entrega o pacote ao remetente e/ou receptor do lado `side` """
+        sender, receiver = self.senders[side], self.receivers[side]
+        if receiver is None:
+            sender.input(packet)
+            return
+        if sender is None:
+            receiver.input(packet)
+            return
+        # Full-duplex: as flags dizem se o pacote traz dados, ACK ou os dois; corrompidas, não são confiáveis
+        if packet.checksum != packet.calculate_checksum():
+            self.stats.packets_corrupted += 1
+            return
+        flags = packet.flags
+        if not flags & wire.FLAG_CONTROL or flags & wire.FLAG_DATA:
+            receiver.input(packet)
+        if flags & wire.FLAG_CONTROL:
+            sender.input(packet)
+
+    def to_layer3(self, AorB, packet):
+        if packet.flow != self.flow:
+            # Os endpoints não conhecem o fluxo: carimbado na primeira transmissão (o checksum o cobre)
+            packet.flow = self.flow
+            packet.checksum = packet.calculate_checksum()
+        self.network.to_layer3(AorB, packet, self)
+        if self.encoders is not None and (not packet.flags & wire.FLAG_CONTROL or packet.flags & wire.FLAG_DATA):
+            # Dados entram no grupo do sentido mesmo que o canal os perca: a paridade sai quando ele fecha
+            parity = self.encoders[AorB].add(packet.checksum, packet.to_bytes())
+            if parity is not None:
+                self.stats.fec_parity_sent += 1
+                self.network.to_layer3(AorB, Packet(flags=wire.FLAG_PARITY, payload=parity, flow=self.flow), self)
+
+    def to_layer5(self, AorB, data):
+        produced = self.produced[1 - AorB]
+        if produced:
+            self.stats.record_latency(self.current_time - produced.popleft())
+        if self.sent is not None:
+            sent = self.sent[1 - AorB]
+            if not sent or sent.popleft() != data:
+                self.stats.delivery_errors += 1  # Mensagem duplicada, fora de ordem, perdida ou alterada
+        self.network.to_layer5(AorB, data, self.flow)
+
+    def start_timer(self, AorB, increment, seqnum=None):
+        self.network.start_timer(AorB, increment, seqnum, self.flow)
+
+    def stop_timer(self, AorB, seqnum=None):
+        self.network.stop_timer(AorB, seqnum, self.flow)
+
 class NetworkSimulator:
-    def __init__(self):
-        self.events = []  # Fila de eventos
-        self.current_time = 0
-        self.sender = Sender(window_size=8, initial_rtt=15)
-        self.receiver = Receiver()
-        self.timers = {}
+    def __init__(self, config=None):
+        self.config = config or SimulationConfig()
+        self.protocol = self.config.protocol
+        self.rng = random.Random(self.config.seed)  # RNG próprio: execuções independentes e reprodutíveis
+        self.clock = create_clock(self.config.realtime)
+        self.events = EventScheduler()  # Fila de eventos (heap)
+        # Timers de retransmissão ficam na roda e só entram no heap no tick em que vencem
+        self.wheel = timerwheel.TimingWheel(self.config.timer_tick)
+        self.timers = {}  # Timer pendente por (fluxo, entidade, seq)
+        self.tick_token = None  # Evento TIMER_TICK agendado e seu instante
+        self.tick_at = None
+        # Um canal por direção (0: A->B, 1: B->A), compartilhado por todos os fluxos
+        self.channels = (channel.create(self.config, self.rng.getrandbits(32)),
+                         channel.create(self.config, self.rng.getrandbits(32)))
+        # Enlace gargalo por direção (None sem limite de banda)
+        self.links = tuple(link.create(self.config.bandwidth, self.config.queue_limit,
+                                       self.config.queue_discipline, self.rng.getrandbits(32)) for _ in range(2))
+        # Tabela de fluxos, indexada pelo id que vai no cabeçalho dos pacotes
+        self.flows = [Flow(self, flow_id) for flow_id in range(self.config.flows)]
+        first = self.flows[0]
+        self.sender, self.receiver = first.sender, first.receiver  # Atalhos para o caso de um único fluxo
+        # Canal FIFO (pedido na configuração ou suposto pelo protocolo, como o ABP): cada chegada é
+        # adiada até a anterior da mesma direção
+        self.fifo = self.config.fifo or first.sender.fifo
+        self.last_arrival = [0.0, 0.0]
+        # Com um fluxo as estatísticas agregadas são as dele; com vários, a soma só é feita em finish()
+        # e cada fluxo fecha a própria série temporal antes dos seus eventos (Statistics.advance)
+        self.stats = first.stats
+        if len(self.flows) > 1:
+            self.stats = Statistics(self.clock)
+            for flow in self.flows:
+                flow.stats.advance()
+        self.end_time = None
+        self.recorder = None  # Gravador/verificador de eventos do módulo replay
+        self.profiler = None  # profiling.Profiler instalado por attach(); None não mede nada
+
+    def __getstate__(self):
+        # Snapshots (pickle) levam todo o estado da simulação, menos o recorder (arquivo aberto)
+        state = self.__dict__.copy()
+        state["recorder"] = None
+        state["profiler"] = None
+        return state
+
+    @property
+    def current_time(self):
+        return self.clock.now()
     
+    @property
+    def pending(self):
+        return self.flows[0].pending
+
     def schedule_event(self, time_delta, event_type, params=None):
         event_time = self.current_time + time_delta
-        self.events.append((event_time, event_type, params))
-        self.events.sort()  # Ordenar eventos por tempo
+        return self.events.schedule(event_time, event_type, params)
     
-    def to_layer3(self, AorB, packet):
-        # Simular latência de rede (entre 5-15ms)
-        latency = random.uniform(5, 15)
+    def to_layer3(self, AorB, packet, flow=None):
+        flow = flow or self.flows[0]
+        stats = flow.stats
+        stats.packets_transmitted += 1
+        data = packet.to_bytes()
+        now = self.current_time
+        # Fila e serialização no enlace gargalo: o pacote só começa a propagar ao sair dele
+        bottleneck = self.links[AorB]
+        if bottleneck is not None:
+            departure = bottleneck.enqueue(now, len(data))
+            if departure is None:
+                stats.queue_drops += 1
+                if tracing.writer:
+                    tracing.writer.write(now, tracing.LOSS, AorB, packet.seqnum, packet.acknum)
+                if tracing.info:
+                    tracing.log(f"Pacote {packet.seqnum} (ack={packet.acknum}) descartado na fila do gargalo!")
+                return
+            stats.queued_packets += 1
+            stats.queue_delay += departure - now - len(data) * bottleneck.ms_per_byte
+            now = departure
+
+        # O canal da direção decide perda, corrupção e latência (pré-sorteadas em lotes)
+        lost, bit, latency = self.channels[AorB].draw()
+        if lost:
+            stats.packets_lost += 1
+            if tracing.writer:
+                tracing.writer.write(self.current_time, tracing.LOSS, AorB, packet.seqnum, packet.acknum)
+            if tracing.info:
+                tracing.log(f"Pacote {packet.seqnum} (ack={packet.acknum}) foi PERDIDO na transmissão!")
+            return
+        if bit is not None:
+            data = channel.flip_bit(data, bit)
+            if tracing.writer:
+                tracing.writer.write(self.current_time, tracing.CORRUPT, AorB, packet.seqnum, packet.acknum)
+            if tracing.info:
+                tracing.log(f"Pacote {packet.seqnum} (ack={packet.acknum}) foi CORROMPIDO na transmissão!")
         dest = 1 if AorB == 0 else 0  # Oposto do remetente
+        arrival = now + latency
+        if self.fifo:
+            arrival = self.last_arrival[AorB] = max(arrival, self.last_arrival[AorB])
         
-        print(f"Camada 3: Agendando entrega do pacote {packet} em {latency:.2f}ms")
-        self.schedule_event(latency, "PACKET_ARRIVAL", {"dest": dest, "packet": packet})
+        if tracing.debug:
+            tracing.log(f"Camada 3: Agendando entrega do pacote {packet} em {arrival - self.current_time:.2f}ms")
+        self.events.schedule(arrival, "PACKET_ARRIVAL", {"dest": dest, "flow": flow.flow, "data": data})
     
-    def to_layer5(self, AorB, data):
-        print(f"Camada 5 [{('Receiver' if AorB == 1 else 'Sender')}]: Dados recebidos: {data}")
+    def to_layer5(self, AorB, data, flow=0):
+        if tracing.writer:
+            tracing.writer.write(self.current_time, tracing.DELIVER, AorB, len(data))
+        if tracing.debug:
+            tracing.log(f"Camada 5 [{('Receiver' if AorB == 1 else 'Sender')}, fluxo {flow}]: Dados recebidos: {bytes(data)}")
     
-    def start_timer(self, AorB, increment):
-        entity = "Sender" if AorB == 0 else "Receiver"
-        print(f"Timer iniciado para {entity} com duração de {increment:.2f}ms")
-        self.timers[AorB] = self.current_time + increment
-        self.schedule_event(increment, "TIMER_INTERRUPT", {"entity": AorB})
+    def start_timer(self, AorB, increment, seqnum=None, flow=0):
+        # seqnum=None é o timer único da entidade (GBN); caso contrário, timer por pacote (SR)
+        entity = "ACK atrasado" if AorB >= ACK_TIMER else "Sender" if AorB == 0 else "Receiver"
+        if tracing.debug:
+            tracing.log(f"Timer iniciado para {entity} com duração de {increment:.2f}ms")
+        if tracing.writer:
+            tracing.writer.write(self.current_time, tracing.TIMER_START, AorB, seqnum or 0)
+        key = (flow, AorB, seqnum)
+        deadline = self.current_time + increment
+        timer = self.timers.get(key)
+        if timer is None:
+            timer = self.timers[key] = self.wheel.start(deadline, {"entity": AorB, "seqnum": seqnum, "flow": flow})
+        else:
+            self.events.cancel(timer.handle)  # Já tinha vencido e estava no heap
+            timer.handle = None
+            self.wheel.restart(timer, deadline)
+        if timer.expires < self.wheel.current:
+            # O tick do prazo já foi processado: vai direto para o heap
+            self.wheel.cancel(timer)
+            timer.handle = self.events.schedule(deadline, "TIMER_INTERRUPT", timer.payload,
+                                                TIMER_PRIORITY)
+        else:
+            self.schedule_tick(timer.expires)
     
-    def stop_timer(self, AorB):
-        entity = "Sender" if AorB == 0 else "Receiver"
-        print(f"Timer parado para {entity}")
-        if AorB in self.timers:
-            del self.timers[AorB]
-            
-            # Remover eventos de timer pendentes
-            self.events = [e for e in self.events if not (e[1] == "TIMER_INTERRUPT" and e[2]["entity"] == AorB)]
+    def stop_timer(self, AorB, seqnum=None, flow=0):
+        entity = "ACK atrasado" if AorB >= ACK_TIMER else "Sender" if AorB == 0 else "Receiver"
+        if tracing.debug:
+            tracing.log(f"Timer parado para {entity}")
+        if tracing.writer:
+            tracing.writer.write(self.current_time, tracing.TIMER_STOP, AorB, seqnum or 0)
+        timer = self.timers.pop((flow, AorB, seqnum), None)
+        if timer is not None:
+            self.wheel.cancel(timer)
+            self.events.cancel(timer.handle)
+
+    def schedule_tick(self, tick):
+        # Um único TIMER_TICK no heap, no tick mais próximo com algo a fazer na roda
+        when = max(tick * self.wheel.tick, self.current_time)
+        if self.tick_at is None or when < self.tick_at:
+            self.events.cancel(self.tick_token)
+            self.tick_token = self.events.schedule(when, "TIMER_TICK", None, TIMER_PRIORITY)
+            self.tick_at = when
+
+    def advance_timers(self):
+        # Timers vencidos até agora entram no heap no instante exato do prazo
+        self.tick_token = self.tick_at = None
+        now = self.current_time
+        for timer in self.wheel.advance(now):
+            timer.handle = self.events.schedule(max(timer.deadline, now), "TIMER_INTERRUPT", timer.payload,
+                                                TIMER_PRIORITY)
+        tick = self.wheel.next_tick()
+        if tick is not None:
+            self.schedule_tick(tick)
+
+    def schedule_generator(self, flow, side=0):
+        # Chegadas de Poisson à mesma taxa média do gerador original (30% a cada 5 ms)
+        params = {"flow": flow.flow, "side": side} if side else {"flow": flow.flow}
+        self.schedule_event(self.rng.expovariate(self.config.message_rate), "GENERATE", params)
+
+    def refresh_stats(self, force=False):
+        # Com vários fluxos a soma custa O(fluxos): feita só ao fim (force), para o relatório e a exportação
+        if len(self.flows) == 1:
+            self.stats.tick()
+        elif force:
+            for flow in self.flows:
+                flow.stats.advance()
+            self.stats.aggregate([flow.stats for flow in self.flows])
+
+    def fairness(self):
+        """ Índice de Jain sobre os bytes entregues por fluxo (1.0 = divisão perfeita) """
+        delivered = [flow.stats.bytes_delivered for flow in self.flows]
+        squares = sum(value * value for value in delivered)
+        return sum(delivered) ** 2 / (len(delivered) * squares) if squares else 1.0
+
+    def flow_rows(self):
+        """ Uma linha de estatísticas por fluxo """
+        return [{"flow": flow.flow, "packets_sent": flow.stats.packets_sent,
+                 "packets_retransmitted": flow.stats.packets_retransmitted,
+                 "messages_delivered": flow.stats.messages_delivered, "bytes_delivered": flow.stats.bytes_delivered,
+                 "goodput": flow.stats.goodput(), "rtt_mean": flow.stats.rtt.mean} for flow in self.flows]
+
+    def write_flow_stats(self, path):
+        rows = self.flow_rows()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
     
-    def run_simulation(self, duration):
+    def start(self, duration):
+        """ Agenda os eventos iniciais de uma execução de `duration` ms """
+        self.end_time = self.current_time + duration
         self.schedule_event(0, "STATISTICS", {})  # Evento inicial de estatísticas
-        end_time = self.current_time + duration
+        if not self.config.message_rate:
+            return
+        for flow in self.flows:
+            self.schedule_generator(flow)
+            if self.config.duplex:
+                self.schedule_generator(flow, 1)
+
+    def pause_reader(self, start, end, flow=0):
+        """ A aplicação do receptor do fluxo para de ler entre start e end (ms a partir de agora)
+
+        As mensagens completas se acumulam no buffer de recepção, a janela anunciada
+        fecha e o remetente para até a leitura voltar.
+        """
+        self.schedule_event(start, "READER", {"flow": flow, "paused": True})
+        self.schedule_event(end, "READER", {"flow": flow, "paused": False})
+
+    def stop(self):
+        """ Encerra run() depois do evento em processamento (ex.: ao fim de uma transferência) """
+        self.end_time = self.current_time
+
+    def run(self, until=None):
+        """ Processa eventos até end_time; com `until`, pausa antes do primeiro evento posterior a ele
+
+        Pausar e continuar (inclusive a partir de um snapshot) processa exatamente
+        a mesma sequência de eventos de uma execução sem pausa.
+        """
+        flows = self.flows
+        profiler = self.profiler  # Uma comparação por evento quando desligado
         
-        while self.events and self.current_time < end_time:
-            event = self.events.pop(0)
-            event_time, event_type, params = event
-            self.current_time = event_time
+        while self.events and self.current_time < self.end_time:
+            if until is not None and self.events.peek_time() > until:
+                break
+            event_time, event_type, params = self.events.pop()
+            self.clock.advance_to(event_time)
+            if self.recorder is not None:
+                self.recorder(event_time, event_type, params)
+            if profiler is not None:
+                profiler.begin(event_type, event_time)
             
-            print(f"\n[TEMPO: {self.current_time:.2f}] Processando evento: {event_type}")
+            if tracing.debug:
+                tracing.log(f"\n[TEMPO: {self.current_time:.2f}] Processando evento: {event_type}")
             
             if event_type == "PACKET_ARRIVAL":
-                dest, packet = params["dest"], params["packet"]
-                if dest == 0:  # Sender
-                    self.sender.input(packet)
-                else:  # Receiver
-                    self.receiver.input(packet)
+                dest, flow = params["dest"], flows[params["flow"]]
+                if event_time >= flow.stats.series_due:
+                    flow.stats.advance()
+                try:
+                    packet = Packet.from_bytes(params["data"])
+                except wire.DecodeError as e:
+                    if tracing.info:
+                        tracing.log(f"Datagrama inválido descartado: {e}")
+                    flow.stats.packets_corrupted += 1
+                    continue
+                if tracing.writer:
+                    tracing.writer.write(self.current_time, tracing.ARRIVAL, dest, packet.seqnum, packet.acknum)
+                flow.input(dest, packet)
             
             elif event_type == "TIMER_INTERRUPT":
-                entity = params["entity"]
-                if entity == 0:  # Sender
-                    self.sender.timer_interrupt()
+                entity, seqnum, flow_id = params["entity"], params["seqnum"], params["flow"]
+                self.timers.pop((flow_id, entity, seqnum), None)  # Timer disparou
+                if event_time >= flows[flow_id].stats.series_due:
+                    flows[flow_id].stats.advance()
+                if tracing.writer:
+                    tracing.writer.write(self.current_time, tracing.TIMEOUT, entity, seqnum or 0)
+                if entity >= ACK_TIMER:  # ACK atrasado do receptor
+                    flows[flow_id].receivers[entity - ACK_TIMER].ack_timeout()
+                else:
+                    sender = flows[flow_id].senders[entity]
+                    if seqnum is None:
+                        sender.timer_interrupt()
+                    else:
+                        sender.timer_interrupt(seqnum)
+            
+            elif event_type == "TIMER_TICK":
+                self.advance_timers()
             
             elif event_type == "SEND_MESSAGE":
-                message = params["message"]
-                self.sender.output(message)
+                flow = flows[params.get("flow", 0)]
+                if event_time >= flow.stats.series_due:
+                    flow.stats.advance()
+                flow.output(params["message"], params.get("side", 0))
+            
+            elif event_type == "GENERATE":
+                # Gerar uma mensagem aleatória (o gerador do fluxo para enquanto ele estiver bloqueado)
+                flow, side = flows[params["flow"]], params.get("side", 0)
+                if not flow.pendings[side]:
+                    msg_length = self.rng.randint(10, 100)
+                    message = Message(''.join(self.rng.choices(ALPHABET, k=msg_length)))
+                    if tracing.info:
+                        tracing.log(f"\n[TESTE] Gerando nova mensagem de {msg_length} bytes no fluxo {flow.flow}"
+                                    f"{' (B->A)' if side else ''}")
+                    self.schedule_event(0.1, "SEND_MESSAGE", dict(message=message, **params))
+                self.schedule_generator(flow, side)
             
             elif event_type == "STATISTICS":
                 # Agendar próxima atualização de estatísticas
                 self.schedule_event(5, "STATISTICS", {})
-                
-                # Gerar mensagem aleatória ocasionalmente
-                if random.random() < 0.3:  # 30% de chance
-                    msg_length = random.randint(10, 100)
-                    msg_data = ''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(msg_length))
-                    message = Message(msg_data)
-                    print(f"\n[TESTE] Gerando nova mensagem de {len(msg_data)} bytes")
-                    self.schedule_event(0.1, "SEND_MESSAGE", {"message": message})
-        
-        print("\nSimulação concluída!")
-        stats.report()
+                self.refresh_stats()
+            
+            elif event_type == "READER":
+                # A aplicação do receptor para ou volta a ler (pause_reader)
+                flow = flows[params["flow"]]
+                if event_time >= flow.stats.series_due:
+                    flow.stats.advance()
+                if params["paused"]:
+                    flow.receiver.pause()
+                else:
+                    flow.receiver.resume()
 
-# Redefinir funções para usar o simulador
-simulator = NetworkSimulator()
+        if profiler is not None:
+            profiler.end()
+
+    def finish(self):
+        """ Fecha as estatísticas e imprime o relatório """
+        if tracing.info:
+            tracing.log("\nSimulação concluída!")
+        self.refresh_stats(force=True)
+        self.stats.report()
+        if len(self.flows) > 1 and tracing.summary:
+            goodputs = [flow.stats.goodput() for flow in self.flows]
+            print(f"Fluxos: {len(self.flows)} | goodput por fluxo min/média/máx: {min(goodputs):.2f} / "
+                  f"{sum(goodputs) / len(goodputs):.2f} / {max(goodputs):.2f} pacotes/segundo")
+            print(f"Índice de justiça de Jain: {self.fairness():.3f}")
+        return self.stats
+
+    def run_simulation(self, duration):
+        self.start(duration)
+        self.run()
+        return self.finish()
 
-def to_layer3(AorB, packet):
-    simulator.to_layer3(AorB, packet)
+def compare_protocols(duration=SIMULATION_DURATION * 100, seed=None):
+    """ Executa ABP, GBN e SR com a mesma carga e compara goodput e retransmissões """
+    results = {}
+    for protocol in PROTOCOLS:
+        simulator = NetworkSimulator(SimulationConfig(protocol=protocol, seed=seed))
+        simulator.schedule_event(0, "SEND_MESSAGE", {"message": Message("Hello GBN Protocol " * 10)})
+        simulator.run_simulation(duration)
+        results[protocol] = simulator.stats
 
-def to_layer5(AorB, data):
-    simulator.to_layer5(AorB, data)
+    if tracing.summary:
+        print(f"\n====== {' x '.join(protocol.upper() for protocol in results)} ======")
+        print(f"{'Protocolo':<10}{'Entregues':>12}{'Enviados':>12}{'Retransm.':>12}{'Razão':>8}{'Goodput':>12}")
+        for protocol, proto_stats in results.items():
+            print(f"{protocol.upper():<10}{proto_stats.packets_delivered:>12}{proto_stats.packets_sent:>12}"
+                  f"{proto_stats.packets_retransmitted:>12}{proto_stats.retransmission_ratio():>8.2f}"
+                  f"{proto_stats.goodput():>12.2f}")
+    return results
 
-def start_timer(AorB, increment):
-    simulator.start_timer(AorB, increment)
+TRACE_LEVELS = {"silent": tracing.SILENT, "summary": tracing.SUMMARY, "info": tracing.INFO, "debug": tracing.DEBUG}
 
-def stop_timer(AorB):
-    simulator.stop_timer(AorB)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulação dos protocolos Go-Back-N e Selective Repeat")
+    parser.add_argument("--sr", action="store_true", help="usar Selective Repeat em vez de Go-Back-N")
+    parser.add_argument("--protocol", choices=sorted(PROTOCOLS), default=None, help="protocolo (padrão: gbn)")
+    parser.add_argument("--compare", action="store_true", help="comparar GBN e SR com a mesma carga")
+    parser.add_argument("--quiet", action="store_true", help="imprimir apenas o relatório final")
+    parser.add_argument("--level", choices=TRACE_LEVELS, default="debug", help="nível de saída no terminal")
+    parser.add_argument("--trace", metavar="ARQUIVO", help="gravar trace de eventos (.ndjson ou binário)")
+    parser.add_argument("--seed", type=int, default=None, help="semente do RNG da simulação")
+    parser.add_argument("--congestion", choices=sorted(congestion.ALGORITHMS), default=None,
+                        help="controle de congestionamento da janela do remetente")
+    parser.add_argument("--cwnd-log", metavar="ARQUIVO", help="exportar a evolução de cwnd/ssthresh em CSV")
+    parser.add_argument("--realtime", type=float, metavar="VELOCIDADE", default=None,
+                        help="cadenciar pelo relógio de parede (1.0 = tempo real)")
+    parser.add_argument("--mtu", type=int, default=MTU, help="tamanho máximo do datagrama em bytes")
+    parser.add_argument("--loss", type=float, default=PACKET_LOSS_RATE, help="taxa média de perda do canal")
+    parser.add_argument("--loss-model", choices=channel.LOSS_MODELS, default="independent",
+                        help="perda independente ou em rajadas (Gilbert-Elliott)")
+    parser.add_argument("--burst-length", type=float, default=4.0, help="tamanho médio das rajadas de perda")
+    parser.add_argument("--latency-model", choices=channel.LATENCY_MODELS, default="uniform")
+    parser.add_argument("--latency-trace", metavar="ARQUIVO", help="atrasos medidos (ms), um por linha")
+    parser.add_argument("--fifo", action="store_true", help="canal sem reordenação (cada direção entrega em ordem)")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bits/s do enlace gargalo (padrão: infinito)")
+    parser.add_argument("--queue", type=int, default=link.QUEUE_LIMIT, help="pacotes na fila do gargalo")
+    parser.add_argument("--flows", type=int, default=1, help="pares remetente/receptor compartilhando o canal")
+    parser.add_argument("--flow-stats", metavar="ARQUIVO", help="estatísticas por fluxo em CSV")
+    parser.add_argument("--timer-tick", type=float, default=timerwheel.TICK,
+                        help="granularidade (ms) da roda de temporizadores")
+    parser.add_argument("--seq-bits", type=int, choices=(16, 32), default=seqspace.SEQ_BITS,
+                        help="tamanho dos números de sequência")
+    parser.add_argument("--export", metavar="ARQUIVO", help="estatísticas em JSON (.json) ou série temporal em CSV")
+    parser.add_argument("--aqm", choices=sorted(link.LINKS), default="droptail", help="disciplina da fila do gargalo")
+    parser.add_argument("--ack-delay", type=float, default=ACK_DELAY,
+                        help="espera máxima (ms) para confirmar segmentos em ordem; 0 confirma cada um na hora")
+    parser.add_argument("--ack-every", type=int, default=ACK_EVERY,
+                        help="com ACK atrasado, confirmar na hora a cada N segmentos")
+    parser.add_argument("--duplex", action="store_true",
+                        help="B também envia dados e os ACKs pegam carona nos dados do sentido oposto")
+    parser.add_argument("--fec", type=int, default=0, metavar="K",
+                        help="FEC por paridade XOR: uma paridade a cada K pacotes de dados (0 desliga)")
+    parser.add_argument("--min-rto", type=float, default=rto.MIN_RTO, help="limite inferior do RTO (ms)")
+    parser.add_argument("--max-rto", type=float, default=rto.MAX_RTO, help="limite superior do RTO e do backoff (ms)")
+    parser.add_argument("--timestamps", action="store_true",
+                        help="eco de timestamps nos pacotes, para amostras de RTT sem ambiguidade")
+    parser.add_argument("--duration", type=float, default=SIMULATION_DURATION, help="ms simulados")
+    parser.add_argument("--record", metavar="LOG", help="gravar o fluxo de eventos para reprodução exata")
+    parser.add_argument("--replay", metavar="LOG", help="reproduzir um log gravado, conferindo cada evento")
+    parser.add_argument("--resume", metavar="SNAPSHOT", help="continuar uma execução a partir de um snapshot")
+    parser.add_argument("--snapshot", metavar="ARQUIVO", help="salvar o estado completo no instante --snapshot-at")
+    parser.add_argument("--snapshot-at", type=float, metavar="MS", help="instante simulado do snapshot")
+    parser.add_argument("--from", dest="from_time", type=float, metavar="MS",
+                        help="rodar em silêncio até este instante e só então ligar o nível de saída")
+    parser.add_argument("--reader-pause", type=float, nargs=2, metavar=("INICIO", "FIM"),
+                        help="a aplicação do receptor para de ler entre INICIO e FIM (ms): a janela anunciada fecha")
+    parser.add_argument("--profile", action="store_true",
+                        help="contadores e tempo por tipo de evento e por handler, com medidores de fila e janela")
+    parser.add_argument("--profile-gauges", metavar="ARQUIVO", help="amostras dos medidores do --profile em CSV")
+    parser.add_argument("--cprofile", nargs="?", const="", metavar="ARQUIVO",
+                        help="rodar sob cProfile; com ARQUIVO grava os dados para pstats em vez de imprimir")
+    parser.add_argument("--tracemalloc", action="store_true", help="alocações por evento e pico de memória")
+    return parser.parse_args(argv)
 
 # Executar simulação
-if __name__ == "__main__":
-    print("Iniciando simulação de protocolo Go-Back-N com melhorias...")
-    print(f"Configurações: Janela={simulator.sender.window_size}, Taxa de perda={PACKET_LOSS_RATE*100}%")
-    
-    # Criar algumas mensagens iniciais
-    messages = [
-        Message("Hello GBN Protocol"),
-        Message("Este é um teste de fragmentação de mensagens grandes. " * 3),
-        Message("Mensagem curta")
-    ]
-    
-    # Agendar envio das mensagens iniciais
-    for i, msg in enumerate(messages):
-        simulator.schedule_event(i * 2, "SEND_MESSAGE", {"message": msg})
+def main(argv=None):
+    args = parse_args(argv)
+    tracing.set_level(tracing.SUMMARY if args.quiet else TRACE_LEVELS[args.level])
+    if args.trace:
+        tracing.open_writer(args.trace)
+    if args.compare:
+        compare_protocols(seed=args.seed)
+        tracing.close_writer()
+        return
+    if args.resume:
+        simulator = replay.load(args.resume)
+    elif args.replay:
+        simulator = replay.replay(args.replay)
+    else:
+        simulator = NetworkSimulator(SimulationConfig(protocol=args.protocol or ("sr" if args.sr else "gbn"), seed=args.seed,
+                                                      realtime=args.realtime, congestion=args.congestion,
+                                                      mtu=args.mtu, loss_rate=args.loss, loss_model=args.loss_model,
+                                                      burst_length=args.burst_length,
+                                                      latency_model=args.latency_model,
+                                                      latency_trace=args.latency_trace, fifo=args.fifo,
+                                                      bandwidth=args.bandwidth,
+                                                      queue_limit=args.queue, queue_discipline=args.aqm,
+                                                      flows=args.flows, timer_tick=args.timer_tick,
+                                                      seq_bits=args.seq_bits, ack_delay=args.ack_delay,
+                                                      ack_every=args.ack_every, duplex=args.duplex,
+                                                      fec_group=args.fec, min_rto=args.min_rto,
+                                                      max_rto=args.max_rto, timestamps=args.timestamps))
+
+        if tracing.info:
+            tracing.log(f"Iniciando simulação de protocolo {simulator.protocol.upper()} com melhorias...")
+            tracing.log(f"Configurações: Janela={simulator.sender.window_size}, Taxa de perda={simulator.config.loss_rate*100}%")
+            if args.bandwidth:
+                bdp = link.bdp_packets(args.bandwidth, simulator.config.initial_rtt, simulator.config.mtu)
+                tracing.log(f"Gargalo de {args.bandwidth:.0f} bit/s: BDP de {bdp:.1f} pacotes para RTT de {simulator.config.initial_rtt} ms")
+        
+        # Criar algumas mensagens iniciais
+        messages = [
+            Message("Hello GBN Protocol"),
+            Message("Este é um teste de fragmentação de mensagens grandes. " * 3),
+            Message("Mensagem curta")
+        ]
+        
+        # Agendar envio das mensagens iniciais
+        for i, msg in enumerate(messages):
+            simulator.schedule_event(i * 2, "SEND_MESSAGE", {"message": msg})
+        if args.reader_pause:
+            if simulator.protocol == "abp":
+                raise SystemExit("--reader-pause precisa de janela anunciada (GBN ou SR)")
+            simulator.pause_reader(*args.reader_pause)
+        simulator.start(args.duration)
+        if args.record:
+            replay.record(simulator, args.record)
     
-    # Executar simulação
-    simulator.run_simulation(SIMULATION_DURATION)
+    profiler = run_profiler = None
+    if args.profile or args.profile_gauges:
+        profiler = profiling.Profiler(gauges=args.profile_gauges)
+        profiler.attach(simulator)
+    if args.cprofile is not None or args.tracemalloc:
+        run_profiler = profiling.RunProfiler(cprofile=args.cprofile is not None, memory=args.tracemalloc)
+        run_profiler.start(simulator)
+
+    if args.cwnd_log and simulator.sender.cc is not None:
+        simulator.sender.cc.keep_history(simulator.current_time)
+
+    # Executar simulação, com pausas opcionais para o snapshot e para ligar a saída
+    if args.from_time is not None:
+        tracing.set_level(tracing.SILENT)
+    if args.snapshot_at is not None:
+        simulator.run(until=args.snapshot_at)
+        if profiler is not None:
+            profiler.detach()  # Os handlers embrulhados não são serializáveis
+        replay.save(simulator, args.snapshot or "snapshot.pkl")
+        if profiler is not None:
+            profiler.attach(simulator)
+    if args.from_time is not None:
+        simulator.run(until=args.from_time)
+        tracing.set_level(tracing.SUMMARY if args.quiet else TRACE_LEVELS[args.level])
+    simulator.run()
+    if run_profiler is not None:
+        run_profiler.stop()
+    if simulator.recorder is not None:
+        simulator.recorder.close()  # Grava o restante do log, ou confere que o replay o consumiu inteiro
+        if args.replay and tracing.summary:
+            print(f"Replay idêntico ao log: {simulator.recorder.count} eventos")
+    simulator.finish()
+    tracing.close_writer()
+    if args.export:
+        simulator.stats.export(args.export)
+    if args.flow_stats:
+        simulator.write_flow_stats(args.flow_stats)
+    if args.cwnd_log and simulator.sender.cc is not None:
+        congestion.write_history(simulator.sender.cc.history, args.cwnd_log)
+    if profiler is not None:
+        profiler.close()
+        profiler.report()
+    if run_profiler is not None:
+        run_profiler.report(args.cprofile or None)
+
+
+if __name__ == "__main__":
+    # Rodar pelo módulo importado, para que snapshots e logs referenciem gbn.* e não __main__.*
+    import gbn
+    gbn.main()
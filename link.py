@@ -0,0 +1,169 @@
+import math
+import random
+from collections import deque
+
+# Enlace gargalo entre to_layer3 e PACKET_ARRIVAL: fila finita servida a uma taxa fixa.
+# Como o serviço é FIFO e determinístico, o instante de saída de cada pacote já é
+# conhecido na chegada; a fila guarda só esses instantes, sem os pacotes.
+
+QUEUE_LIMIT = 100  # Pacotes na fila (incluindo o que está sendo transmitido)
+
+
+class BottleneckLink:
+    """ Fila de saída de um roteador seguida de um enlace de `bandwidth` bits/s
+
+    enqueue() devolve o instante (ms) em que o último bit deixa o enlace, ou
+    None se o pacote for descartado pela fila.
+    """
+
+    def __init__(self, bandwidth, queue_limit=QUEUE_LIMIT, seed=None):
+        self.ms_per_byte = 8000.0 / bandwidth  # Tempo de serialização de um byte, em ms
+        self.queue_limit = queue_limit
+        self.departures = deque()  # Saída (ms) dos pacotes ainda no sistema, em ordem
+        self.busy_until = 0.0      # Fim da transmissão do último pacote aceito
+        self.rng = random.Random(seed)
+        self.drops = 0
+        self.max_queue = 0
+
+    def backlog(self, now):
+        """ Pacotes na fila (esperando ou em transmissão) no instante `now` """
+        departures = self.departures
+        while departures and departures[0] <= now:
+            departures.popleft()
+        return len(departures)
+
+    def enqueue(self, now, size):
+        queued = self.backlog(now)
+        if self.should_drop(now, queued):
+            self.drops += 1
+            return None
+        start = max(now, self.busy_until)  # Instante em que o pacote chega à frente da fila
+        if self.drop_at_head(start, start - now, queued):
+            self.drops += 1
+            self.departures.append(start)  # Ocupou a fila até ser descartado na saída
+            return None
+        self.busy_until = start + size * self.ms_per_byte
+        self.departures.append(self.busy_until)
+        if queued + 1 > self.max_queue:
+            self.max_queue = queued + 1
+        return self.busy_until
+
+    def should_drop(self, now, queued):
+        """ Descarte na chegada: drop-tail puro """
+        return queued >= self.queue_limit
+
+    def drop_at_head(self, now, sojourn, queued):
+        """ Descarte na saída (CoDel); `now` é o instante em que o pacote chega à frente """
+        return False
+
+
+class RedLink(BottleneckLink):
+    """ Random Early Detection (Floyd e Jacobson, 1993) sobre a média móvel da fila """
+
+    WEIGHT = 0.002   # Peso da média móvel exponencial
+    MAX_P = 0.1      # Probabilidade de descarte em max_th
+
+    def __init__(self, bandwidth, queue_limit=QUEUE_LIMIT, seed=None):
+        super().__init__(bandwidth, queue_limit, seed)
+        self.min_th = queue_limit / 4
+        self.max_th = queue_limit * 3 / 4
+        self.avg = 0.0
+        self.count = -1     # Pacotes aceitos desde o último descarte
+        self.tx_time = 1.0  # Duração típica de uma transmissão, para o decaimento na ociosidade
+
+    def should_drop(self, now, queued):
+        if queued >= self.queue_limit:
+            self.count = 0
+            return True
+        if queued == 0:
+            # Fila ociosa desde busy_until: a média decai como se pacotes típicos tivessem passado
+            self.avg *= (1 - self.WEIGHT) ** (max(0.0, now - self.busy_until) / self.tx_time)
+        else:
+            self.avg += self.WEIGHT * (queued - self.avg)
+        if self.avg < self.min_th:
+            self.count = -1
+            return False
+        if self.avg >= self.max_th:
+            self.count = 0
+            return True
+        self.count += 1
+        p_b = self.MAX_P * (self.avg - self.min_th) / (self.max_th - self.min_th)
+        p_a = p_b / max(1e-9, 1 - self.count * p_b)
+        if self.rng.random() < p_a:
+            self.count = 0
+            return True
+        return False
+
+    def enqueue(self, now, size):
+        departure = super().enqueue(now, size)
+        if departure is not None:
+            self.tx_time = size * self.ms_per_byte
+        return departure
+
+
+class CoDelLink(BottleneckLink):
+    """ Controlled Delay (RFC 8289): descarta na saída quando a espera fica acima de TARGET por INTERVAL
+
+    Com a fila FIFO virtual, a espera de cada pacote é conhecida na chegada e a
+    lei de controle é aplicada no instante em que ele chegaria à frente da fila.
+    """
+
+    TARGET = 5.0      # ms
+    INTERVAL = 100.0  # ms
+
+    def __init__(self, bandwidth, queue_limit=QUEUE_LIMIT, seed=None):
+        super().__init__(bandwidth, queue_limit, seed)
+        self.first_above_time = 0.0
+        self.dropping = False
+        self.drop_next = 0.0
+        self.count = 0
+        self.lastcount = 0
+
+    def control_law(self, t):
+        return t + self.INTERVAL / math.sqrt(self.count)
+
+    def drop_at_head(self, now, sojourn, queued):
+        ok_to_drop = False
+        if sojourn < self.TARGET or queued == 0:
+            self.first_above_time = 0.0
+        elif self.first_above_time == 0.0:
+            self.first_above_time = now + self.INTERVAL
+        elif now >= self.first_above_time:
+            ok_to_drop = True
+
+        if self.dropping:
+            if not ok_to_drop:
+                self.dropping = False
+            elif now >= self.drop_next:
+                self.count += 1
+                self.drop_next = self.control_law(self.drop_next)
+                return True
+            return False
+        if ok_to_drop:
+            self.dropping = True
+            delta = self.count - self.lastcount
+            # Retomar perto da taxa de descarte anterior se o último episódio foi recente
+            self.count = delta if delta > 1 and now - self.drop_next < 16 * self.INTERVAL else 1
+            self.drop_next = self.control_law(now)
+            self.lastcount = self.count
+            return True
+        return False
+
+
+LINKS = {"droptail": BottleneckLink, "red": RedLink, "codel": CoDelLink}
+
+
+def create(bandwidth, queue_limit=QUEUE_LIMIT, discipline="droptail", seed=None):
+    """ Enlace com a disciplina de fila pedida; bandwidth=None significa enlace infinitamente rápido """
+    if not bandwidth:
+        return None
+    try:
+        cls = LINKS[discipline]
+    except KeyError:
+        raise ValueError(f"disciplina de fila desconhecida: {discipline!r}") from None
+    return cls(bandwidth, queue_limit, seed)
+
+
+def bdp_packets(bandwidth, rtt, packet_size):
+    """ Produto banda-atraso em pacotes de `packet_size` bytes (rtt em ms) """
+    return bandwidth * rtt / 8000.0 / packet_size
@@ -0,0 +1,203 @@
+import itertools
+import math
+
+# Estimadores de memória constante para as estatísticas da simulação: o custo não
+# depende de quantos pacotes passam, só da faixa de valores e do número de pontos.
+
+
+class RunningStats:
+    """ Média e variância online (Welford), com mínimo e máximo """
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """ Combina outro estimador (Chan et al.), como se as amostras tivessem sido somadas aqui """
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def stddev(self):
+        return math.sqrt(self.variance())
+
+    def to_dict(self):
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "mean": self.mean, "stddev": self.stddev(), "min": self.min, "max": self.max}
+
+
+class Histogram:
+    """ Histograma log-linear no estilo HDR
+
+    Os valores são quantizados em `resolution` (ms por unidade) e cada potência
+    de dois é dividida em 2**(SUB_BITS - 1) faixas, o que limita o erro relativo
+    dos percentis a ~1/2**(SUB_BITS - 1). Só as faixas usadas ocupam memória.
+    """
+
+    SUB_BITS = 7
+
+    def __init__(self, resolution=0.001):
+        self.resolution = resolution
+        self.sub = 1 << self.SUB_BITS
+        self.half = self.sub >> 1
+        self.counts = {}
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def index(self, units):
+        if units < self.sub:
+            return units
+        shift = units.bit_length() - self.SUB_BITS
+        return self.sub + (shift - 1) * self.half + (units >> shift) - self.half
+
+    def bounds(self, index):
+        """ Faixa [início, fim) de unidades coberta pelo índice """
+        if index < self.sub:
+            return index, index + 1
+        shift, offset = divmod(index - self.sub, self.half)
+        shift += 1
+        mantissa = offset + self.half
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def add(self, value, count=1):
+        units = max(0, int(value / self.resolution))
+        i = self.index(units)
+        self.counts[i] = self.counts.get(i, 0) + count
+        self.total += count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, count in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """ Valor abaixo do qual está a fração q (0-1) das amostras """
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                low, high = self.bounds(i)
+                value = (low + high) / 2 * self.resolution
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+class TimeSeries:
+    """ Contadores por intervalo de tempo simulado, com número de pontos limitado
+
+    record() recebe os contadores acumulados; cada linha guarda os incrementos do
+    intervalo. Ao chegar a max_points, pares vizinhos são somados e o intervalo
+    dobra, de modo que a série cobre a execução inteira com memória fixa.
+    """
+
+    def __init__(self, fields, interval=100.0, max_points=1024):
+        self.fields = tuple(fields)
+        self.interval = interval  # ms
+        self.max_points = max_points + max_points % 2  # Par: a compactação junta pares exatos
+        self.rows = []            # Incrementos de cada intervalo fechado
+        self.start = None         # Início (ms) do intervalo aberto
+        self.last = None          # Contadores acumulados no início do intervalo aberto
+        self.current = None
+
+    def record(self, now, values):
+        if self.start is None:
+            self.start = now
+            self.last = self.current = tuple(values)
+            return
+        while now >= self.start + (len(self.rows) + 1) * self.interval:
+            self.close()
+        self.current = tuple(values)
+
+    def advance(self, now, values):
+        """ Como record(), para quem registra logo antes de os contadores mudarem
+
+        Tudo o que mudou desde a chamada anterior aconteceu antes de `now` e fica
+        no intervalo que estava aberto; os intervalos vencidos depois dele fecham
+        vazios. Devolve o início do próximo intervalo: até lá não é preciso chamar de novo.
+        """
+        if self.start is None:
+            self.start = now
+            self.last = tuple(values)
+        self.current = tuple(values)
+        if now >= self.start + (len(self.rows) + 1) * self.interval:
+            self.close()
+            # Os demais intervalos vencidos não tiveram mudanças: a mesma linha de zeros, em bloco
+            zeros = (0,) * len(self.fields)
+            while now >= self.start + (len(self.rows) + 1) * self.interval:
+                elapsed = max(1, int((now - self.start) // self.interval) - len(self.rows))
+                self.rows.extend(itertools.repeat(zeros, min(elapsed, self.max_points - len(self.rows))))
+                if len(self.rows) >= self.max_points:
+                    self.coarsen()
+        return self.start + (len(self.rows) + 1) * self.interval
+
+    @classmethod
+    def combine(cls, series, fields, interval=100.0, max_points=1024):
+        """ Soma de séries com o mesmo início, fechadas até o mesmo instante (ex.: as dos fluxos) """
+        total = cls(fields, interval, max_points)
+        series = [item for item in series if item.start is not None]
+        if not series:
+            return total
+        first = series[0]
+        for item in series:
+            if (item.start, item.interval, len(item.rows)) != (first.start, first.interval, len(first.rows)):
+                raise ValueError("séries com início, intervalo ou número de pontos diferentes")
+        total.start, total.interval = first.start, first.interval
+        # Coluna a coluna, em lote: o custo é o de ler as linhas uma vez
+        total.rows = [[sum(column) for column in zip(*rows)] for rows in zip(*(item.rows for item in series))]
+        total.last = tuple(sum(column) for column in zip(*(item.last for item in series)))
+        total.current = tuple(sum(column) for column in zip(*(item.current for item in series)))
+        return total
+
+    def close(self):
+        self.rows.append([c - l for c, l in zip(self.current, self.last)])
+        self.last = self.current
+        if len(self.rows) >= self.max_points:
+            self.coarsen()
+
+    def coarsen(self):
+        rows = self.rows
+        self.rows = [[a + b for a, b in zip(rows[i], rows[i + 1])] for i in range(0, len(rows), 2)]
+        self.interval *= 2
+
+    def points(self):
+        """ (início_ms, {campo: incremento}) de cada intervalo, incluindo o aberto """
+        out = [(self.start + i * self.interval, dict(zip(self.fields, row))) for i, row in enumerate(self.rows)]
+        if self.current is not None and self.current != self.last:
+            partial = [c - l for c, l in zip(self.current, self.last)]
+            out.append((self.start + len(self.rows) * self.interval, dict(zip(self.fields, partial))))
+        return out
@@ -0,0 +1,250 @@
+import cProfile
+import csv
+import io
+import pstats
+import time
+import tracemalloc
+
+import tracing
+from metrics import RunningStats
+
+# Instrumentação do laço de eventos do NetworkSimulator.
+#
+# Profiler conta os eventos e o tempo de parede (perf_counter_ns) gasto em cada
+# tipo de evento e em cada handler dos remetentes/receptores, e amostra, no
+# relógio simulado, a profundidade da fila de eventos, as mensagens à espera e
+# os pacotes em voo. As amostras vão direto para o CSV dos medidores (quando
+# pedido), sem ficar em memória. Sem profiler instalado o laço só compara um local com None
+# por evento e os handlers não são embrulhados: o custo desligado é nulo.
+#
+# RunProfiler é o invólucro opcional (e caro) de uma execução inteira com
+# cProfile e/ou tracemalloc, para achar de onde vêm o tempo e as alocações.
+
+GAUGE_INTERVAL = 10.0  # ms simulados entre amostras dos medidores
+
+# Métodos embrulhados quando existem na entidade; o tempo medido é inclusivo
+# (um input que chama send_window também conta o tempo do send_window)
+SENDER_HANDLERS = ("output", "input", "timer_interrupt", "send_window", "process_queued_messages")
+RECEIVER_HANDLERS = ("input", "deliver", "ack_timeout")
+
+
+class Profiler:
+    """ Contadores e tempo acumulado por tipo de evento e por handler, mais medidores amostrados
+
+    O tempo de um evento vai do seu início ao início do próximo (ou ao fim da
+    execução), incluindo o pop do escalonador e o despacho no laço.
+    """
+
+    def __init__(self, interval=GAUGE_INTERVAL, gauges=None):
+        self.interval = interval
+        self.counts = {}          # Tipo de evento -> eventos processados
+        self.times = {}           # Tipo de evento -> ns acumulados
+        self.handler_counts = {}  # "Classe.método" -> chamadas
+        self.handler_times = {}   # "Classe.método" -> ns acumulados (inclusivos)
+        self.queue_depth = RunningStats()
+        self.queued = RunningStats()
+        self.in_flight = RunningStats()
+        self.gauges = None        # CSV das amostras: tempo simulado, fila, mensagens à espera, pacotes em voo
+        self.writer = None
+        self.wall_ns = 0
+        self.simulator = None
+        self.wrapped = []         # Entidades com handlers embrulhados, para detach()
+        self.next_sample = 0.0
+        self.current = None       # Tipo do evento em andamento
+        self.started = 0
+        if gauges is not None:
+            self.gauges = open(gauges, "w", newline="")
+            self.writer = csv.writer(self.gauges)
+            self.writer.writerow(["time", "queue_depth", "queued", "in_flight"])
+
+    def attach(self, simulator):
+        """ Instala o profiler no laço do simulador e embrulha os handlers das entidades """
+        self.simulator = simulator
+        simulator.profiler = self
+        for flow in simulator.flows:
+            for sender in flow.senders:
+                if sender is not None:
+                    self._wrap(sender, SENDER_HANDLERS)
+            for receiver in flow.receivers:
+                if receiver is not None:
+                    self._wrap(receiver, RECEIVER_HANDLERS)
+        self.next_sample = simulator.current_time
+
+    def detach(self):
+        """ Remove os embrulhos (necessário antes de salvar um snapshot) """
+        for entity, names in self.wrapped:
+            for name in names:
+                del entity.__dict__[name]
+        self.wrapped = []
+        if self.simulator is not None:
+            self.simulator.profiler = None
+
+    def _wrap(self, entity, names):
+        prefix = type(entity).__name__
+        present = [name for name in names if hasattr(entity, name)]
+        for name in present:
+            setattr(entity, name, self._timed(f"{prefix}.{name}", getattr(entity, name)))
+        self.wrapped.append((entity, present))
+
+    def _timed(self, key, method):
+        counts, times = self.handler_counts, self.handler_times
+        counts.setdefault(key, 0)
+        times.setdefault(key, 0)
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[key] += clock() - start
+                counts[key] += 1
+        return timed
+
+    def begin(self, event_type, now):
+        """ Chamado pelo laço a cada evento, antes do despacho """
+        tick = time.perf_counter_ns()
+        current = self.current
+        if current is not None:
+            elapsed = tick - self.started
+            self.times[current] += elapsed
+            self.wall_ns += elapsed
+        if event_type not in self.counts:
+            self.counts[event_type] = 0
+            self.times[event_type] = 0
+        self.counts[event_type] += 1
+        self.current = event_type
+        if now >= self.next_sample:
+            self.sample(now)
+        self.started = time.perf_counter_ns()  # A amostragem não entra no tempo do evento
+
+    def end(self):
+        """ Fecha o último evento (o laço pausou ou terminou) """
+        if self.current is not None:
+            elapsed = time.perf_counter_ns() - self.started
+            self.times[self.current] += elapsed
+            self.wall_ns += elapsed
+            self.current = None
+
+    def sample(self, now):
+        simulator = self.simulator
+        depth = len(simulator.events)
+        queued = in_flight = 0
+        for flow in simulator.flows:
+            queued += len(flow.pendings[0]) + len(flow.pendings[1])
+            for sender in flow.senders:
+                if sender is not None:
+                    queued += sender.queued()
+                    in_flight += sender.in_flight()
+        self.queue_depth.add(depth)
+        self.queued.add(queued)
+        self.in_flight.add(in_flight)
+        if self.writer is not None:
+            self.writer.writerow((now, depth, queued, in_flight))
+        self.next_sample = now + self.interval
+
+    @property
+    def events(self):
+        return sum(self.counts.values())
+
+    def events_per_second(self):
+        return self.events / (self.wall_ns / 1e9) if self.wall_ns else 0.0
+
+    def to_dict(self):
+        return {"events": self.events, "wall_seconds": self.wall_ns / 1e9, "events_per_s": self.events_per_second(),
+                "event_types": {name: {"count": self.counts[name], "ns": self.times[name]} for name in self.counts},
+                "handlers": {name: {"count": self.handler_counts[name], "ns": self.handler_times[name]}
+                             for name in self.handler_counts},
+                "queue_depth": self.queue_depth.to_dict(), "queued": self.queued.to_dict(),
+                "in_flight": self.in_flight.to_dict()}
+
+    def close(self):
+        """ Fecha o CSV dos medidores """
+        if self.gauges is not None:
+            self.gauges.close()
+            self.gauges = self.writer = None
+
+    def report(self):
+        if not tracing.summary:
+            return
+        print(f"\nPerfil: {self.events} eventos em {self.wall_ns / 1e9:.3f} s | "
+              f"{self.events_per_second():.0f} eventos/s")
+        print(f"{'Evento':<22}{'Contagem':>10}{'Total (ms)':>12}{'ns/evento':>11}{'%':>7}")
+        for name in sorted(self.counts, key=self.times.get, reverse=True):
+            count, ns = self.counts[name], self.times[name]
+            print(f"{name:<22}{count:>10}{ns / 1e6:>12.1f}{ns / count:>11.0f}{100 * ns / max(self.wall_ns, 1):>7.1f}")
+        called = [name for name in self.handler_counts if self.handler_counts[name]]
+        if called:
+            print(f"{'Handler (inclusivo)':<34}{'Chamadas':>10}{'Total (ms)':>12}{'ns/chamada':>11}")
+            for name in sorted(called, key=self.handler_times.get, reverse=True):
+                count, ns = self.handler_counts[name], self.handler_times[name]
+                print(f"{name:<34}{count:>10}{ns / 1e6:>12.1f}{ns / count:>11.0f}")
+        for label, gauge in (("Fila de eventos", self.queue_depth), ("Mensagens à espera", self.queued),
+                             ("Pacotes em voo", self.in_flight)):
+            if gauge.count:
+                print(f"{label}: média {gauge.mean:.1f} | máx {gauge.max:.0f} "
+                      f"({gauge.count} amostras a cada {self.interval:g} ms simulados)")
+
+
+class RunProfiler:
+    """ cProfile e/ou tracemalloc em volta das chamadas a run() de um simulador
+
+    O tracemalloc compara os snapshots do início e do fim: como o CPython não
+    conta alocações acumuladas, as alocações por evento são os blocos que
+    continuaram vivos (crescimento líquido), além do pico de memória rastreada.
+    """
+
+    def __init__(self, cprofile=False, memory=False, top=20):
+        self.profile = cProfile.Profile() if cprofile else None
+        self.memory = memory
+        self.top = top
+        self.simulator = None
+        self.first_event = 0
+        self.events = 0
+        self.before = None
+        self.after = None
+        self.peak = 0
+
+    def start(self, simulator):
+        self.simulator = simulator
+        self.first_event = simulator.events.processed
+        if self.memory:
+            tracemalloc.start()
+            self.before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+        if self.memory:
+            _, self.peak = tracemalloc.get_traced_memory()
+            self.after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        self.events = self.simulator.events.processed - self.first_event
+
+    def allocations(self):
+        """ (blocos, bytes) vivos a mais no fim do que no início, filtrando o próprio tracemalloc """
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = self.after.filter_traces(filters).compare_to(self.before.filter_traces(filters), "lineno")
+        return stats, sum(stat.count_diff for stat in stats), sum(stat.size_diff for stat in stats)
+
+    def report(self, path=None):
+        """ Imprime os relatórios; com `path`, grava os dados do cProfile (pstats) em vez de imprimi-los """
+        if self.profile is not None:
+            if path:
+                self.profile.dump_stats(path)
+            elif tracing.summary:
+                out = io.StringIO()
+                pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+                print(out.getvalue())
+        if self.after is None or not tracing.summary:
+            return
+        stats, blocks, size = self.allocations()
+        events = max(self.events, 1)
+        print(f"Memória: pico de {self.peak / 1024:.1f} KiB | {blocks} blocos / {size / 1024:.1f} KiB líquidos "
+              f"em {self.events} eventos ({blocks / events:.3f} blocos, {size / events:.1f} bytes por evento)")
+        for stat in stats[:self.top // 2]:
+            if stat.size_diff:
+                print(f"  {stat}")
@@ -0,0 +1,180 @@
+import copyreg
+import io
+import pickle
+import struct
+import zlib
+
+# Gravação/reprodução determinística e snapshots dos simuladores.
+#
+# Um log começa com o snapshot (pickle) do simulador no instante da gravação e
+# segue com um registro de tamanho fixo por evento processado: tempo, tipo e um
+# CRC32 dos parâmetros. Como todo o não determinismo (RNGs, lotes do canal,
+# fila de eventos) está dentro do snapshot, reproduzir é restaurá-lo e rodar de
+# novo; cada evento é comparado com o log e a primeira diferença interrompe a
+# execução com ReplayDivergence.
+#
+# Os simuladores chamam `self.recorder(tempo, tipo, params)` a cada evento
+# quando o atributo não é None; o recorder nunca entra nos snapshots.
+
+MAGIC = b"RTPLOG1\n"
+RECORD = struct.Struct("<dBI")  # tempo, id do tipo, CRC32 dos params
+NEW_TYPE = 0xFF                  # Registro que define o próximo id de tipo (seguido de u8 tamanho + nome)
+_LENGTH = struct.Struct("<Q")
+
+
+class ReplayDivergence(RuntimeError):
+    """ A execução reproduzida não bate com o log gravado """
+
+    def __init__(self, index, expected, got):
+        self.index = index
+        self.expected = expected  # (tempo, tipo, crc) do log, ou None se o log acabou
+        self.got = got            # (tempo, tipo, crc) da execução, ou None se ela acabou antes
+        super().__init__(f"divergência no evento {index}: log={expected} execução={got}")
+
+
+def _reduce_memoryview(view):
+    # memoryviews não são serializáveis: guardar o objeto de base (compartilhado via memo do pickle)
+    base = view.obj
+    if isinstance(base, (bytes, bytearray)) and len(base) == view.nbytes:
+        return memoryview, (base,)
+    return memoryview, (view.tobytes(),)
+
+
+class _Pickler(pickle.Pickler):
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table[memoryview] = _reduce_memoryview
+
+
+def snapshot(simulator):
+    """ Estado completo do simulador (fila de eventos, RNGs, endpoints, estatísticas) em bytes """
+    buffer = io.BytesIO()
+    _Pickler(buffer, pickle.HIGHEST_PROTOCOL).dump(simulator)
+    return buffer.getvalue()
+
+
+def restore(data):
+    return pickle.loads(data)
+
+
+def save(simulator, path):
+    with open(path, "wb") as f:
+        f.write(snapshot(simulator))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return restore(f.read())
+
+
+def digest(value, crc=0):
+    """ CRC32 estável dos parâmetros de um evento (dicts em ordem de inserção) """
+    if value is None:
+        return zlib.crc32(b"N", crc)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return zlib.crc32(value, crc)
+    if isinstance(value, (bool, int, float, str)):
+        return zlib.crc32(repr(value).encode(), crc)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            crc = digest(item, digest(key, crc))
+        return crc
+    if isinstance(value, (tuple, list)):
+        for item in value:
+            crc = digest(item, crc)
+        return crc
+    data = getattr(value, "data", None)  # Message
+    if data is not None:
+        return zlib.crc32(data, crc)
+    return zlib.crc32(type(value).__name__.encode(), crc)
+
+
+class EventRecorder:
+    """ Grava o log de eventos; instalado como `simulator.recorder` """
+
+    def __init__(self, path, simulator, buffer_size=1 << 20):
+        self.file = open(path, "wb")
+        state = snapshot(simulator)
+        self.file.write(MAGIC + _LENGTH.pack(len(state)) + state)
+        self.types = {}
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.count = 0
+
+    def __call__(self, time, event_type, params):
+        type_id = self.types.get(event_type)
+        if type_id is None:
+            type_id = self.types[event_type] = len(self.types)
+            name = event_type.encode()
+            self.buffer += RECORD.pack(0.0, NEW_TYPE, type_id) + bytes((len(name),)) + name
+        self.buffer += RECORD.pack(time, type_id, digest(params))
+        self.count += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class ReplayChecker:
+    """ Confere cada evento da execução reproduzida contra o log """
+
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+        self.types = {}
+        self.count = 0
+
+    def next_record(self):
+        """ Próximo registro do log como (tempo, tipo, crc), ou None no fim """
+        data = self.data
+        while self.offset < len(data):
+            time, type_id, value = RECORD.unpack_from(data, self.offset)
+            self.offset += RECORD.size
+            if type_id != NEW_TYPE:
+                return time, self.types[type_id], value
+            length = data[self.offset]
+            self.types[value] = data[self.offset + 1:self.offset + 1 + length].decode()
+            self.offset += 1 + length
+        return None
+
+    def __call__(self, time, event_type, params):
+        expected = self.next_record()
+        got = (time, event_type, digest(params))
+        if expected != got:
+            raise ReplayDivergence(self.count, expected, got)
+        self.count += 1
+
+    def close(self):
+        """ Confere que o log também terminou """
+        remaining = self.next_record()
+        if remaining is not None:
+            raise ReplayDivergence(self.count, remaining, None)
+
+
+def record(simulator, path):
+    """ Começa a gravar: o log abre com o snapshot do estado atual """
+    recorder = EventRecorder(path, simulator)
+    simulator.recorder = recorder
+    return recorder
+
+
+def replay(path):
+    """ Restaura o simulador do início do log, com o verificador já instalado
+
+    Basta executá-lo da mesma forma que na gravação; ao final, chamar
+    `simulator.recorder.close()` confere que nenhum evento ficou faltando.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} não é um log de eventos")
+    (length,) = _LENGTH.unpack_from(data, len(MAGIC))
+    start = len(MAGIC) + _LENGTH.size
+    simulator = restore(data[start:start + length])
+    simulator.recorder = ReplayChecker(data, start + length)
+    return simulator
@@ -0,0 +1,83 @@
+from array import array
+
+# Buffers circulares dos endpoints, indexados por seq % size. Cada campo fica em
+# um array preallocado em vez de um objeto por pacote, de modo que uma janela
+# de 64k pacotes custa alguns megabytes; o Packet só é montado na transmissão.
+
+
+class SendRing:
+    """ Fragmentos enviados e ainda não confirmados pelo remetente
+
+    O payload de cada slot é a fatia [offset, offset + length) da mensagem em
+    `views` (um memoryview compartilhado por todos os fragmentos da mensagem).
+    """
+
+    __slots__ = ("size", "views", "msg_ids", "offsets", "lengths", "flags", "checksums", "sent_times",
+                 "retransmissions")
+
+    def __init__(self, size):
+        self.size = size
+        self.views = [None] * size                  # memoryview da mensagem; None se o slot estiver livre
+        self.msg_ids = array('I', [0]) * size
+        self.offsets = array('I', [0]) * size
+        self.lengths = array('H', [0]) * size
+        self.flags = bytearray(size)
+        self.checksums = array('I', [0]) * size
+        self.sent_times = array('d', [-1.0]) * size  # Último envio (ms); -1 depois de medido o RTT
+        self.retransmissions = array('I', [0]) * size
+
+    def store(self, seqnum, view, msg_id, offset, length, flags, checksum):
+        i = seqnum % self.size
+        self.views[i] = view
+        self.msg_ids[i] = msg_id
+        self.offsets[i] = offset
+        self.lengths[i] = length
+        self.flags[i] = flags
+        self.checksums[i] = checksum
+        self.sent_times[i] = -1.0
+        self.retransmissions[i] = 0
+
+    def occupied(self, seqnum):
+        return self.views[seqnum % self.size] is not None
+
+    def payload(self, seqnum):
+        i = seqnum % self.size
+        offset = self.offsets[i]
+        return self.views[i][offset:offset + self.lengths[i]]
+
+    def release(self, seqnum):
+        # Solta a referência à mensagem para que ela possa ser liberada
+        self.views[seqnum % self.size] = None
+
+
+class ReceiveRing:
+    """ Fragmentos recebidos fora de ordem, à espera dos anteriores
+
+    Os payloads são copiados (poucos bytes) para não reter o datagrama inteiro.
+    """
+
+    __slots__ = ("size", "payloads", "msg_ids", "offsets", "flags")
+
+    def __init__(self, size):
+        self.size = size
+        self.payloads = [None] * size
+        self.msg_ids = array('I', [0]) * size
+        self.offsets = array('I', [0]) * size
+        self.flags = bytearray(size)
+
+    def __contains__(self, seqnum):
+        return self.payloads[seqnum % self.size] is not None
+
+    def store(self, seqnum, packet):
+        i = seqnum % self.size
+        self.payloads[i] = bytes(packet.payload)
+        self.msg_ids[i] = packet.msg_id
+        self.offsets[i] = packet.offset
+        self.flags[i] = packet.flags
+
+    def take(self, seqnum):
+        """ Remove o fragmento e devolve (msg_id, offset, payload, flags) """
+        i = seqnum % self.size
+        payload = self.payloads[i]
+        self.payloads[i] = None
+        return self.msg_ids[i], self.offsets[i], payload, self.flags[i]
@@ -0,0 +1,59 @@
+import timerwheel
+
+# Temporizador de retransmissão da RFC 6298: SRTT e RTTVAR suavizados
+# (Jacobson/Karels), RTO = SRTT + max(G, K * RTTVAR) limitado a [min, max] e
+# dobrado a cada timeout até a próxima amostra válida. Quem escolhe as
+# amostras é o remetente: pela regra de Karn, ACKs de pacotes retransmitidos
+# só valem se trouxerem o eco de timestamp do envio que os originou.
+#
+# Os limites da RFC (1 s a 60 s) são para RTTs da Internet; aqui os RTTs são
+# de dezenas de ms, e os limites padrão foram escalados para essa faixa.
+
+ALPHA = 1 / 8   # Ganho do SRTT
+BETA = 1 / 4    # Ganho do RTTVAR
+K = 4
+MIN_RTO = 10.0              # ms
+MAX_RTO = 120.0             # ms; também limita o backoff exponencial
+GRANULARITY = timerwheel.TICK  # G: resolução do relógio dos timers (ms)
+
+
+class RtoEstimator:
+    """ Estimador de RTO de um remetente (todos os tempos em ms)
+
+    Antes da primeira amostra, initial_rtt faz o papel dela: SRTT = initial_rtt
+    e RTTVAR = initial_rtt / 2, ou seja, RTO inicial de 3 * initial_rtt.
+    """
+
+    def __init__(self, initial_rtt, min_rto=MIN_RTO, max_rto=MAX_RTO, granularity=GRANULARITY):
+        if not 0 < min_rto <= max_rto:
+            raise ValueError(f"limites de RTO inválidos: min={min_rto} max={max_rto}")
+        self.estimated_rtt = initial_rtt  # SRTT
+        self.rtt_dev = initial_rtt / 2    # RTTVAR
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.granularity = granularity
+        self.samples = 0
+        self.backoff = 1   # Fator acumulado pelos timeouts desde a última amostra
+        self.rto = self._compute()
+
+    def _compute(self):
+        rto = self.estimated_rtt + max(self.granularity, K * self.rtt_dev)
+        return min(max(rto, self.min_rto), self.max_rto)
+
+    def sample(self, rtt):
+        """ Nova medida de RTT (já filtrada pela regra de Karn); desfaz o backoff """
+        if self.samples == 0:
+            self.estimated_rtt = rtt
+            self.rtt_dev = rtt / 2
+        else:
+            # RTTVAR usa o SRTT anterior (RFC 6298, seção 2.3)
+            self.rtt_dev = (1 - BETA) * self.rtt_dev + BETA * abs(self.estimated_rtt - rtt)
+            self.estimated_rtt = (1 - ALPHA) * self.estimated_rtt + ALPHA * rtt
+        self.samples += 1
+        self.backoff = 1
+        self.rto = self._compute()
+
+    def timeout(self):
+        """ O timer expirou: dobra o RTO (backoff exponencial, limitado a max_rto) """
+        self.backoff *= 2
+        self.rto = min(self.rto * 2, self.max_rto)
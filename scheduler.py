@@ -0,0 +1,93 @@
+import heapq
+
+# Posições dentro de uma entrada do heap
+_TIME, _PRIORITY, _SEQ, _TYPE, _PARAMS, _ACTIVE = range(6)
+
+# Prioridades de desempate no mesmo instante (menor roda antes): um pacote que
+# chega exatamente no prazo de um timer é processado antes da expiração
+PRIORITY = 0
+TIMER_PRIORITY = 1
+
+
+class EventScheduler:
+    """ Fila de eventos baseada em heap binário com cancelamento preguiçoso
+
+    Cada entrada é [tempo, prioridade, seq, tipo, params, ativo]. No mesmo
+    tempo roda primeiro a menor prioridade (timers depois das chegadas) e, entre
+    iguais, o contador seq mantém a ordem FIFO e evita comparar os params. A própria
+    entrada serve de token de cancelamento: cancel() apenas a marca como inativa
+    e pop() a descarta quando ela chega ao topo do heap. O estado é só listas e
+    inteiros, de modo que a fila inteira pode ser serializada com pickle.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = 0     # Próximo seq (desempate FIFO)
+        self._live = 0        # Eventos ainda ativos
+        self._cancelled = 0   # Entradas canceladas ainda no heap
+        self.processed = 0    # Eventos já devolvidos por pop()
+
+    def schedule(self, event_time, event_type, params=None, priority=PRIORITY):
+        """ Agenda um evento e devolve o token para cancelamento """
+        seq = self._counter
+        self._counter = seq + 1
+        entry = [event_time, priority, seq, event_type, params, True]
+        heapq.heappush(self._heap, entry)
+        self._live += 1
+        return entry
+
+    def cancel(self, token):
+        """ Cancela um evento agendado em O(1); tokens já disparados são ignorados """
+        if token is None or not token[_ACTIVE]:
+            return False
+        token[_ACTIVE] = False
+        self._live -= 1
+        self._cancelled += 1
+        # Compactar quando o lixo domina o heap, mantendo a memória limitada
+        if self._cancelled > 64 and self._cancelled > self._live:
+            self._compact()
+        return True
+
+    def cancel_all(self, event_type):
+        """ Cancela todos os eventos de um tipo (O(n), uso em testes/injeção de falhas) """
+        count = 0
+        for entry in self._heap:
+            if entry[_ACTIVE] and entry[_TYPE] == event_type:
+                entry[_ACTIVE] = False
+                count += 1
+        self._live -= count
+        self._cancelled += count
+        return count
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if entry[_ACTIVE]]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    def _discard_cancelled(self):
+        heap = self._heap
+        while heap and not heap[0][_ACTIVE]:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+
+    def pop(self):
+        """ Remove e devolve o próximo evento ativo como (tempo, tipo, params) """
+        self._discard_cancelled()
+        if not self._heap:
+            raise IndexError("pop from empty EventScheduler")
+        entry = heapq.heappop(self._heap)
+        entry[_ACTIVE] = False
+        self._live -= 1
+        self.processed += 1
+        return entry[_TIME], entry[_TYPE], entry[_PARAMS]
+
+    def peek_time(self):
+        """ Tempo do próximo evento ativo, ou None se a fila estiver vazia """
+        self._discard_cancelled()
+        return self._heap[0][_TIME] if self._heap else None
+
+    def __len__(self):
+        return self._live
+
+    def __bool__(self):
+        return self._live > 0
@@ -0,0 +1,42 @@
+# Números de sequência modulares com a aritmética serial da RFC 1982. Os
+# contadores vivem em um espaço de 2**bits valores e dão a volta; a ordem entre
+# dois números é dada pelo caminho mais curto no círculo, o que só é bem
+# definido enquanto a janela não passa da metade do espaço.
+
+SEQ_BITS = 32  # Tamanho padrão do espaço de sequência
+
+
+class SeqSpace:
+    """ Espaço de números de sequência de 16 ou 32 bits """
+
+    __slots__ = ("bits", "modulus", "mask", "half")
+
+    def __init__(self, bits=SEQ_BITS):
+        if bits not in (16, 32):
+            raise ValueError(f"números de sequência de {bits} bits não suportados (use 16 ou 32)")
+        self.bits = bits
+        self.modulus = 1 << bits
+        self.mask = self.modulus - 1
+        self.half = self.modulus >> 1
+
+    def add(self, seq, n):
+        return (seq + n) & self.mask
+
+    def distance(self, start, end):
+        """ Passos de start até end andando para a frente (0 a modulus - 1) """
+        return (end - start) & self.mask
+
+    def diff(self, a, b):
+        """ a - b com sinal, no intervalo [-half, half) """
+        return ((a - b + self.half) & self.mask) - self.half
+
+    def lt(self, a, b):
+        """ a < b segundo a RFC 1982 (indefinido quando a distância é exatamente half) """
+        return 0 < (b - a) & self.mask < self.half
+
+    def gt(self, a, b):
+        return self.lt(b, a)
+
+    def fits(self, bufsize):
+        """ O buffer circular pode ser indexado por seq % bufsize e a janela cabe na metade do espaço """
+        return 0 < bufsize <= self.half and self.modulus % bufsize == 0
@@ -0,0 +1,196 @@
+import csv
+import json
+import math
+import time
+
+import metrics
+import tracing
+
+# Estatísticas de uma simulação (ou de um fluxo), comuns a todos os protocolos:
+# os endpoints incrementam os contadores de `network.stats` diretamente.
+
+SERIES_INTERVAL = 100     # Largura (ms simulados) de cada ponto da série temporal
+
+
+class Statistics:
+    # Contadores acompanhados na série temporal (incrementos por intervalo)
+    SERIES_FIELDS = ("packets_sent", "packets_retransmitted", "packets_delivered", "packets_lost",
+                     "timeouts", "bytes_delivered")
+    COUNTERS = ("packets_sent", "packets_transmitted", "packets_retransmitted", "packets_received", "packets_delivered",
+                "packets_corrupted", "packets_lost", "packets_out_of_order", "messages_delivered",
+                "bytes_delivered", "reassembly_expired", "queue_drops", "queued_packets", "queue_delay",
+                "timeouts", "fast_retransmits", "send_blocked", "acks_sent", "acks_piggybacked",
+                "fec_parity_sent", "fec_recovered", "packets_duplicate", "delivery_errors", "zero_window",
+                "window_probes")
+
+    def __init__(self, clock):
+        self.clock = clock  # Relógio da simulação: base de todas as taxas
+        self.packets_sent = 0
+        self.packets_transmitted = 0  # Datagramas entregues à camada 3 (dados, ACKs, paridade): base das perdas
+        self.packets_retransmitted = 0
+        self.packets_received = 0
+        self.packets_delivered = 0
+        self.packets_corrupted = 0
+        self.packets_lost = 0
+        self.queue_drops = 0      # Descartes na fila do enlace gargalo
+        self.queued_packets = 0   # Pacotes que passaram pelo gargalo
+        self.queue_delay = 0.0    # Soma das esperas na fila do gargalo (ms)
+        self.packets_out_of_order = 0
+        self.messages_delivered = 0
+        self.bytes_delivered = 0
+        self.reassembly_expired = 0
+        self.timeouts = 0
+        self.fast_retransmits = 0
+        self.send_blocked = 0  # Mensagens recusadas com a fila de envio cheia
+        self.acks_sent = 0         # ACKs enviados em pacotes próprios
+        self.acks_piggybacked = 0  # ACKs pendentes que foram de carona em pacotes de dados
+        self.fec_parity_sent = 0   # Datagramas de paridade FEC transmitidos
+        self.fec_recovered = 0     # Pacotes reconstruídos pela FEC, sem retransmissão
+        self.packets_duplicate = 0  # Pacotes já recebidos que chegaram de novo (retransmissões desnecessárias)
+        self.delivery_errors = 0    # Entregas diferentes da próxima mensagem enviada (só com config.verify)
+        self.zero_window = 0        # Vezes em que o remetente parou com a janela anunciada fechada
+        self.window_probes = 0      # Sondas enviadas pelo persist timer com a janela fechada
+        self.start_time = clock.now()
+        self.wall_start = time.perf_counter()
+        # Estimadores de memória constante (não guardam as amostras)
+        self.message_size = metrics.RunningStats()
+        self.rtt = metrics.RunningStats()
+        self.rtt_histogram = metrics.Histogram()
+        self.latency = metrics.Histogram()  # Da produção da mensagem à entrega na camada 5 (ms)
+        self.series = metrics.TimeSeries(self.SERIES_FIELDS, SERIES_INTERVAL)
+        # Instante a partir do qual advance() precisa ser chamada; infinito para quem usa tick()
+        self.series_due = math.inf
+
+    def record_rtt(self, rtt):
+        self.rtt.add(rtt)
+        self.rtt_histogram.add(rtt)
+
+    def record_message(self, size):
+        self.message_size.add(size)
+
+    def record_latency(self, latency):
+        self.latency.add(latency)
+
+    def tick(self):
+        # Chamado periodicamente: fecha os intervalos da série temporal que já passaram
+        self.series.record(self.clock.now(), [getattr(self, name) for name in self.SERIES_FIELDS])
+
+    def advance(self):
+        # Alternativa ao tick() periódico, chamada antes de cada evento que pode mudar os contadores
+        # quando o relógio passou de series_due: custo zero para quem fica parado
+        self.series_due = self.series.advance(self.clock.now(), [getattr(self, name) for name in self.SERIES_FIELDS])
+
+    def aggregate(self, flows):
+        """ Recalcula contadores, estimadores e a série temporal como a soma das estatísticas de cada fluxo
+
+        As séries dos fluxos precisam ter sido fechadas (advance()) no mesmo instante.
+        """
+        for name in self.COUNTERS:
+            setattr(self, name, sum(getattr(flow, name) for flow in flows))
+        self.message_size = metrics.RunningStats()
+        self.rtt = metrics.RunningStats()
+        self.rtt_histogram = metrics.Histogram()
+        self.latency = metrics.Histogram()
+        for flow in flows:
+            self.message_size.merge(flow.message_size)
+            self.rtt.merge(flow.rtt)
+            self.rtt_histogram.merge(flow.rtt_histogram)
+            self.latency.merge(flow.latency)
+        self.series = metrics.TimeSeries.combine([flow.series for flow in flows], self.SERIES_FIELDS,
+                                                 SERIES_INTERVAL)
+    
+    def elapsed(self):
+        # Tempo decorrido no relógio da simulação, em ms
+        return self.clock.now() - self.start_time
+
+    def goodput(self):
+        # Pacotes entregues à camada 5 por segundo do relógio da simulação
+        return self.packets_delivered / max(self.elapsed(), 0.001) * 1000
+
+    def retransmission_ratio(self):
+        return self.packets_retransmitted / max(1, self.packets_sent)
+
+    def report(self):
+        if not tracing.summary:
+            return
+        
+        print("\n====== ESTATÍSTICAS DE DESEMPENHO ======")
+        print(f"Duração da simulação: {self.elapsed() / 1000:.2f} segundos")
+        print(f"Tempo de execução (relógio de parede): {time.perf_counter() - self.wall_start:.2f} segundos")
+        print(f"Pacotes enviados: {self.packets_sent}")
+        print(f"Pacotes retransmitidos: {self.packets_retransmitted} ({self.packets_retransmitted/max(1, self.packets_sent)*100:.2f}%)")
+        print(f"Pacotes recebidos: {self.packets_received}")
+        print(f"Pacotes entregues em ordem: {self.packets_delivered}")
+        print(f"Mensagens entregues à camada 5: {self.messages_delivered} ({self.bytes_delivered} bytes)")
+        if self.reassembly_expired:
+            print(f"Remontagens expiradas: {self.reassembly_expired}")
+        if self.delivery_errors:
+            print(f"ENTREGAS INCORRETAS (diferentes da mensagem enviada): {self.delivery_errors}")
+        print(f"Pacotes corrompidos: {self.packets_corrupted}")
+        print(f"Pacotes perdidos: {self.packets_lost} ({self.packets_lost/max(1, self.packets_transmitted)*100:.2f}% "
+              f"dos {self.packets_transmitted} datagramas transmitidos)")
+        print(f"Pacotes fora de ordem: {self.packets_out_of_order}")
+        print(f"Pacotes duplicados (retransmissões desnecessárias): {self.packets_duplicate}")
+        if self.queued_packets or self.queue_drops:
+            print(f"Descartes na fila do gargalo: {self.queue_drops}")
+            print(f"Espera média na fila do gargalo: {self.queue_delay / max(1, self.queued_packets):.2f} ms")
+        print(f"Timeouts ocorridos: {self.timeouts}")
+        print(f"Retransmissões rápidas: {self.fast_retransmits}")
+        print(f"ACKs enviados: {self.acks_sent} ({self.acks_piggybacked} de carona em pacotes de dados)")
+        if self.fec_parity_sent:
+            print(f"FEC: {self.fec_parity_sent} paridades enviadas "
+                  f"({self.fec_parity_sent / max(1, self.packets_sent + self.packets_retransmitted) * 100:.2f}% "
+                  f"de overhead), {self.fec_recovered} pacotes recuperados")
+        if self.send_blocked:
+            print(f"Envios bloqueados (fila cheia): {self.send_blocked}")
+        if self.zero_window:
+            print(f"Janela anunciada fechada: {self.zero_window} paradas do remetente, {self.window_probes} sondas")
+        
+        print(f"Taxa de transferência (goodput): {self.goodput():.2f} pacotes/segundo")
+        print(f"Razão de retransmissão: {self.retransmission_ratio():.2f}")
+        
+        if self.message_size.count:
+            print(f"Tamanho médio de mensagem: {self.message_size.mean:.2f} bytes")
+        
+        if self.rtt.count:
+            print(f"RTT médio: {self.rtt.mean:.2f} ms (desvio {self.rtt.stddev():.2f} ms)")
+            histogram = self.rtt_histogram
+            print(f"RTT p50/p99/p99.9: {histogram.percentile(0.5):.2f} / {histogram.percentile(0.99):.2f} / "
+                  f"{histogram.percentile(0.999):.2f} ms")
+
+        if self.latency.total:
+            latency = self.latency
+            print(f"Latência das mensagens p50/p99/p99.9: {latency.percentile(0.5):.2f} / "
+                  f"{latency.percentile(0.99):.2f} / {latency.percentile(0.999):.2f} ms")
+        
+        print("========================================")
+
+    def to_dict(self):
+        """ Resumo serializável: contadores, taxas, RTT com percentis e a série temporal """
+        self.tick()
+        summary = {name: getattr(self, name) for name in self.COUNTERS}
+        summary["sim_time_ms"] = self.elapsed()
+        summary["goodput"] = self.goodput()
+        summary["retransmission_ratio"] = self.retransmission_ratio()
+        summary["message_size"] = self.message_size.to_dict()
+        summary["rtt"] = self.rtt.to_dict()
+        if self.rtt.count:
+            summary["rtt"].update({f"p{label}": self.rtt_histogram.percentile(q)
+                                   for label, q in (("50", 0.5), ("99", 0.99), ("999", 0.999))})
+        summary["latency"] = {f"p{label}": self.latency.percentile(q)
+                              for label, q in (("50", 0.5), ("99", 0.99), ("999", 0.999))}
+        summary["latency"]["count"] = self.latency.total
+        summary["series_interval_ms"] = self.series.interval
+        summary["series"] = [dict(time_ms=start, **values) for start, values in self.series.points()]
+        return summary
+
+    def export(self, path):
+        """ Grava o resumo em JSON (.json) ou a série temporal em CSV (qualquer outra extensão) """
+        summary = self.to_dict()
+        with open(path, "w", newline="") as f:
+            if path.endswith(".json"):
+                json.dump(summary, f, indent=2)
+                return
+            writer = csv.DictWriter(f, fieldnames=("time_ms",) + self.SERIES_FIELDS)
+            writer.writeheader()
+            writer.writerows(summary["series"])
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gbn
+import tracing
+
+COLUMNS = ["protocol", "congestion", "loss_model", "loss_rate", "window_size", "initial_rtt", "bufsize",
+           "bandwidth", "queue_discipline", "flows", "ack_delay", "duplex", "fec_group", "timestamps", "seed",
+           "packets_sent", "packets_retransmitted", "packets_delivered", "messages_delivered", "packets_lost",
+           "queue_drops", "acks_sent", "acks_piggybacked", "fec_parity_sent", "fec_recovered",
+           "timeouts", "packets_duplicate", "retransmission_ratio", "goodput", "fairness", "rtt_mean", "rtt_p99", "latency_p50", "latency_p99", "sim_time"]
+
+
+def parse_list(text, cast):
+    return [cast(value) for value in text.split(",") if value]
+
+
+def build_grid(protocols, losses, windows, rtts, bufsizes, repetitions, base_seed, congestions=(None,),
+               loss_models=("independent",), bandwidths=(None,), disciplines=("droptail",), flow_counts=(1,),
+               ack_delays=(gbn.ACK_DELAY,), duplex_modes=(False,), fec_groups=(0,), timestamp_modes=(False,)):
+    """ Produto cartesiano dos parâmetros; cada ponto recebe uma semente própria e fixa
+
+    Combinações que o SimulationConfig rejeita por construção (ABP em
+    full-duplex) ficam de fora da grade, sem mudar as sementes das demais.
+    """
+    grid = []
+    skipped = 0
+    combos = itertools.product(protocols, congestions, loss_models, losses, windows, rtts, bufsizes,
+                               bandwidths, disciplines, flow_counts, ack_delays, duplex_modes, fec_groups,
+                               timestamp_modes, range(repetitions))
+    for index, (protocol, cc, loss_model, loss, window, rtt, bufsize, bandwidth, discipline, flows, ack_delay,
+                duplex, fec_group, timestamps, _) in enumerate(combos):
+        if duplex and protocol == "abp":
+            skipped += 1
+            continue
+        grid.append(gbn.SimulationConfig(protocol=protocol, loss_rate=loss, window_size=window,
+                                         initial_rtt=rtt, bufsize=bufsize, seed=base_seed + index,
+                                         congestion=cc, loss_model=loss_model, bandwidth=bandwidth,
+                                         queue_discipline=discipline, flows=flows, ack_delay=ack_delay,
+                                         duplex=duplex, fec_group=fec_group, timestamps=timestamps))
+    if skipped:
+        print(f"{skipped} pontos ignorados: o ABP não suporta full-duplex", file=sys.stderr)
+    return grid
+
+
+def run_point(config, duration):
+    """ Executa uma simulação isolada e devolve uma linha da tabela de resultados """
+    simulator = gbn.NetworkSimulator(config)
+    stats = simulator.run_simulation(duration)
+    return {
+        "protocol": config.protocol,
+        "congestion": config.congestion or "",
+        "loss_model": config.loss_model,
+        "loss_rate": config.loss_rate,
+        "window_size": config.window_size,
+        "initial_rtt": config.initial_rtt,
+        "bufsize": config.bufsize,
+        "bandwidth": config.bandwidth or "",
+        "queue_discipline": config.queue_discipline if config.bandwidth else "",
+        "flows": config.flows,
+        "ack_delay": config.ack_delay,
+        "duplex": int(config.duplex),
+        "fec_group": config.fec_group,
+        "timestamps": int(config.timestamps),
+        "seed": config.seed,
+        "packets_sent": stats.packets_sent,
+        "packets_retransmitted": stats.packets_retransmitted,
+        "packets_delivered": stats.packets_delivered,
+        "messages_delivered": stats.messages_delivered,
+        "packets_lost": stats.packets_lost,
+        "queue_drops": stats.queue_drops,
+        "acks_sent": stats.acks_sent,
+        "acks_piggybacked": stats.acks_piggybacked,
+        "fec_parity_sent": stats.fec_parity_sent,
+        "fec_recovered": stats.fec_recovered,
+        "timeouts": stats.timeouts,
+        "packets_duplicate": stats.packets_duplicate,
+        "retransmission_ratio": round(stats.retransmission_ratio(), 6),
+        "goodput": round(stats.goodput(), 6),
+        "fairness": round(simulator.fairness(), 6),
+        "rtt_mean": round(stats.rtt.mean, 3),
+        "rtt_p99": round(stats.rtt_histogram.percentile(0.99), 3),
+        "latency_p50": round(stats.latency.percentile(0.5), 3),
+        "latency_p99": round(stats.latency.percentile(0.99), 3),
+        "sim_time": simulator.current_time,
+    }
+
+
+def _init_worker():
+    # Os workers não imprimem nada: só a tabela agregada interessa
+    tracing.set_level(tracing.SILENT)
+
+
+def run_sweep(grid, duration, workers=None):
+    """ Distribui os pontos da grade entre processos e devolve as linhas na ordem da grade """
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(grid) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(run_point, grid, itertools.repeat(duration), chunksize=chunksize))
+
+
+def write_table(rows, path):
+    out = open(path, "w", newline="") if path != "-" else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Varredura paralela de parâmetros dos protocolos")
+    parser.add_argument("--protocol", default="gbn,sr", help="lista separada por vírgulas (abp,gbn,sr)")
+    parser.add_argument("--loss", default="0.0,0.05,0.1,0.2", help="taxas de perda")
+    parser.add_argument("--loss-model", default="independent", help="modelos de perda (independent,gilbert)")
+    parser.add_argument("--window", default="4,8,16,32", help="tamanhos de janela")
+    parser.add_argument("--rtt", default="15", help="valores de initial_rtt (ms)")
+    parser.add_argument("--bufsize", default=str(gbn.BUFSIZE), help="tamanhos do buffer circular")
+    parser.add_argument("--congestion", default="", help="algoritmos (ex.: none,reno,cubic)")
+    parser.add_argument("--bandwidth", default="", help="bits/s do gargalo (vazio: sem gargalo)")
+    parser.add_argument("--aqm", default="droptail", help="disciplinas da fila (droptail,red,codel)")
+    parser.add_argument("--flows", default="1", help="números de fluxos simultâneos")
+    parser.add_argument("--ack-delay", default=str(gbn.ACK_DELAY), help="atrasos de ACK (ms; 0 = ACK imediato)")
+    parser.add_argument("--duplex", default="0", help="modos de transferência (0: só A->B, 1: full-duplex)")
+    parser.add_argument("--fec", default="0", help="grupos FEC (pacotes por paridade; 0 desliga)")
+    parser.add_argument("--timestamps", default="0", help="eco de timestamps (0: regra de Karn pura, 1: ligado)")
+    parser.add_argument("--repetitions", type=int, default=1, help="execuções por ponto")
+    parser.add_argument("--seed", type=int, default=0, help="semente base da grade")
+    parser.add_argument("--duration", type=float, default=gbn.SIMULATION_DURATION * 100)
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: todos os núcleos)")
+    parser.add_argument("--output", default="-", help="arquivo CSV de saída ('-' para stdout)")
+    args = parser.parse_args()
+
+    grid = build_grid(parse_list(args.protocol, str), parse_list(args.loss, float),
+                      parse_list(args.window, int), parse_list(args.rtt, float),
+                      parse_list(args.bufsize, int), args.repetitions, args.seed,
+                      [None if name == "none" else name for name in parse_list(args.congestion, str)] or [None],
+                      parse_list(args.loss_model, str), parse_list(args.bandwidth, float) or [None],
+                      parse_list(args.aqm, str), parse_list(args.flows, int),
+                      parse_list(args.ack_delay, float), [bool(int(mode)) for mode in parse_list(args.duplex, str)],
+                      parse_list(args.fec, int), [bool(int(mode)) for mode in parse_list(args.timestamps, str)])
+    start = time.perf_counter()
+    rows = run_sweep(grid, args.duration, args.workers)
+    write_table(rows, args.output)
+    print(f"{len(rows)} pontos em {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
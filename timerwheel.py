@@ -0,0 +1,219 @@
+import argparse
+import random
+import time
+
+from scheduler import EventScheduler
+
+# Roda de temporizadores hierárquica (Varghese e Lauck, 1987) para os timers de
+# retransmissão. Armar, cancelar e rearmar custam O(1): o timer entra em uma
+# fatia da roda pelo tick de expiração e sai dela por dicionário. Os níveis
+# superiores cobrem prazos longos e são redistribuídos (cascata) quando a roda
+# de baixo dá uma volta completa.
+
+TICK = 1.0        # Granularidade padrão (ms)
+SLOT_BITS = 6     # 64 fatias por nível
+LEVELS = 4        # 64**4 ticks de alcance; prazos maiores ficam no último nível
+
+
+class Timer:
+    """ Timer armado na roda; também é o token de cancelamento """
+
+    __slots__ = ("deadline", "expires", "payload", "level", "slot", "handle")
+
+    def __init__(self, deadline, expires, payload):
+        self.deadline = deadline  # Instante exato de expiração (ms)
+        self.expires = expires    # Tick de expiração
+        self.payload = payload
+        self.level = None
+        self.slot = None          # Fatia (dict) onde o timer está, ou None se não estiver na roda
+        self.handle = None        # Livre para o dono (ex.: token do evento após o disparo)
+
+
+class TimingWheel:
+    """ Roda hierárquica com LEVELS níveis de 2**SLOT_BITS fatias de `tick` ms
+
+    `current` é o próximo tick a processar. advance(now) processa os ticks até
+    `now`, fazendo a cascata dos níveis superiores e devolvendo os timers cujo
+    tick venceu; ticks sem nada a fazer são saltados em bloco.
+    """
+
+    def __init__(self, tick=TICK, slot_bits=SLOT_BITS, levels=LEVELS):
+        if tick <= 0:
+            raise ValueError("tick deve ser positivo")
+        self.tick = tick
+        self.bits = slot_bits
+        self.size = 1 << slot_bits
+        self.mask = self.size - 1
+        self.levels = levels
+        self.span = 1 << (slot_bits * levels)   # Alcance da roda, em ticks
+        self.wheels = [[{} for _ in range(self.size)] for _ in range(levels)]
+        self.counts = [0] * levels              # Timers em cada nível
+        self.current = 0
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def _place(self, timer):
+        expires = timer.expires
+        delta = expires - self.current
+        if delta <= 0:
+            expires = self.current  # Prazo já passado: dispara no próximo tick processado
+            level = 0
+        else:
+            if delta >= self.span:
+                expires = self.current + self.span - 1  # Além do alcance: volta a ser distribuído na cascata
+                delta = self.span - 1
+            level = (delta.bit_length() - 1) // self.bits
+        slot = self.wheels[level][(expires >> (self.bits * level)) & self.mask]
+        slot[timer] = None
+        timer.level = level
+        timer.slot = slot
+        self.counts[level] += 1
+
+    def _remove(self, timer):
+        del timer.slot[timer]
+        self.counts[timer.level] -= 1
+        timer.slot = None
+
+    def start(self, deadline, payload=None):
+        """ Arma um timer para o instante `deadline` (ms) e devolve o token """
+        timer = Timer(deadline, int(deadline // self.tick), payload)
+        self._place(timer)
+        return timer
+
+    def restart(self, timer, deadline):
+        """ Rearma um timer (armado, cancelado ou já disparado) para um novo prazo """
+        if timer.slot is not None:
+            self._remove(timer)
+        timer.deadline = deadline
+        timer.expires = int(deadline // self.tick)
+        self._place(timer)
+        return timer
+
+    def cancel(self, timer):
+        """ Desarma um timer; devolve False se ele já não estava na roda """
+        if timer is None or timer.slot is None:
+            return False
+        self._remove(timer)
+        return True
+
+    def next_tick(self):
+        """ Próximo tick em que há algo a fazer (disparo ou cascata), ou None se a roda estiver vazia """
+        current = self.current
+        if self.counts[0]:
+            # Os timers do nível 0 vencem em menos de `size` ticks: basta uma volta na roda
+            wheel, mask = self.wheels[0], self.mask
+            for tick in range(current, current + self.size):
+                if wheel[tick & mask]:
+                    nearest = tick
+                    break
+            if any(self.counts[1:]):
+                boundary = -(-current // self.size) * self.size
+                return min(nearest, boundary)
+            return nearest
+        for level in range(1, self.levels):
+            if self.counts[level]:
+                # Nada a disparar até a próxima volta do nível de baixo
+                period = 1 << (self.bits * level)
+                return -(-current // period) * period
+        return None
+
+    def _cascade(self, tick):
+        # Do nível mais alto para o mais baixo, redistribuir as fatias cujo período começa neste tick
+        for level in range(self.levels - 1, 0, -1):
+            shift = self.bits * level
+            if tick & ((1 << shift) - 1):
+                continue
+            slot = self.wheels[level][(tick >> shift) & self.mask]
+            if slot:
+                timers = list(slot)
+                slot.clear()
+                self.counts[level] -= len(timers)
+                for timer in timers:
+                    self._place(timer)
+
+    def advance(self, now):
+        """ Processa os ticks até o instante `now` e devolve os timers vencidos, em ordem de tick """
+        target = int(now // self.tick)
+        fired = []
+        while True:
+            tick = self.next_tick()
+            if tick is None or tick > target:
+                break
+            self.current = tick
+            if not tick & self.mask:
+                self._cascade(tick)
+            slot = self.wheels[0][tick & self.mask]
+            if slot:
+                timers = list(slot)
+                slot.clear()
+                self.counts[0] -= len(timers)
+                for timer in timers:
+                    timer.slot = None
+                fired.extend(timers)
+            self.current = tick + 1
+        if target >= self.current:
+            self.current = target + 1
+        return fired
+
+
+def benchmark(timers=100_000, operations=1_000_000, tick=TICK, seed=0):
+    """ Compara a roda com o heap de eventos (cancelamento preguiçoso) com `timers` timers pendentes
+
+    Cada operação simula um ACK: rearma um timer pendente com um novo prazo.
+    Ao final, o tempo avança até todos dispararem.
+    """
+    rng = random.Random(seed)
+    rto = [rng.uniform(200.0, 1000.0) for _ in range(operations + timers)]
+    picks = [rng.randrange(timers) for _ in range(operations)]
+    steps = [i * 0.01 for i in range(operations)]
+    results = {}
+
+    start = time.perf_counter()
+    wheel = TimingWheel(tick)
+    armed = [wheel.start(rto[i], i) for i in range(timers)]
+    armed_at = time.perf_counter()
+    fired = 0
+    for op, (key, now) in enumerate(zip(picks, steps)):
+        if not op & 1023:
+            fired += len(wheel.advance(now))
+        wheel.restart(armed[key], now + rto[timers + op])
+    while len(wheel):
+        fired += len(wheel.advance(wheel.next_tick() * wheel.tick))
+    results["roda"] = (armed_at - start, time.perf_counter() - armed_at, fired)
+
+    start = time.perf_counter()
+    events = EventScheduler()
+    tokens = [events.schedule(rto[i], "TIMER", i) for i in range(timers)]
+    armed_at = time.perf_counter()
+    fired = 0
+    for op, (key, now) in enumerate(zip(picks, steps)):
+        if not op & 1023:
+            while events and events.peek_time() <= now:
+                events.pop()
+                fired += 1
+        events.cancel(tokens[key])
+        tokens[key] = events.schedule(now + rto[timers + op], "TIMER", key)
+    while events:
+        events.pop()
+        fired += 1
+    results["heap"] = (armed_at - start, time.perf_counter() - armed_at, fired)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da roda de temporizadores contra o heap de eventos")
+    parser.add_argument("--timers", type=int, default=100_000, help="timers pendentes")
+    parser.add_argument("--operations", type=int, default=1_000_000, help="rearmes (um por ACK)")
+    parser.add_argument("--tick", type=float, default=TICK, help="granularidade da roda (ms)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = benchmark(args.timers, args.operations, args.tick, args.seed)
+    print(f"{'Serviço':<8}{'Armar (s)':>12}{'Rearmar+disparar (s)':>24}{'ns/op':>10}{'Disparos':>10}")
+    for name, (arm, run, fired) in results.items():
+        print(f"{name:<8}{arm:>12.3f}{run:>24.3f}{run / args.operations * 1e9:>10.0f}{fired:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+import struct
+
+# Níveis de saída no terminal
+SILENT = 0    # Nada é impresso
+SUMMARY = 1   # Apenas o relatório final de Statistics
+INFO = 2      # Também timeouts, perdas e retransmissões
+DEBUG = 3     # Todos os pacotes, ACKs, timers e eventos
+
+# Flags consultadas nos pontos de trace: `if tracing.debug: tracing.log(f"...")`.
+# Com o nível desligado o custo é só a leitura de um atributo, sem montar a f-string.
+level = DEBUG
+summary = info = debug = True
+
+# Escritor opcional de trace estruturado (NdjsonTraceWriter/BinaryTraceWriter)
+writer = None
+
+# Tipos de evento do trace estruturado
+SEND, RETRANSMIT, LOSS, CORRUPT, ARRIVAL, DELIVER, TIMER_START, TIMER_STOP, TIMEOUT = range(9)
+EVENT_NAMES = ("send", "retransmit", "loss", "corrupt", "arrival", "deliver",
+               "timer_start", "timer_stop", "timeout")
+
+
+def set_level(new_level):
+    """ Ajusta o nível de saída e as flags usadas nos pontos de trace """
+    global level, summary, info, debug
+    level = new_level
+    summary = new_level >= SUMMARY
+    info = new_level >= INFO
+    debug = new_level >= DEBUG
+
+
+def log(message):
+    print(message)
+
+
+class NdjsonTraceWriter:
+    """ Trace em NDJSON (um objeto JSON por linha) com saída bufferizada """
+
+    def __init__(self, path, buffer_size=1 << 20):
+        self.file = open(path, "w", buffering=buffer_size)
+
+    def write(self, time, kind, entity=0, seqnum=0, acknum=0):
+        self.file.write(json.dumps({"t": time, "ev": EVENT_NAMES[kind], "entity": entity,
+                                    "seq": seqnum, "ack": acknum}, separators=(",", ":")))
+        self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+
+class BinaryTraceWriter:
+    """ Trace binário compacto: registros de tamanho fixo acumulados em memória """
+
+    RECORD = struct.Struct("<dBBQQ")  # tempo, tipo, entidade, seq, ack
+
+    def __init__(self, path, buffer_size=1 << 20):
+        self.file = open(path, "wb")
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+
+    def write(self, time, kind, entity=0, seqnum=0, acknum=0):
+        self.buffer += self.RECORD.pack(time, kind, entity, seqnum, acknum)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_binary_trace(path):
+    """ Itera sobre os registros de um trace binário como (tempo, tipo, entidade, seq, ack) """
+    with open(path, "rb") as f:
+        data = f.read()
+    yield from BinaryTraceWriter.RECORD.iter_unpack(data)
+
+
+def open_writer(path):
+    """ Abre e instala um escritor de trace; .ndjson/.jsonl gera texto, o resto binário """
+    global writer
+    if path.endswith((".ndjson", ".jsonl")):
+        writer = NdjsonTraceWriter(path)
+    else:
+        writer = BinaryTraceWriter(path)
+    return writer
+
+
+def close_writer():
+    global writer
+    if writer is not None:
+        writer.close()
+        writer = None
@@ -0,0 +1,317 @@
+import argparse
+import copy
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+import abp
+import channel
+import gbn
+import tracing
+import wire
+
+# Transferência de arquivos sobre os protocolos do simulador.
+#
+# A origem é mapeada com mmap e entregue ao remetente em blocos que são fatias
+# de memoryview do mapa: nenhum byte do arquivo é copiado até virar datagrama.
+# Do lado do receptor, o sink grava cada fragmento em ordem direto no arquivo
+# de saída, pré-alocado e mapeado, sem passar pela remontagem de mensagens.
+#
+# O fluxo de mensagens é autodescritivo, para o receptor não depender de nada
+# combinado fora da banda:
+#   cabeçalho: MAGIC | tamanho do arquivo (u64) | tamanho do bloco (u32)
+#   blocos do arquivo, em ordem
+#   trailer: SHA-256 do arquivo inteiro
+# Ao receber o trailer, o receptor calcula o SHA-256 do que foi gravado e compara.
+
+MAGIC = b"RTPFILE1"
+HEADER = struct.Struct("!8sQI")
+DIGEST_SIZE = hashlib.sha256().digest_size
+BLOCK = 1 << 20            # Bytes do arquivo por mensagem (o Sender fragmenta conforme a MTU)
+ABP_BLOCK = 0xFFFF         # O ABP não fragmenta: um bloco por pacote, limitado pelo campo length
+MTU = wire.HEADER_SIZE + 9000  # Datagramas jumbo: a MTU padrão do simulador (20 bytes) é pequena demais
+DURATION = 3_600_000.0        # Limite de ms simulados (1 h): os eventos periódicos nunca esvaziam a fila
+
+
+class TransferError(ValueError):
+    """ Fluxo de mensagens que não segue o formato da transferência """
+
+
+class FileSource:
+    """ Arquivo de origem mapeado em memória e fatiado em blocos sem cópia """
+
+    def __init__(self, path, block=BLOCK):
+        if block <= 0:
+            raise ValueError(f"bloco de {block} bytes")
+        self.path = path
+        self.block = block
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        # Arquivos vazios não podem ser mapeados
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.hash = hashlib.sha256()
+
+    def messages(self):
+        """ Cabeçalho, blocos (memoryviews do mapa) e trailer, na ordem de envio
+
+        O SHA-256 é acumulado à medida que os blocos saem, em uma única passada pelo arquivo.
+        """
+        yield HEADER.pack(MAGIC, self.size, self.block)
+        if self.map is not None:
+            view = memoryview(self.map)
+            for start in range(0, self.size, self.block):
+                chunk = view[start:start + self.block]
+                self.hash.update(chunk)
+                yield chunk
+        yield self.hash.digest()
+
+    def close(self):
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                pass  # Fatias ainda referenciadas (ex.: pelo anel do remetente): o mapa fecha ao ser coletado
+            self.map = None
+        self.file.close()
+
+
+class FileSink:
+    """ Grava os fragmentos recebidos em ordem direto no arquivo de saída
+
+    `feed(payload, last)` é instalado como sink do receptor; o arquivo é
+    pré-alocado com o tamanho anunciado no cabeçalho e cada fragmento é
+    copiado do datagrama para o mapa na sua posição final.
+    """
+
+    _HEADER, _DATA, _TRAILER, _DONE = range(4)
+
+    def __init__(self, path, on_complete=None):
+        self.path = path
+        self.on_complete = on_complete  # Chamado ao fim da verificação
+        self.state = self._HEADER
+        self.control = bytearray()      # Cabeçalho/trailer em remontagem (podem vir fragmentados)
+        self.file = None
+        self.map = None
+        self.size = None
+        self.block = None
+        self.position = 0
+        self.expected = None  # SHA-256 anunciado pelo remetente
+        self.digest = None    # SHA-256 do arquivo gravado
+        self.ok = False
+
+    @property
+    def done(self):
+        return self.state == self._DONE
+
+    def feed(self, payload, last):
+        if self.state == self._DATA:
+            n = len(payload)
+            position = self.position
+            if position + n > self.size:
+                raise TransferError(f"dados além dos {self.size} bytes anunciados")
+            self.map[position:position + n] = payload
+            self.position = position + n
+            if self.position == self.size:
+                self.state = self._TRAILER
+            return
+        if self.state == self._DONE:
+            raise TransferError("mensagem depois do trailer")
+        self.control += payload
+        if not last:
+            return
+        control = bytes(self.control)
+        self.control.clear()
+        if self.state == self._HEADER:
+            self.open(control)
+        else:
+            self.finish(control)
+
+    def open(self, header):
+        if len(header) != HEADER.size:
+            raise TransferError(f"cabeçalho de {len(header)} bytes")
+        magic, self.size, self.block = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise TransferError(f"assinatura desconhecida {magic!r}")
+        self.file = open(self.path, "w+b")
+        if self.size:
+            fd = self.file.fileno()
+            self.file.truncate(self.size)
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, self.size)  # Reserva os blocos em disco de uma vez
+            self.map = mmap.mmap(fd, self.size)
+        self.state = self._DATA if self.size else self._TRAILER
+        if tracing.info:
+            tracing.log(f"Recebendo {self.size} bytes em {self.path}")
+
+    def finish(self, trailer):
+        if len(trailer) != DIGEST_SIZE:
+            raise TransferError(f"trailer de {len(trailer)} bytes")
+        self.expected = trailer
+        if self.map is not None:
+            self.map.flush()
+            self.digest = hashlib.sha256(self.map).digest()
+        else:
+            self.digest = hashlib.sha256().digest()
+        self.ok = self.digest == self.expected
+        self.state = self._DONE
+        if tracing.info:
+            tracing.log(f"SHA-256 {'confere' if self.ok else 'NÃO confere'}: {self.digest.hex()}")
+        self.close()
+        if self.on_complete is not None:
+            self.on_complete()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Producer:
+    """ Entrega as mensagens ao remetente respeitando o backpressure
+
+    resume() é o on_writable do remetente: oferece mensagens até a primeira
+    recusa e guarda a recusada para a próxima tentativa.
+    """
+
+    def __init__(self, output, messages):
+        self.output = output  # Devolve False (would-block) se a fila estiver cheia
+        self.messages = iter(messages)
+        self.held = None
+
+    def resume(self):
+        message = self.held
+        while True:
+            if message is None:
+                message = next(self.messages, None)
+                if message is None:
+                    break
+            if not self.output(message):
+                break
+            message = None
+        self.held = message
+
+
+def result(sink, size, wall, sim_ms):
+    """ Resumo da transferência: integridade e vazão (MB = 10**6 bytes) """
+    return {"bytes": size, "ok": sink.ok, "complete": sink.done, "wall_seconds": wall, "sim_ms": sim_ms,
+            "mb_per_s": size / 1e6 / wall if wall > 0 else math.inf,
+            "sim_mb_per_s": size / 1e3 / sim_ms if sim_ms > 0 else math.inf}
+
+
+def send_file(source_path, dest_path, config=None, block=BLOCK, duration=DURATION):
+    """ Transfere um arquivo pelo GBN/SR do NetworkSimulator; devolve (result, estatísticas)
+
+    O gerador de mensagens aleatórias é desligado (numa cópia de `config`): o
+    arquivo é a única carga. `duration` limita o tempo simulado caso a
+    transferência não termine; o resultado sai com complete=False.
+    """
+    if config is None:
+        config = gbn.SimulationConfig(mtu=MTU, loss_rate=0.0, corruption_rate=0.0)
+    else:
+        config = copy.copy(config)
+    config.message_rate = 0
+    simulator = gbn.NetworkSimulator(config)
+    flow = simulator.flows[0]
+    sender = simulator.sender
+    sink = FileSink(dest_path, on_complete=simulator.stop)
+    simulator.receiver.sink = sink.feed
+    source = FileSource(source_path, block)
+
+    def output(data):
+        message = gbn.Message(data)
+        if not sender.output(message):
+            return False
+        flow.stats.record_message(message.size)
+        return True
+
+    producer = Producer(output, source.messages())
+    sender.on_writable = producer.resume
+    try:
+        start = time.perf_counter()
+        simulator.start(duration)
+        producer.resume()
+        simulator.run()
+        wall = time.perf_counter() - start
+        stats = simulator.finish()
+        summary = result(sink, source.size, wall, simulator.current_time)
+    finally:
+        sink.close()
+        source.close()
+    return summary, stats
+
+
+def send_file_abp(source_path, dest_path, channels=None, block=ABP_BLOCK):
+    """ Transfere um arquivo pelo ABPProtocol; devolve o resumo da transferência """
+    if not 0 < block <= ABP_BLOCK:
+        raise ValueError(f"o ABP não fragmenta: bloco de {block} bytes fora de 1 a {ABP_BLOCK}")
+    protocol = abp.ABPProtocol(channels=channels)
+    sink = FileSink(dest_path)
+    protocol.receiver.sink = sink.feed
+    source = FileSource(source_path, block)
+    try:
+        start = time.perf_counter()
+        protocol.run_simulation(source.messages())
+        wall = time.perf_counter() - start
+        summary = result(sink, source.size, wall, protocol.current_time)
+    finally:
+        sink.close()
+        del protocol
+        source.close()
+    return summary
+
+
+def report(summary):
+    if not tracing.summary:
+        return
+    print(f"Arquivo: {summary['bytes']} bytes | SHA-256 {'OK' if summary['ok'] else 'DIVERGENTE'}"
+          f"{'' if summary['complete'] else ' (transferência incompleta)'}")
+    print(f"Vazão: {summary['mb_per_s']:.2f} MB/s em {summary['wall_seconds']:.3f} s de relógio | "
+          f"{summary['sim_mb_per_s']:.2f} MB/s em {summary['sim_ms']:.1f} ms simulados")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transferência de arquivos sobre GBN, SR ou ABP simulados")
+    parser.add_argument("source", help="arquivo de origem")
+    parser.add_argument("dest", help="arquivo de saída (sobrescrito)")
+    parser.add_argument("--protocol", choices=sorted(gbn.PROTOCOLS), default="sr")
+    parser.add_argument("--block", type=int, default=None,
+                        help=f"bytes por mensagem (padrão: {BLOCK} no GBN/SR, {ABP_BLOCK} no ABP)")
+    parser.add_argument("--mtu", type=int, default=MTU, help="tamanho máximo do datagrama (GBN/SR)")
+    parser.add_argument("--window", type=int, default=32, help="janela do remetente (GBN/SR)")
+    parser.add_argument("--bufsize", type=int, default=gbn.BUFSIZE, help="buffer circular em pacotes (GBN/SR)")
+    parser.add_argument("--loss", type=float, default=0.0, help="taxa de perda do canal")
+    parser.add_argument("--corruption", type=float, default=0.0, help="taxa de corrupção do canal")
+    parser.add_argument("--seed", type=int, default=None, help="semente do RNG da simulação")
+    parser.add_argument("--duration", type=float, default=DURATION, help="limite de ms simulados (GBN/SR)")
+    parser.add_argument("--level", choices=gbn.TRACE_LEVELS, default="summary", help="nível de saída no terminal")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tracing.set_level(gbn.TRACE_LEVELS[args.level])
+    if args.protocol == "abp":
+        channels = None
+        if args.loss or args.corruption:
+            channels = tuple(channel.Channel(channel.IndependentLoss(args.loss), channel.UniformLatency(2.0, 4.0),
+                                             corruption_rate=args.corruption, seed=seed)
+                             for seed in ((args.seed or 0) * 2 + 1, (args.seed or 0) * 2 + 2))
+        summary = send_file_abp(args.source, args.dest, channels, args.block or ABP_BLOCK)
+    else:
+        config = gbn.SimulationConfig(protocol=args.protocol, mtu=args.mtu, window_size=args.window,
+                                      bufsize=args.bufsize, loss_rate=args.loss, corruption_rate=args.corruption,
+                                      seed=args.seed)
+        summary, _ = send_file(args.source, args.dest, config, args.block or BLOCK, args.duration)
+    report(summary)
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
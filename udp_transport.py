@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import random
+import time
+
+import gbn
+import tracing
+import wire
+from clock import WallClock
+from endpoint import Message, Packet
+from stats import Statistics
+
+LOCALHOST = "127.0.0.1"
+
+
+class NetemShim:
+    """ Emulador de rede em processo (ao estilo do netem): perda, atraso e corrupção """
+
+    def __init__(self, loss=0.0, delay=0.0, jitter=0.0, corrupt=0.0, seed=None):
+        self.loss = loss        # Probabilidade de descarte
+        self.delay = delay      # Atraso fixo em ms
+        self.jitter = jitter    # Variação uniforme do atraso em ms
+        self.corrupt = corrupt  # Probabilidade de inverter um bit do datagrama
+        self.rng = random.Random(seed)
+        self.dropped = 0
+        self.corrupted = 0
+
+    def apply(self, data):
+        """ Devolve (atraso_em_ms, datagrama) ou None se o datagrama for descartado """
+        rng = self.rng
+        if self.loss and rng.random() < self.loss:
+            self.dropped += 1
+            return None
+        if self.corrupt and rng.random() < self.corrupt:
+            data = bytearray(data)
+            data[rng.randrange(len(data))] ^= 1 << rng.randrange(8)
+            self.corrupted += 1
+        delay = self.delay
+        if self.jitter:
+            delay = max(0.0, delay + rng.uniform(-self.jitter, self.jitter))
+        return delay, data
+
+
+class _Endpoint(asyncio.DatagramProtocol):
+    """ Socket UDP de uma entidade; repassa cada datagrama para o callback """
+
+    def __init__(self, on_datagram):
+        self.on_datagram = on_datagram
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.on_datagram(data)
+
+
+class UdpLink:
+    """ Par de sockets UDP em loopback (entidade 0 = A, entidade 1 = B) """
+
+    def __init__(self, loop, on_datagram, shim=None):
+        self.loop = loop
+        self.on_datagram = on_datagram  # on_datagram(dest, data)
+        self.shim = shim
+        self.endpoints = [None, None]
+        self.addrs = [None, None]
+        self.datagrams_sent = 0
+
+    async def open(self):
+        for entity in (0, 1):
+            transport, endpoint = await self.loop.create_datagram_endpoint(
+                lambda entity=entity: _Endpoint(lambda data: self.on_datagram(entity, data)),
+                local_addr=(LOCALHOST, 0))
+            self.endpoints[entity] = endpoint
+            self.addrs[entity] = transport.get_extra_info("sockname")
+
+    def close(self):
+        for endpoint in self.endpoints:
+            if endpoint and endpoint.transport:
+                endpoint.transport.close()
+
+    def send(self, AorB, data):
+        dest = 1 - AorB
+        self.datagrams_sent += 1
+        if self.shim is not None:
+            result = self.shim.apply(data)
+            if result is None:
+                return
+            delay, data = result
+            if delay > 0:
+                self.loop.call_later(delay / 1000, self._sendto, AorB, dest, data)
+                return
+        self._sendto(AorB, dest, data)
+
+    def _sendto(self, AorB, dest, data):
+        self.endpoints[AorB].transport.sendto(data, self.addrs[dest])
+
+
+class UdpNetwork:
+    """ Substitui o NetworkSimulator do gbn.py por sockets reais e timers do asyncio
+
+    Implementa a interface de rede dos endpoints (módulo endpoint), então os
+    endpoints de qualquer protocolo (ABP, GBN, SR) rodam sem alterações.
+    Tempos dos timers são em ms, como no simulador.
+    """
+
+    def __init__(self, loop, config, shim=None):
+        self.loop = loop
+        self.config = config
+        self.protocol = config.protocol
+        self.rng = random.Random(config.seed)
+        self.clock = WallClock()
+        self.stats = Statistics(self.clock)
+        self.sender, self.receiver = gbn.create_endpoints(self, config)
+        self.link = UdpLink(loop, self._on_datagram, shim)
+        self.timers = {}  # Handle do call_later por (entidade, seq)
+        self.delivered = 0
+        self.done = asyncio.Event()  # Sinalizado quando todos os pacotes foram confirmados
+        self.writable = asyncio.Event()  # Sinalizado quando a fila do remetente volta a ter espaço
+        self.sender.on_writable = self.writable.set
+
+    @property
+    def current_time(self):
+        return self.clock.now()
+
+    def _on_datagram(self, dest, data):
+        try:
+            packet = Packet.from_bytes(data)
+        except wire.DecodeError:
+            self.stats.packets_corrupted += 1
+            return
+        self.stats.tick()
+        if dest == 0:
+            self.sender.input(packet)
+            if self.sender.idle():
+                self.done.set()
+        else:
+            self.receiver.input(packet)
+
+    async def send(self, message):
+        """ Entrega bloqueante da camada 5: aguarda espaço na fila do remetente """
+        self.done.clear()
+        while not self.sender.output(message):
+            self.writable.clear()
+            await self.writable.wait()
+
+    def to_layer3(self, AorB, packet):
+        self.stats.packets_transmitted += 1
+        self.link.send(AorB, packet.to_bytes())
+
+    def to_layer5(self, AorB, data):
+        self.delivered += 1  # Mensagens completas, já remontadas
+
+    def start_timer(self, AorB, increment, seqnum=None):
+        key = (AorB, seqnum)
+        handle = self.timers.get(key)
+        if handle is not None:
+            handle.cancel()
+        self.timers[key] = self.loop.call_later(increment / 1000, self._timer_fired, AorB, seqnum)
+
+    def stop_timer(self, AorB, seqnum=None):
+        handle = self.timers.pop((AorB, seqnum), None)
+        if handle is not None:
+            handle.cancel()
+
+    def _timer_fired(self, AorB, seqnum):
+        self.timers.pop((AorB, seqnum), None)
+        if AorB >= gbn.ACK_TIMER:
+            self.receiver.ack_timeout()
+        elif AorB == 0:
+            if seqnum is None:
+                self.sender.timer_interrupt()
+            else:
+                self.sender.timer_interrupt(seqnum)
+
+    def close(self):
+        for handle in self.timers.values():
+            handle.cancel()
+        self.timers.clear()
+        self.link.close()
+
+
+async def run_loopback(messages, protocol="gbn", window_size=8, shim=None, timeout=60.0, mtu=gbn.MTU):
+    """ Executa o protocolo (ABP, GBN ou SR) sobre UDP em loopback e devolve (rede, segundos) """
+    loop = asyncio.get_running_loop()
+    # A perda e a corrupção vêm do shim, não do próprio Sender
+    config = gbn.SimulationConfig(protocol=protocol, loss_rate=0.0, corruption_rate=0.0, window_size=window_size,
+                                  mtu=mtu)
+    network = UdpNetwork(loop, config, shim=shim)
+    await network.link.open()
+
+    start = time.perf_counter()
+    async def produce():
+        for message in messages:
+            network.stats.record_message(message.size)
+            await network.send(message)
+        await network.done.wait()
+
+    try:
+        await asyncio.wait_for(produce(), timeout)
+    finally:
+        elapsed = time.perf_counter() - start
+        network.close()
+    return network, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Protocolos de transporte confiável sobre UDP em loopback")
+    parser.add_argument("protocol", choices=sorted(gbn.PROTOCOLS), nargs="?", default="gbn")
+    parser.add_argument("--count", type=int, default=1000, help="número de mensagens")
+    parser.add_argument("--size", type=int, default=20, help="tamanho de cada mensagem em bytes")
+    parser.add_argument("--window", type=int, default=8)
+    parser.add_argument("--mtu", type=int, default=gbn.MTU, help="tamanho máximo do datagrama em bytes")
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--delay", type=float, default=0.0, help="atraso em ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variação do atraso em ms")
+    parser.add_argument("--corrupt", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true", help="imprimir apenas o resumo")
+    args = parser.parse_args()
+    if args.quiet:
+        tracing.set_level(tracing.SUMMARY)
+
+    shim = None
+    if args.loss or args.delay or args.jitter or args.corrupt:
+        shim = NetemShim(args.loss, args.delay, args.jitter, args.corrupt, seed=args.seed)
+
+    payload = b"x" * args.size
+    messages = [Message(payload) for _ in range(args.count)]
+    network, elapsed = asyncio.run(run_loopback(messages, args.protocol, args.window, shim=shim, mtu=args.mtu))
+    network.stats.report()
+    delivered = network.delivered
+
+    print(f"\n{args.protocol.upper()} sobre UDP: {delivered} entregues em {elapsed:.3f} s "
+          f"({delivered / max(elapsed, 1e-9):.0f} por segundo)")
+    if shim is not None:
+        print(f"Shim: {shim.dropped} descartados, {shim.corrupted} corrompidos")
+
+
+if __name__ == "__main__":
+    main()
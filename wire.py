@@ -0,0 +1,102 @@
+import struct
+import zlib
+
+# Formato do pacote na rede (big-endian):
+#   seq (u32) | ack (u32) | flags (u8) | reservado (u8) | length (u16) |
+#   window (u16) | flow (u16) | msg_id (u32) | offset (u32) | checksum (u32) | payload
+# msg_id/offset identificam o fragmento dentro da mensagem original; window é a
+# janela anunciada pelo receptor nos ACKs (aceita até ack + window); flow é o
+# fluxo ao qual o pacote pertence quando vários compartilham o mesmo canal.
+HEADER = struct.Struct("!IIBxHHHIII")
+HEADER_SIZE = HEADER.size
+CHECKSUM_OFFSET = HEADER_SIZE - 4   # O checksum é o último campo do cabeçalho
+SEQ_MASK = 0xFFFFFFFF
+WINDOW_MAX = 0xFFFF
+FLOW_MAX = 0xFFFF
+LENGTH_MAX = 0xFFFF  # Campo length: payload máximo de um datagrama
+
+# Bits do campo flags
+FLAG_ACK = 0x01
+FLAG_NAK = 0x02
+FLAG_LAST_FRAGMENT = 0x04  # Último fragmento da mensagem
+FLAG_DATA = 0x08           # Pacote de dados com um ACK de carona (FLAG_ACK também ligado)
+FLAG_CUMULATIVE = 0x10     # ACK cumulativo do Selective Repeat: confirma tudo até ack
+FLAG_PARITY = 0x20         # Paridade FEC de um grupo de pacotes de dados (módulo fec)
+FLAG_TIMESTAMP = 0x40      # Opção de timestamps (TIMESTAMPS) à frente do payload
+FLAG_CONTROL = FLAG_ACK | FLAG_NAK  # Sem FLAG_DATA, qualquer um deles marca um pacote de controle, sem dados
+
+# Opção de timestamps (como a do TCP, RFC 7323): instante de envio e eco do
+# último instante recebido do outro lado, em microssegundos módulo 2**32.
+# Vai dentro do campo length, antes do payload, e é coberta pelo checksum.
+TIMESTAMPS = struct.Struct("!II")
+TIMESTAMP_UNITS = 1000  # Unidades de timestamp por ms
+
+_PREFIX = struct.Struct("!IIBxHHHII")   # Cabeçalho sem o campo de checksum
+_crc32 = zlib.crc32
+
+
+def timestamp(ms):
+    """ Valor de timestamp (u32) do instante ms """
+    return int(ms * TIMESTAMP_UNITS) & SEQ_MASK
+
+
+def timestamp_age(ms, value):
+    """ ms decorridos desde o timestamp `value` até o instante ms """
+    return ((timestamp(ms) - value) & SEQ_MASK) / TIMESTAMP_UNITS
+
+
+class DecodeError(ValueError):
+    """ Datagrama curto demais ou com campo length inconsistente """
+
+
+def to_bytes(payload):
+    """ Normaliza o payload para um objeto bytes-like """
+    if isinstance(payload, str):
+        return payload.encode()
+    return payload
+
+
+def checksum(seqnum, acknum, flags, payload, msg_id=0, offset=0, window=0, flow=0):
+    """ CRC32 sobre o cabeçalho (sem o checksum) seguido do payload """
+    prefix = _PREFIX.pack(seqnum & SEQ_MASK, acknum & SEQ_MASK, flags, len(payload), min(window, WINDOW_MAX),
+                          flow, msg_id & SEQ_MASK, offset & SEQ_MASK)
+    return _crc32(payload, _crc32(prefix))
+
+
+def encode(seqnum, acknum, payload=b"", flags=0, check=None, msg_id=0, offset=0, window=0, flow=0):
+    """ Serializa um pacote; check=None calcula o checksum correto """
+    length = len(payload)
+    buf = bytearray(HEADER_SIZE + length)
+    _PREFIX.pack_into(buf, 0, seqnum & SEQ_MASK, acknum & SEQ_MASK, flags, length, min(window, WINDOW_MAX),
+                      flow, msg_id & SEQ_MASK, offset & SEQ_MASK)
+    buf[HEADER_SIZE:] = payload
+    if check is None:
+        view = memoryview(buf)
+        check = _crc32(view[HEADER_SIZE:], _crc32(view[:CHECKSUM_OFFSET]))
+    struct.pack_into("!I", buf, CHECKSUM_OFFSET, check & 0xFFFFFFFF)
+    return buf
+
+
+def decode(data):
+    """ Decodifica um datagrama sem copiar o payload
+
+    Devolve (seq, ack, flags, window, flow, msg_id, offset, payload, checksum); payload é um memoryview sobre
+    o buffer recebido e checksum é o valor transportado, a ser conferido pelo
+    receptor com checksum()/verify().
+    """
+    view = memoryview(data)
+    if len(view) < HEADER_SIZE:
+        raise DecodeError(f"datagrama com {len(view)} bytes, cabeçalho exige {HEADER_SIZE}")
+    seqnum, acknum, flags, length, window, flow, msg_id, offset, check = HEADER.unpack_from(view)
+    if HEADER_SIZE + length != len(view):
+        raise DecodeError(f"length={length} inconsistente com datagrama de {len(view)} bytes")
+    return seqnum, acknum, flags, window, flow, msg_id, offset, view[HEADER_SIZE:], check
+
+
+def verify(data):
+    """ Confere o checksum de um datagrama codificado, sem cópias """
+    view = memoryview(data)
+    if len(view) < HEADER_SIZE:
+        return False
+    check = struct.unpack_from("!I", view, CHECKSUM_OFFSET)[0]
+    return _crc32(view[HEADER_SIZE:], _crc32(view[:CHECKSUM_OFFSET])) == check